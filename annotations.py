@@ -0,0 +1,178 @@
+"""
+Bulk rectangle annotations loaded from CSV or JSON files.
+
+A file holds any number of rectangles, which become a single 'annotations'
+operation: every box is drawn into one working buffer in one pass, and
+the editor refreshes the display once for the whole set.
+
+CSV files need a header row with the columns x, y, width and height, and
+may add color, fill and thickness:
+
+    x,y,width,height,color,fill,thickness
+    10,10,120,80,#ff0000,no,3
+    200,40,50,50,,,
+
+JSON files hold a list of objects with the same keys, or an object with a
+"rectangles" list. Colors are '#RRGGBB' strings or [R, G, B] lists and
+default to blue. Rectangles are filled unless fill is false, in which case
+only an outline of the given thickness (default 2) is drawn.
+"""
+import csv
+import json
+import os
+
+import ops
+
+DEFAULT_THICKNESS = 2
+REQUIRED_KEYS = ('x', 'y', 'width', 'height')
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'outline')
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'fill')
+
+
+def parse_color(value):
+    """
+        Args:
+        - value (str or list): '#RRGGBB' (or 'RRGGBB') string, or [R, G, B];
+          None or an empty string gives the default blue.
+
+        Returns:
+        - tuple: (R, G, B) integers between 0 and 255.
+        """
+    if value is None or value == '':
+        return ops.BLUE
+    if isinstance(value, str):
+        text = value.strip().lstrip('#')
+        if len(text) != 6:
+            raise ValueError(f"Invalid color: {value}")
+        try:
+            return tuple(int(text[i:i + 2], 16) for i in (0, 2, 4))
+        except ValueError:
+            raise ValueError(f"Invalid color: {value}")
+    color = tuple(int(component) for component in value)
+    if len(color) != 3 or not all(0 <= c <= 255 for c in color):
+        raise ValueError(f"Invalid color: {value}")
+    return color
+
+
+def parse_fill(value):
+    """
+        Args:
+        - value (bool, int or str): Whether to fill; None or '' means filled.
+
+        Returns:
+        - bool: True for a filled rectangle, False for an outline.
+        """
+    if value is None or value == '':
+        return True
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f"Invalid fill value: {value}")
+    return bool(value)
+
+
+def normalize_rectangle(item):
+    """
+        Validate one rectangle and fill in its defaults.
+
+        Args:
+        - item (dict): Rectangle with x, y, width, height and optionally
+          color, fill and thickness; values may be strings.
+
+        Returns:
+        - dict: Rectangle with int coordinates, an (R, G, B) color, a bool
+          fill and an int thickness.
+        """
+    if not isinstance(item, dict):
+        raise ValueError("Expected an object with x, y, width and height, "
+                         f"not {item!r}.")
+    missing = [key for key in REQUIRED_KEYS if item.get(key) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}.")
+    x, y, width, height = (int(item[key]) for key in REQUIRED_KEYS)
+    if x < 0 or y < 0 or width <= 0 or height <= 0:
+        raise ValueError("Rectangle needs non-negative coordinates "
+                         "and positive width and height.")
+    thickness = item.get('thickness')
+    thickness = DEFAULT_THICKNESS if thickness in (None, '') \
+        else int(thickness)
+    if thickness <= 0:
+        raise ValueError("Thickness must be positive.")
+    return {'x': x, 'y': y, 'width': width, 'height': height,
+            'color': parse_color(item.get('color')),
+            'fill': parse_fill(item.get('fill')), 'thickness': thickness}
+
+
+def normalize_rectangles(items):
+    """
+        Validate a list of rectangles.
+
+        Args:
+        - items (list): Rectangle dicts (see normalize_rectangle).
+
+        Returns:
+        - list: Normalized rectangle dicts.
+        """
+    rectangles = []
+    for index, item in enumerate(items, start=1):
+        try:
+            rectangles.append(normalize_rectangle(item))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Rectangle {index}: {e}")
+    return rectangles
+
+
+def read_csv(file):
+    reader = csv.DictReader(file)
+    fields = [name.strip().lower() for name in reader.fieldnames or ()]
+    if not all(key in fields for key in REQUIRED_KEYS):
+        raise ValueError("CSV header must name the columns "
+                         "x, y, width and height.")
+    reader.fieldnames = fields
+    return [row for row in reader if any(value for value in row.values())]
+
+
+def read_json(file):
+    data = json.load(file)
+    if isinstance(data, dict):
+        data = data.get('rectangles')
+    if not isinstance(data, list):
+        raise ValueError("JSON must be a list of rectangles or an object "
+                         "with a \"rectangles\" list.")
+    return data
+
+
+def load_rectangles(path):
+    """
+        Read rectangles from a CSV or JSON file, chosen by its extension.
+
+        Args:
+        - path (str): Path of a .csv or .json file.
+
+        Returns:
+        - list: Normalized rectangle dicts.
+        """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        with open(path, newline='') as file:
+            items = read_csv(file)
+    elif extension == '.json':
+        with open(path) as file:
+            items = read_json(file)
+    else:
+        raise ValueError("Annotation files must be .csv or .json.")
+    return normalize_rectangles(items)
+
+
+def annotations_operation(rectangles):
+    """
+        Args:
+        - rectangles (list): Rectangle dicts; validated here.
+
+        Returns:
+        - tuple: ('annotations', params) drawing all the rectangles at once.
+        """
+    return 'annotations', {'rectangles': normalize_rectangles(rectangles)}
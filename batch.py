@@ -0,0 +1,360 @@
+"""
+Headless batch processing of image directories.
+
+Applies an ordered list of operations (resize, brightness decrease,
+channel isolation, blue rectangle, bulk annotations) to every image
+matched by an input directory or glob pattern and writes the results to
+an output directory. The work is spread across a pool of worker
+processes. When there are fewer files than workers, each image of at
+least parallel.PARALLEL_MIN_BYTES (decoded) is instead split into strips
+across the workers the pool leaves idle (see parallel.py), which gives
+the same output. A failing file is reported and skipped without stopping
+the rest of the batch.
+
+Example:
+    python main.py batch photos/ out/ --op resize:50% --op brightness:20
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image
+
+import annotations
+import ops
+import parallel
+import point_ops
+import tiled
+from utils import orient_array, read_orientation
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def parse_operation(spec):
+    """
+        Parse a command line operation specification.
+
+        Supported forms:
+        - resize:WIDTHxHEIGHT[:keep] - resize to pixels, optionally keeping aspect ratio.
+        - resize:PERCENT%[:keep] or resize:W%xH%[:keep] - resize by percent.
+          Either form also takes a quality tier flag: fast, balanced (default)
+          or best, e.g. resize:25%:fast or resize:800x600:keep:best.
+        - brightness:PERCENT - decrease brightness by a percentage (0-100).
+        - gain:FACTOR, gamma:VALUE, contrast:FACTOR - tone adjustments.
+        - channel:R|G|B - keep only the given color channel.
+        - rectangle:X,Y,WIDTH,HEIGHT - draw a filled blue rectangle.
+        - annotations:PATH - draw every rectangle listed in a CSV or JSON
+          file (see annotations).
+
+        Args:
+        - spec (str): Operation specification.
+
+        Returns:
+        - tuple: (name, params) where params is a dict of operation arguments.
+        """
+    name, _, arguments = spec.partition(':')
+    name = name.strip().lower()
+
+    if name == 'resize':
+        size, *flags = arguments.split(':')
+        quality = ops.DEFAULT_RESIZE_QUALITY
+        for flag in flags:
+            if flag in ops.RESIZE_QUALITIES:
+                quality = flag
+            elif flag != 'keep':
+                raise ValueError(f"Unknown resize flag: {flag}")
+        if '%' in size:
+            mode = 'percent'
+            size = size.replace('%', '')
+        else:
+            mode = 'pixels'
+        width, _, height = size.partition('x')
+        width = int(width)
+        height = int(height) if height else width if mode == 'percent' else 0
+        if not height:
+            raise ValueError("Pixel resize needs WIDTHxHEIGHT.")
+        params = {'mode': mode, 'width': width, 'height': height,
+                  'keep_aspect_ratio': 'keep' in flags, 'quality': quality}
+        ops.compute_target_size(1, 1, **params)  # validate limits up front
+        return name, params
+
+    if name == 'brightness':
+        decrease = float(arguments)
+        if not (0 <= decrease <= 100):
+            raise ValueError("Brightness decrease value "
+                             "must be between 0 and 100.")
+        return name, {'decrease': decrease}
+
+    if name in ('gain', 'gamma', 'contrast'):
+        params = {name: float(arguments)}
+        point_ops.lut_for(name, params)  # validate the value up front
+        return name, params
+
+    if name == 'channel':
+        channel = arguments.strip().upper()
+        if channel not in ('R', 'G', 'B'):
+            raise ValueError("Channel must be one of R, G, B.")
+        return name, {'channel': channel}
+
+    if name == 'rectangle':
+        x, y, width, height = (int(value) for value in arguments.split(','))
+        if x < 0 or y < 0 or width <= 0 or height <= 0:
+            raise ValueError("Rectangle needs non-negative coordinates "
+                             "and positive width and height.")
+        return name, {'x': x, 'y': y, 'width': width, 'height': height}
+
+    if name == 'annotations':
+        try:
+            return annotations.annotations_operation(
+                annotations.load_rectangles(arguments))
+        except OSError as e:
+            raise ValueError(f"Cannot read annotations: {e}")
+
+    raise ValueError(f"Unknown operation: {name}")
+
+
+def collect_input_files(input_path):
+    """
+        Resolve an input directory or glob pattern to a sorted list of image files.
+
+        Args:
+        - input_path (str): Directory or glob pattern (e.g. 'photos/*.jpg').
+
+        Returns:
+        - list: Paths of the matched image files.
+        """
+    if os.path.isdir(input_path):
+        candidates = (os.path.join(input_path, name)
+                      for name in os.listdir(input_path))
+    else:
+        candidates = glob.glob(input_path, recursive=True)
+    return sorted(path for path in candidates
+                  if os.path.isfile(path) and
+                  path.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def input_root(input_path):
+    """
+        Args:
+        - input_path (str): Directory or glob pattern given as the input.
+
+        Returns:
+        - str: The directory itself, or the part of the pattern before the
+          first component with a wildcard; outputs mirror the input files'
+          paths relative to it.
+        """
+    if os.path.isdir(input_path):
+        return input_path
+    root = os.path.dirname(input_path)
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root or os.curdir
+
+
+def output_path_for(path, root, output_dir):
+    """
+        Returns:
+        - str: Where the result for input path goes: its path relative to
+          root, under output_dir, so that files of different subdirectories
+          with the same name do not overwrite each other.
+        """
+    return os.path.join(output_dir, os.path.relpath(path, root))
+
+
+def decoded_bytes(path):
+    """
+        Returns:
+        - int: Size of the image as an RGB array, read from the file header
+          (0 if the file cannot be opened; processing it will report why).
+        """
+    try:
+        with Image.open(path) as pil_image:
+            width, height = pil_image.size
+    except OSError:
+        return 0
+    return width * height * 3
+
+
+def process_file(path, operations, output_path, strip_bytes=None,
+                 parallel_workers=None):
+    """
+        Load one image, apply the operations in order and save the result.
+
+        Runs inside a worker process, or in the main process when the
+        image is split across processes itself.
+
+        Args:
+        - path (str): Input image path.
+        - operations (list): List of (name, params) tuples.
+        - output_path (str): File to write the result to; missing
+          directories are created.
+        - strip_bytes (int): Run the operations strip by strip on memory-mapped
+          scratch files with strips of about this size; None processes the
+          whole image in memory.
+        - parallel_workers (int): Split the image across this many processes
+          (see parallel.py); None processes it on the calling process.
+
+        Returns:
+        - tuple: (output_path, input_bytes, elapsed_seconds).
+        """
+    start = time.perf_counter()
+    with Image.open(path) as pil_image:
+        orientation = read_orientation(pil_image)
+        image = ops.from_pil(pil_image)
+    # Upright view; the first operation that writes pixels does the copy
+    image = orient_array(image, orientation)
+
+    if strip_bytes:
+        image = tiled.run_operations_tiled(image, operations, strip_bytes)
+    elif parallel_workers:
+        image = parallel.run_operations_parallel(image, operations,
+                                                 parallel_workers)
+    else:
+        image = ops.run_operations(image, operations)
+
+    os.makedirs(os.path.dirname(output_path) or os.curdir, exist_ok=True)
+    Image.fromarray(image).save(output_path)
+    return output_path, os.path.getsize(path), time.perf_counter() - start
+
+
+def run_batch(files, operations, output_dir, workers=None, strip_bytes=None,
+              root=None):
+    """
+        Process files across a process pool, printing per-file progress and a summary.
+
+        Args:
+        - files (list): Input image paths.
+        - operations (list): List of (name, params) tuples.
+        - output_dir (str): Directory to write results to.
+        - workers (int): Number of worker processes (defaults to CPU count).
+        - strip_bytes (int): Strip size for bounded-memory processing, or None.
+        - root (str): Directory the output paths mirror the files relative to
+          (see input_root); defaults to the files' common directory.
+
+        Returns:
+        - list: (path, error message) tuples for files that failed.
+        """
+    os.makedirs(output_dir, exist_ok=True)
+    if root is None:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path))
+                                   for path in files]) if files else os.curdir
+    failures = []
+    processed_bytes = 0
+    total = len(files)
+    start = time.perf_counter()
+
+    workers = workers or os.cpu_count() or 1
+    done = 0
+
+    def report(path, result):
+        nonlocal done, processed_bytes
+        done += 1
+        try:
+            _, input_bytes, elapsed = result()
+            processed_bytes += input_bytes
+            print(f"[{done}/{total}] {path} ({elapsed:.2f} s)")
+        except Exception as e:
+            failures.append((path, str(e)))
+            print(f"[{done}/{total}] FAILED {path}: {e}")
+
+    split = []
+    if total < workers and not strip_bytes:
+        # Too few files to keep every worker busy: images large enough to
+        # gain from it are split across the cores the pool leaves idle
+        split = [path for path in files
+                 if decoded_bytes(path) >= parallel.PARALLEL_MIN_BYTES]
+    pooled = [path for path in files if path not in split]
+    split_workers = workers - len(pooled)
+
+    with ProcessPoolExecutor(max_workers=max(min(workers, len(pooled)),
+                                             1)) as executor:
+        futures = {executor.submit(process_file, path, operations,
+                                   output_path_for(path, root, output_dir),
+                                   strip_bytes): path
+                   for path in pooled}
+        # The pool works on the other files meanwhile
+        for path in split:
+            report(path, lambda: process_file(
+                path, operations, output_path_for(path, root, output_dir),
+                parallel_workers=split_workers))
+        for future in as_completed(futures):
+            report(futures[future], future.result)
+
+    elapsed = time.perf_counter() - start
+    succeeded = total - len(failures)
+    rate = succeeded / elapsed if elapsed > 0 else 0.0
+    throughput = processed_bytes / (1024 * 1024) / elapsed if elapsed > 0 \
+        else 0.0
+    print(f"Processed {succeeded}/{total} images in {elapsed:.2f} s "
+          f"({rate:.2f} images/s, {throughput:.2f} MB/s), "
+          f"{len(failures)} failed.")
+    return failures
+
+
+def operation_argument(spec):
+    try:
+        return parse_operation(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"{spec}: {e}")
+
+
+def main(argv=None):
+    """
+        Command line entry point for batch processing.
+
+        Args:
+        - argv (list): Arguments without the program name (defaults to sys.argv[1:]).
+
+        Returns:
+        - int: Process exit code (0 when every file succeeded).
+        """
+    parser = argparse.ArgumentParser(
+        prog='main.py batch',
+        description='Apply image operations to a directory of images.')
+    parser.add_argument('input',
+                        help='input directory or glob pattern')
+    parser.add_argument('output', help='output directory')
+    parser.add_argument('--op', dest='operations', action='append',
+                        type=operation_argument, default=[],
+                        metavar='SPEC',
+                        help='operation to apply, in order (repeatable): '
+                             'resize:800x600[:keep], resize:50%%, '
+                             'brightness:30, gain:1.2, gamma:0.8, '
+                             'contrast:1.1, channel:R, '
+                             'rectangle:10,10,100,50, '
+                             'annotations:boxes.csv')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes '
+                             '(default: CPU count)')
+    parser.add_argument('--strip-mb', type=float, default=None,
+                        help='process each image in strips of about this '
+                             'many MB backed by memory-mapped scratch files, '
+                             'bounding memory for very large images')
+    args = parser.parse_args(argv)
+
+    files = collect_input_files(args.input)
+    if not files:
+        print(f"No images found for {args.input}")
+        return 1
+
+    root = input_root(args.input)
+    for path in files:
+        output_path = output_path_for(path, root, args.output)
+        if (os.path.abspath(output_path) == os.path.abspath(path)
+                or (os.path.exists(output_path)
+                    and os.path.samefile(output_path, path))):
+            print(f"Output {output_path} would overwrite its input; "
+                  f"choose an output directory outside the input")
+            return 1
+
+    strip_bytes = int(args.strip_mb * 1024 * 1024) if args.strip_mb else None
+    failures = run_batch(files, args.operations, args.output, args.workers,
+                         strip_bytes, root)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
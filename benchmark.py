@@ -0,0 +1,510 @@
+"""
+Reproducible performance benchmarks for the image operations.
+
+Each case runs on deterministic synthetic images over a matrix of sizes
+(1 to 100 megapixels by default) and parameters. Wall time is measured over
+several repetitions after a warm-up run, and peak memory is measured in a
+separate traced run so that tracing does not skew the timings. Results are
+written as JSON and can be compared against a stored baseline, in which
+case regressions are reported and the exit code is 1.
+
+The GUI cases (display_image, display_channel) drive a real StartWindow
+and run headless on Qt's offscreen platform. Peak memory is what Python and
+NumPy allocate (tracemalloc); memory held by Qt pixmaps is not included.
+
+The parallel case shows core scaling: the same operations on one image
+split across 1, 2, 4 and all available worker processes (one worker is
+plain ops.run_operations).
+
+With --startup, application cold start is measured instead: the time to
+import start_window and to the first paint of the start screen, each in a
+fresh interpreter, checked against a target.
+
+Usage:
+    python main.py benchmark --sizes 1,12 --output results.json
+    python main.py benchmark --baseline baseline.json
+    python main.py benchmark --startup --startup-target-ms 1000
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import frame_pipeline
+import ops
+import parallel
+import utils
+
+DEFAULT_SIZES = (1, 12, 48, 100)
+DEFAULT_REPEAT = 5
+# Relative slowdown (or memory growth) reported as a regression
+DEFAULT_THRESHOLD = 0.15
+# Differences below these are noise, whatever the ratio
+MIN_TIME_DELTA = 0.001
+MIN_MEMORY_DELTA = 1024 * 1024
+# Upscaling cases whose output would exceed this are skipped
+MAX_OUTPUT_MEGAPIXELS = 120
+WINDOW_SIZE = (1280, 800)
+# Operations of the core scaling case, by name
+SCALING_OPERATIONS = {
+    'tone': [('brightness', {'decrease': 20}), ('gamma', {'gamma': 1.2}),
+             ('channel', {'channel': 'G'})],
+    'resize': [('resize', {'mode': 'percent', 'width': 50, 'height': 50,
+                           'keep_aspect_ratio': False})],
+    # A non-integer ratio, where source and target heights rarely share a
+    # large factor and strips cannot be cut on exact periods
+    'resize_33': [('resize', {'mode': 'percent', 'width': 33, 'height': 33,
+                              'keep_aspect_ratio': False})],
+}
+SCALING_WORKERS = sorted({1, 2, 4, parallel.default_workers()})
+# Cold start goal: first paint of the start screen
+DEFAULT_STARTUP_TARGET_MS = 1000
+HEAVY_MODULES = ('cv2', 'numpy', 'PIL', 'camera_widget', 'resize_dialog',
+                 'brightness_dialog', 'rectangle_dialog')
+
+# Run in a fresh interpreter, so nothing is imported or cached beforehand
+STARTUP_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+from start_window import StartWindow
+imported = time.perf_counter()
+
+
+class PaintProbe(QObject):
+    painted = None
+    loaded = None
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.painted is None:
+            self.painted = time.perf_counter()
+            self.loaded = [name for name in %r if name in sys.modules]
+            app.quit()
+        return False
+
+
+app = QApplication(sys.argv)
+probe = PaintProbe()
+app.installEventFilter(probe)
+window = StartWindow()
+app.exec_()
+print(json.dumps({'import_s': imported - start,
+                  'first_paint_s': probe.painted - start,
+                  'loaded': probe.loaded}))
+''' % (HEAVY_MODULES,)
+
+
+def synthetic_image(megapixels, seed=0):
+    """
+        Create a deterministic 4:3 RGB test image.
+
+        Args:
+        - megapixels (float): Approximate image size in megapixels.
+        - seed (int): Seed of the random noise.
+
+        Returns:
+        - numpy.ndarray: uint8 array of shape (height, width, 3).
+        """
+    width = int(round(math.sqrt(megapixels * 1e6 * 4 / 3)))
+    height = int(round(width * 3 / 4))
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def resize_case(image, percent, quality):
+    width, height = ops.compute_target_size(image.shape[1], image.shape[0],
+                                            'percent', percent, percent,
+                                            False)
+    if width * height > MAX_OUTPUT_MEGAPIXELS * 1e6:
+        return None
+    return None, lambda: ops.resize(image, width, height, quality=quality)
+
+
+def brightness_case(image, decrease):
+    return None, lambda: ops.decrease_brightness(image, decrease,
+                                                 out=np.empty_like(image))
+
+
+def channel_case(image, channel):
+    return None, lambda: ops.isolate_channel(image, channel,
+                                             out=np.empty_like(image))
+
+
+def rectangle_case(image, fraction):
+    # Same work as the rectangle task: copy the image, then fill
+    height, width = image.shape[:2]
+    box_width = max(int(width * fraction), 1)
+    box_height = max(int(height * fraction), 1)
+
+    def run():
+        result = image.copy()
+        ops.fill_rectangle(result, (width - box_width) // 2,
+                           (height - box_height) // 2, box_width, box_height)
+        return result
+    return None, run
+
+
+def annotations_case(image, count):
+    # Same work as the annotations task: one copy, then every box drawn
+    height, width = image.shape[:2]
+    rng = np.random.default_rng(count)
+    rectangles = [{'x': int(x), 'y': int(y), 'width': int(width * 0.05),
+                   'height': int(height * 0.05), 'color': ops.BLUE,
+                   'fill': bool(index % 2), 'thickness': 3}
+                  for index, (x, y) in enumerate(zip(
+                      rng.integers(0, width, count),
+                      rng.integers(0, height, count)))]
+
+    def run():
+        return ops.draw_rectangles(image.copy(), rectangles)
+    return None, run
+
+
+def camera_filter_case(image, long_side):
+    # One live preview frame: brightness, a channel and an overlay, compiled
+    pipeline = frame_pipeline.FramePipeline(
+        [('brightness', {'decrease': 30}), ('channel', {'channel': 'R'}),
+         ('rectangle', {'x': 10, 'y': 10, 'width': 100, 'height': 100})],
+        long_side)
+    return None, lambda: pipeline.process(image)
+
+
+def parallel_case(image, operation, workers):
+    operations = SCALING_OPERATIONS[operation]
+    parallel.warm_up(workers)  # worker start-up is not part of the timing
+    return None, lambda: parallel.run_operations_parallel(
+        image, operations, workers, min_bytes=0)
+
+
+def orientation_case(image, orientation, method):
+    if method == 'view':
+        # What the editor pays: a strided view, copied once by the first edit
+        return None, lambda: ops.contiguous(
+            utils.orient_array(image, orientation))
+    pil_image = Image.fromarray(image)
+    pil_image.getexif()[utils.ORIENTATION_TAG] = orientation
+    return None, lambda: utils.correct_image_orientation(pil_image)
+
+
+def display_image_case(image, app, window):
+    # display_image bumps the image version, so every call renders afresh.
+    # Processing events deletes the widgets replaced by the previous call.
+    window.open_image(image)
+    return app.processEvents, lambda: window.display_image(image)
+
+
+def display_channel_case(image, channel, app, window):
+    window.open_image(image)
+    window.display_image(image)
+
+    def setup():
+        app.processEvents()
+        window.image_version += 1
+        window.display_pixmaps = {}
+    return setup, lambda: window.display_channel(channel)
+
+
+# name -> (case function, parameter sets, needs a window)
+CASES = {
+    # 13% is a large non-integer reduction, where the pyramid pays off
+    'resize': (resize_case, [{'percent': percent, 'quality': quality}
+                             for percent in (13, 25, 50, 200)
+                             for quality in ops.RESIZE_QUALITIES], False),
+    'brightness': (brightness_case, [{'decrease': 10}, {'decrease': 50}],
+                   False),
+    'channel': (channel_case, [{'channel': c} for c in ops.CHANNELS], False),
+    'rectangle': (rectangle_case, [{'fraction': 0.1}, {'fraction': 1.0}],
+                  False),
+    'annotations': (annotations_case, [{'count': 100}, {'count': 1000}],
+                    False),
+    'camera_filter': (camera_filter_case,
+                      [{'long_side': None}, {'long_side': 640}], False),
+    'parallel': (parallel_case,
+                 [{'operation': operation, 'workers': workers}
+                  for operation in SCALING_OPERATIONS
+                  for workers in SCALING_WORKERS], False),
+    'orientation': (orientation_case,
+                    [{'orientation': o, 'method': m}
+                     for m in ('view', 'pil') for o in (3, 6, 8)], False),
+    'display_image': (display_image_case, [{}], True),
+    'display_channel': (display_channel_case,
+                        [{'channel': c} for c in ops.CHANNELS], True),
+}
+
+
+def measure(setup, run, repeat):
+    """
+        Time a benchmark step and measure its peak traced allocation.
+
+        Args:
+        - setup (callable): Called before every run, outside the timing, or None.
+        - run (callable): The step to measure.
+        - repeat (int): Number of timed runs after one warm-up run.
+
+        Returns:
+        - dict: Timings in seconds and peak allocation in bytes.
+        """
+    times = []
+    for index in range(repeat + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if index:  # the first run is a warm-up
+            times.append(elapsed)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return {'median_s': statistics.median(times), 'min_s': min(times),
+            'mean_s': statistics.mean(times), 'peak_bytes': peak}
+
+
+def create_window():
+    """
+        Create a StartWindow of a fixed size on Qt's offscreen platform.
+
+        Returns:
+        - tuple: (QApplication, StartWindow).
+        """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from start_window import StartWindow
+
+    app = QApplication.instance() or QApplication([])
+    window = StartWindow()
+    window.resize(*WINDOW_SIZE)
+    return app, window
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, case_names=None,
+                   repeat=DEFAULT_REPEAT):
+    """
+        Run every selected case over every image size and parameter set.
+
+        Args:
+        - sizes (tuple): Image sizes in megapixels.
+        - case_names (list): Names from CASES to run, or None for all.
+        - repeat (int): Timed runs per measurement.
+
+        Returns:
+        - list: One result dict per measurement.
+        """
+    names = case_names or list(CASES)
+    gui = {}
+    if any(CASES[name][2] for name in names):
+        gui['app'], gui['window'] = create_window()
+
+    results = []
+    for megapixels in sizes:
+        image = synthetic_image(megapixels)
+        for name in names:
+            case, parameter_sets, needs_window = CASES[name]
+            for params in parameter_sets:
+                extra = gui if needs_window else {}
+                prepared = case(image, **params, **extra)
+                if prepared is None:
+                    continue
+                result = {'case': name, 'params': params,
+                          'megapixels': megapixels,
+                          'width': image.shape[1], 'height': image.shape[0],
+                          'repeat': repeat}
+                result.update(measure(*prepared, repeat))
+                results.append(result)
+                print(f"{name:16} {format_params(params):28} "
+                      f"{megapixels:>5} MP  {result['median_s'] * 1000:9.2f} ms"
+                      f"  {result['peak_bytes'] / 2 ** 20:8.1f} MB")
+        del image
+    if gui:
+        gui['window'].close()
+    return results
+
+
+def measure_startup(repeat=DEFAULT_REPEAT):
+    """
+        Measure cold start of the GUI in fresh interpreters.
+
+        Args:
+        - repeat (int): Number of application starts.
+
+        Returns:
+        - list: Result dicts for the import time of start_window, the time to
+          the first paint event and the whole process lifetime, in seconds.
+        """
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    directory = os.path.dirname(os.path.abspath(__file__))
+    samples = {'startup.import': [], 'startup.first_paint': [],
+               'startup.process': []}
+    loaded = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE],
+                                cwd=directory, env=env, check=True,
+                                capture_output=True, text=True).stdout
+        samples['startup.process'].append(time.perf_counter() - start)
+        probe = json.loads(output.strip().splitlines()[-1])
+        samples['startup.import'].append(probe['import_s'])
+        samples['startup.first_paint'].append(probe['first_paint_s'])
+        loaded = probe['loaded']
+
+    results = []
+    for name, times in samples.items():
+        results.append({'case': name, 'params': {}, 'megapixels': 0,
+                        'repeat': repeat,
+                        'median_s': statistics.median(times),
+                        'min_s': min(times), 'mean_s': statistics.mean(times),
+                        'peak_bytes': 0})
+        print(f"{name:22} {results[-1]['median_s'] * 1000:9.1f} ms")
+    # Modules that should have been deferred but were loaded before painting
+    results[1]['loaded_before_paint'] = loaded
+    if loaded:
+        print(f"Loaded before first paint: {', '.join(loaded)}")
+    return results
+
+
+def format_params(params):
+    return ' '.join(f"{key}={value}" for key, value in params.items()) or '-'
+
+
+def result_key(result):
+    return (result['case'], json.dumps(result['params'], sort_keys=True),
+            result['megapixels'])
+
+
+def environment():
+    """
+        Returns:
+        - dict: Versions and machine details stored alongside the results.
+        """
+    return {'python': platform.python_version(),
+            'numpy': np.__version__, 'opencv': cv2.__version__,
+            'platform': platform.platform(), 'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+        Compare results against a baseline run.
+
+        Args:
+        - results (list): Result dicts of the current run.
+        - baseline (list): Result dicts of the baseline run.
+        - threshold (float): Relative growth reported as a regression.
+
+        Returns:
+        - list: (result, metric, baseline value, current value) per regression.
+        """
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        for metric, min_delta in (('median_s', MIN_TIME_DELTA),
+                                  ('peak_bytes', MIN_MEMORY_DELTA)):
+            before, after = old[metric], result[metric]
+            if (after > before * (1 + threshold) and
+                    after - before > min_delta):
+                regressions.append((result, metric, before, after))
+    return regressions
+
+
+def parse_sizes(text):
+    try:
+        sizes = [float(size) for size in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid sizes: {text}")
+    if any(size <= 0 for size in sizes):
+        raise argparse.ArgumentTypeError("Sizes must be positive.")
+    return [int(size) if size.is_integer() else size for size in sizes]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='main.py benchmark',
+        description="Benchmark the image operations on synthetic images.")
+    parser.add_argument('--sizes', type=parse_sizes,
+                        default=list(DEFAULT_SIZES),
+                        help="comma-separated image sizes in megapixels"
+                             " (default: 1,12,48,100)")
+    parser.add_argument('--cases', default=None,
+                        help="comma-separated cases to run: "
+                             + ', '.join(CASES))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="timed runs per measurement (default: 5)")
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help="where to write the results as JSON")
+    parser.add_argument('--baseline', default=None,
+                        help="results file to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown reported as a regression"
+                             " (default: 0.15)")
+    parser.add_argument('--startup', action='store_true',
+                        help="measure application cold start instead of"
+                             " the image operations")
+    parser.add_argument('--startup-target-ms', type=float,
+                        default=DEFAULT_STARTUP_TARGET_MS,
+                        help="first paint time to stay under with --startup"
+                             " (default: 1000)")
+    args = parser.parse_args(argv)
+
+    case_names = None
+    if args.cases:
+        case_names = [name.strip() for name in args.cases.split(',')]
+        unknown = [name for name in case_names if name not in CASES]
+        if unknown:
+            parser.error(f"Unknown cases: {', '.join(unknown)}")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    status = 0
+    if args.startup:
+        results = measure_startup(args.repeat)
+        first_paint_ms = results[1]['median_s'] * 1000
+        if first_paint_ms > args.startup_target_ms:
+            print(f"TARGET MISSED first paint {first_paint_ms:.0f} ms >"
+                  f" {args.startup_target_ms:.0f} ms")
+            status = 1
+    else:
+        results = run_benchmarks(args.sizes, case_names, args.repeat)
+    with open(args.output, 'w') as file:
+        json.dump({'environment': environment(), 'results': results}, file,
+                  indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.baseline is None:
+        return status
+    with open(args.baseline) as file:
+        baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.threshold)
+    for result, metric, before, after in regressions:
+        change = f"{after / before - 1:+.0%}" if before else "new"
+        print(f"REGRESSION {result['case']} {format_params(result['params'])}"
+              f" {result['megapixels']} MP {metric}: {before:.4g} -> "
+              f"{after:.4g} ({change})")
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    return 1 if regressions else status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Camera capture on a dedicated thread with a latest-frame ring buffer.
+
+The capture thread reads frames continuously into a small ring of
+preallocated buffers, so the driver queue never backs up behind a slow
+consumer. Consumers only ever see the newest frame; frames they were too
+slow to pick up are dropped. Capture and consumption rates are tracked so
+the preview can report achieved FPS.
+"""
+import threading
+import time
+
+import cv2
+
+
+class FrameRate:
+    """
+        Frames-per-second meter averaged over a sliding one-second window.
+        """
+    def __init__(self, window=1.0):
+        self.window = window
+        self.fps = 0.0
+        self._count = 0
+        self._start = time.perf_counter()
+
+    def tick(self):
+        self._count += 1
+        now = time.perf_counter()
+        elapsed = now - self._start
+        if elapsed >= self.window:
+            self.fps = self._count / elapsed
+            self._count = 0
+            self._start = now
+
+
+class CameraCapture:
+    """
+        Background reader of a cv2.VideoCapture source.
+
+        Attributes:
+        - source (int or str): Camera index or video path passed to cv2.VideoCapture.
+        - buffer_size (int): Number of frame buffers in the ring (at least 3).
+        - capture_rate (FrameRate): Rate at which frames are read from the source.
+        """
+    def __init__(self, source=0, buffer_size=3):
+        self.source = source
+        self.buffer_size = max(buffer_size, 3)
+        self.capture_rate = FrameRate()
+        self.cap = None
+        self._ring = [None] * self.buffer_size
+        self._latest = None  # ring index of the newest complete frame
+        self._reading = None  # ring index currently lent to the consumer
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+                Open the source and start the capture thread.
+
+                Raises:
+                - Exception: If the camera cannot be opened.
+                """
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            raise Exception("Failed to connect to camera.")
+        self.cap = cap
+        # A fresh event per thread, so a thread still stuck in read() after
+        # an earlier stop() never sees this one set
+        self._running = threading.Event()
+        self._running.set()
+        self._thread = threading.Thread(target=self._run,
+                                        args=(cap, self._running),
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+                Stop the capture thread; it releases the source once it exits.
+
+                A read() blocked on the driver can outlast the join timeout; the
+                thread then releases the source when that read returns, never
+                while it is still in use.
+                """
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            if self._thread.is_alive():
+                print("Camera capture thread is still reading; "
+                      "it will release the camera when the read returns")
+            self._thread = None
+        self.cap = None
+
+    def is_running(self):
+        return self._running.is_set()
+
+    def _next_slot(self):
+        with self._lock:
+            for offset in range(1, self.buffer_size + 1):
+                index = ((self._latest or 0) + offset) % self.buffer_size
+                if index != self._latest and index != self._reading:
+                    return index
+        return None
+
+    def _run(self, cap, running):
+        try:
+            while running.is_set():
+                index = self._next_slot()
+                ret, frame = cap.read(self._ring[index])
+                if not running.is_set():
+                    break
+                if not ret:
+                    # End of a file source or a camera hiccup; avoid spinning
+                    time.sleep(0.005)
+                    continue
+                self._ring[index] = frame
+                with self._lock:
+                    self._latest = index
+                    self._sequence += 1
+                self.capture_rate.tick()
+        finally:
+            cap.release()
+
+    def latest(self, copy=False):
+        """
+                Return the newest frame captured so far.
+
+                The returned buffer is lent to the caller until the next call; pass
+                copy=True to keep a frame beyond that.
+
+                Args:
+                - copy (bool): Return a private copy instead of the ring buffer.
+
+                Returns:
+                - tuple: (sequence number, BGR frame), or (0, None) before the first frame.
+                """
+        with self._lock:
+            if self._latest is None:
+                return 0, None
+            self._reading = self._latest
+            frame = self._ring[self._latest]
+            sequence = self._sequence
+        return sequence, frame.copy() if copy else frame
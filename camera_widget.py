@@ -1,15 +1,33 @@
 """
 Module contains the CameraWidget class and supporting functions
 for a PyQt5 widget that displays live camera feed and allows capturing photos.
+
+Channel isolation, a brightness decrease, annotation overlays and a
+reduced preview size can be applied to the live feed. The chosen filters
+are compiled into a FramePipeline whenever they change, and the time it
+takes per frame is shown against the frame budget. Captured photos are
+always taken from the unfiltered frame.
 """
-from PyQt5.QtWidgets import (QWidget, QLabel, QVBoxLayout,
-                             QPushButton, QMessageBox, QSizePolicy)
+from PyQt5.QtWidgets import (QWidget, QLabel, QVBoxLayout, QHBoxLayout,
+                             QPushButton, QMessageBox, QSizePolicy,
+                             QComboBox, QSpinBox, QFileDialog)
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import Qt, QTimer
 import cv2
-import tempfile
-from PIL import Image
-from utils import correct_image_orientation
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from camera_capture import CameraCapture, FrameRate
+from frame_pipeline import FramePipeline
+import tracing
+
+# Combo box label -> channel kept by the live filter (None keeps all)
+CHANNEL_CHOICES = (('All channels', None), ('Red', 'R'), ('Green', 'G'),
+                   ('Blue', 'B'))
+# Combo box label -> long side of the live preview (None is full size)
+PREVIEW_SIZE_CHOICES = (('Full size', None), ('1280 px', 1280),
+                        ('640 px', 640))
+DEFAULT_FRAME_BUDGET_MS = 1000 / 30
 
 
 def create_button(text, slot):
@@ -22,28 +40,95 @@ def create_button(text, slot):
     return button
 
 
+def write_frame(path, frame):
+    """
+        Write a BGR frame to disk, creating the directory if needed.
+
+        Args:
+        - path (str): Destination path; the extension selects the format.
+        - frame (numpy.ndarray): BGR frame.
+
+        Returns:
+        - str: The path written.
+        """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if not cv2.imwrite(path, frame):
+        print(f"Failed to save captured frame to {path}")
+    return path
+
+
 class CameraWidget(QWidget):
     """
         Widget to display live camera feed and capture photos.
 
         Attributes:
         - parent (QWidget): Parent widget that manages this CameraWidget.
-        - cap (cv2.VideoCapture): OpenCV VideoCapture object for camera access.
+        - capture (CameraCapture): Capture thread keeping the newest camera frame.
         - image_label (QLabel): Widget to display the captured image.
+        - fps_label (QLabel): Achieved capture and display frame rates, and
+          the per-frame cost of the live filters.
+        - channel_combo (QComboBox): Channel kept by the live filter.
+        - brightness_spin (QSpinBox): Live brightness decrease in percent.
+        - preview_size_combo (QComboBox): Long side of the live preview.
+        - overlay (list): Annotation rectangles drawn over the live feed.
+        - frame_pipeline (FramePipeline): The filters, compiled for per-frame use.
         - capture_button (QPushButton): Button to capture a photo from the camera.
-        - timer (QTimer): Timer for continuous frame updates from the camera.
+        - timer (QTimer): Timer that polls the capture thread for new frames.
+        - display_rate (FrameRate): Rate at which new frames are shown.
+        - save_directory (str): Directory captured frames are saved to, or None
+          to keep captures in memory only.
+        - save_format (str): File extension used when saving captures ('png' is lossless).
         """
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, save_directory=None, save_format='png'):
         super().__init__()
         self.parent = parent
-        self.cap = None
+        self.capture = CameraCapture(0)
+        self.display_rate = FrameRate()
+        self.last_sequence = 0
+        self.rgb_buffer = None  # filtered frame, reused while the size holds
+        self.q_image = None  # QImage wrapping rgb_buffer
+        self.overlay = []
+        self.frame_pipeline = FramePipeline()
+        self.save_directory = save_directory
+        self.save_format = save_format
+        self.save_executor = None
         self.image_label = QLabel()
         self.image_label.setAlignment(Qt.AlignCenter)
+        self.fps_label = QLabel()
+        self.fps_label.setAlignment(Qt.AlignCenter)
         self.capture_button = create_button('Capture Photo',
                                             self.capture_photo)
 
+        self.channel_combo = QComboBox()
+        for text, channel in CHANNEL_CHOICES:
+            self.channel_combo.addItem(text, channel)
+        self.channel_combo.currentIndexChanged.connect(self.update_filters)
+        self.brightness_spin = QSpinBox()
+        self.brightness_spin.setRange(0, 100)
+        self.brightness_spin.setSuffix('% darker')
+        self.brightness_spin.valueChanged.connect(self.update_filters)
+        self.preview_size_combo = QComboBox()
+        for text, long_side in PREVIEW_SIZE_CHOICES:
+            self.preview_size_combo.addItem(text, long_side)
+        self.preview_size_combo.currentIndexChanged.connect(
+            self.update_filters)
+        self.overlay_button = create_button('Overlay Annotations',
+                                            self.load_overlay)
+        self.clear_overlay_button = create_button('Clear Overlay',
+                                                  self.clear_overlay)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addStretch()
+        for widget in (self.channel_combo, self.brightness_spin,
+                       self.preview_size_combo, self.overlay_button,
+                       self.clear_overlay_button):
+            filter_layout.addWidget(widget)
+        filter_layout.addStretch()
+
         layout = QVBoxLayout()
         layout.addWidget(self.image_label)
+        layout.addWidget(self.fps_label)
+        layout.addLayout(filter_layout)
         layout.addStretch()
         layout.addWidget(self.capture_button, alignment=Qt.AlignCenter)
         layout.addStretch()
@@ -56,54 +141,129 @@ class CameraWidget(QWidget):
 
     def start_camera(self):
         """
-                Starts the camera by initializing VideoCapture and starting the timer for frame updates.
+                Starts the capture thread and the timer that shows its newest frame.
                 Displays an error message if the camera fails to initialize.
                 """
         try:
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
-                raise Exception("Failed to connect to camera.")
+            self.capture.start()
             self.timer.start(10)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"{e}")
 
+    def update_filters(self):
+        """
+                Compile the chosen live filters into a new frame pipeline.
+                """
+        operations = []
+        decrease = self.brightness_spin.value()
+        if decrease:
+            operations.append(('brightness', {'decrease': decrease}))
+        channel = self.channel_combo.currentData()
+        if channel:
+            operations.append(('channel', {'channel': channel}))
+        if self.overlay:
+            operations.append(('annotations', {'rectangles': self.overlay}))
+        self.frame_pipeline = FramePipeline(
+            operations, self.preview_size_combo.currentData())
+
+    def load_overlay(self):
+        """
+                Draw the rectangles of a CSV or JSON annotation file over the feed.
+                """
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, 'Overlay Annotations', '', 'Annotations (*.csv *.json)')
+        if not file_path:
+            return
+        try:
+            import annotations
+            self.overlay = annotations.load_rectangles(file_path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error",
+                                 f"Failed to load annotations: {e}")
+            return
+        self.update_filters()
+
+    def clear_overlay(self):
+        self.overlay = []
+        self.update_filters()
+
+    def frame_budget_ms(self):
+        fps = self.capture.capture_rate.fps
+        return 1000 / fps if fps else DEFAULT_FRAME_BUDGET_MS
+
     def update_frame(self):
         """
-                Updates the camera feed by reading a frame, converting it to RGB format,
-                and displaying it on the image_label widget.
+                Shows the newest captured frame, if there is one that has not been shown.
+                Frames captured in between are skipped. The live filters turn the frame
+                into an RGB buffer owned by the frame pipeline, which a single QImage
+                wraps for as long as the buffer is reused.
                 """
         try:
-            ret, frame = self.cap.read()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                image = QImage(frame, frame.shape[1], frame.shape[0],
-                               QImage.Format_RGB888)
-                self.image_label.setPixmap(QPixmap.fromImage(image))
+            sequence, frame = self.capture.latest()
+            if frame is None or sequence == self.last_sequence:
+                return
+            self.last_sequence = sequence
+
+            with tracing.span('camera.filter'):
+                image = self.frame_pipeline.process(frame)
+            if image is not self.rgb_buffer:
+                self.rgb_buffer = image
+                self.q_image = QImage(image.data, image.shape[1],
+                                      image.shape[0], image.strides[0],
+                                      QImage.Format_RGB888)
+            with tracing.span('camera.to_pixmap'):
+                pixmap = QPixmap.fromImage(self.q_image)
+            with tracing.span('camera.show'):
+                self.image_label.setPixmap(pixmap)
+
+            self.display_rate.tick()
+            self.fps_label.setText(
+                f"Capture: {self.capture.capture_rate.fps:.1f} FPS | "
+                f"Display: {self.display_rate.fps:.1f} FPS | "
+                f"Filters: {self.frame_pipeline.frame_ms:.1f} ms of "
+                f"{self.frame_budget_ms():.0f} ms")
         except Exception as e:
             QMessageBox.critical(self, "Error",
                                  f"Failed to update frame: {e}")
 
     def capture_photo(self):
         """
-                Captures a photo from the camera, saves it as a temporary file,
-                and displays the captured image using the parent widget's display_image method.
+                Captures a photo from the camera and hands the frame straight to the
+                parent widget's open_image method, converting BGR to RGB once.
+                If a save directory is configured, the raw frame is also written to
+                disk in the background.
                 """
         try:
-            ret, frame = self.cap.read()
-            if ret:
-                temp_file = tempfile.NamedTemporaryFile(delete=False,
-                                                        suffix='.jpg')
-                cv2.imwrite(temp_file.name, frame)
-                temp_file.close()
-
-                pil_image = Image.open(temp_file.name)
-                pil_image = correct_image_orientation(pil_image)
-                self.parent.display_image(pil_image)
+            _, frame = self.capture.latest(copy=True)
+            if frame is not None:
+                if self.save_directory:
+                    self.save_frame(frame)
+                self.parent.open_image(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
         except Exception as e:
             QMessageBox.critical(self, "Error",
                                  f"Failed to capture photo: {e}")
 
+    def save_frame(self, frame):
+        """
+                Queue a BGR camera frame to be written to the save directory.
+
+                Args:
+                - frame (numpy.ndarray): Frame as returned by cv2.VideoCapture.read.
+
+                Returns:
+                - concurrent.futures.Future: Resolves to the saved file path.
+                """
+        if self.save_executor is None:
+            self.save_executor = ThreadPoolExecutor(max_workers=1)
+        file_name = (f"capture_{datetime.now():%Y%m%d_%H%M%S_%f}."
+                     f"{self.save_format}")
+        path = os.path.join(self.save_directory, file_name)
+        return self.save_executor.submit(write_frame, path, frame)
+
     def release_camera(self):
-        if self.cap is not None:
-            self.timer.stop()
-            self.cap.release()
+        self.timer.stop()
+        self.capture.stop()
+        if self.save_executor is not None:
+            # Pending saves still complete; only the GUI stops waiting
+            self.save_executor.shutdown(wait=False)
+            self.save_executor = None
@@ -0,0 +1,259 @@
+"""
+Lazy edit graph: the source image plus the ordered edits applied to it.
+
+The editor only ever shows a downscaled image, so edits are recorded here
+in full-resolution coordinates and evaluated interactively on a preview
+proxy whose long side is at most PREVIEW_LONG_SIDE pixels. The chain is
+executed at full resolution only when the result is exported. Geometric
+parameters (rectangle coordinates, resize targets) are mapped between the
+two scales stage by stage, since a resize changes the scale of everything
+after it.
+"""
+import ops
+import parallel
+import tiled
+
+PREVIEW_LONG_SIDE = 2048
+# Above this size export runs strip by strip on memory-mapped scratch files
+TILED_EXPORT_BYTES = 256 * 1024 * 1024
+
+
+def fit_size(width, height, long_side):
+    """
+        Scale (width, height) down so that the longer side is at most long_side.
+
+        Args:
+        - width (int): Full-resolution width.
+        - height (int): Full-resolution height.
+        - long_side (int): Maximum length of the longer side, or None for no limit.
+
+        Returns:
+        - tuple: (width, height) of the scaled size; never larger than the input.
+        """
+    if long_side is None or max(width, height) <= long_side:
+        return width, height
+    scale = long_side / max(width, height)
+    return max(int(round(width * scale)), 1), max(int(round(height * scale)), 1)
+
+
+def output_size(size, operation):
+    """
+        Size of the image after an operation, computed without touching pixels.
+
+        Args:
+        - size (tuple): (width, height) before the operation.
+        - operation (tuple): (name, params).
+
+        Returns:
+        - tuple: (width, height) after the operation.
+        """
+    name, params = operation
+    if name == 'resize':
+        return ops.compute_target_size(size[0], size[1], **params)
+    return size
+
+
+def scale_operation(operation, full_size, long_side):
+    """
+        Map a full-resolution operation onto the proxy of the same stage.
+
+        Args:
+        - operation (tuple): (name, params) in full-resolution coordinates.
+        - full_size (tuple): Full-resolution (width, height) before the operation.
+        - long_side (int): Proxy long side limit, or None for full resolution.
+
+        Returns:
+        - tuple: (name, params) for the proxy image.
+        """
+    name, params = operation
+    if name == 'resize':
+        # The proxy follows the output size: an enlargement past long_side
+        # must not leave a full-resolution proxy behind
+        target = output_size(full_size, operation)
+        width, height = fit_size(target[0], target[1], long_side)
+        return name, {'mode': 'pixels', 'width': width, 'height': height,
+                      'keep_aspect_ratio': False,
+                      'quality': params.get('quality',
+                                            ops.DEFAULT_RESIZE_QUALITY)}
+
+    # Every stage's proxy is fit_size() of its full-resolution size, as the
+    # initial proxy and every proxy resize above are
+    scaled_size = fit_size(full_size[0], full_size[1], long_side)
+    if scaled_size == tuple(full_size):
+        return operation
+    if name == 'rectangle':
+        scale_x = scaled_size[0] / full_size[0]
+        scale_y = scaled_size[1] / full_size[1]
+        return name, {'x': int(round(params['x'] * scale_x)),
+                      'y': int(round(params['y'] * scale_y)),
+                      'width': max(int(round(params['width'] * scale_x)), 1),
+                      'height': max(int(round(params['height'] * scale_y)),
+                                    1)}
+    if name == 'annotations':
+        scale_x = scaled_size[0] / full_size[0]
+        scale_y = scaled_size[1] / full_size[1]
+        rectangles = []
+        for rectangle in params['rectangles']:
+            scaled = dict(rectangle)
+            scaled.update(
+                x=int(round(rectangle['x'] * scale_x)),
+                y=int(round(rectangle['y'] * scale_y)),
+                width=max(int(round(rectangle['width'] * scale_x)), 1),
+                height=max(int(round(rectangle['height'] * scale_y)), 1),
+                thickness=max(int(round(rectangle['thickness'] *
+                                        min(scale_x, scale_y))), 1))
+            rectangles.append(scaled)
+        return name, {'rectangles': rectangles}
+    return operation
+
+
+class EditGraph:
+    """
+        Source image and the edits recorded against it.
+
+        The full-resolution source may arrive after the preview (see
+        set_source); everything except materialize works without it.
+
+        Attributes:
+        - source (numpy.ndarray): Full-resolution RGB image, never modified;
+          may be a strided view (e.g. an orientation transform) and is None
+          while it is still being decoded.
+        - operations (list): (name, params) tuples in full-resolution coordinates.
+        - long_side (int): Long side limit of the preview proxy.
+        """
+    def __init__(self, source, long_side=PREVIEW_LONG_SIDE, size=None,
+                 preview_source=None):
+        """
+                Args:
+                - source (numpy.ndarray): Full-resolution image, or None if not decoded yet.
+                - long_side (int): Long side limit of the preview proxy.
+                - size (tuple): Full-resolution (width, height); required without source.
+                - preview_source (numpy.ndarray): Proxy-sized image to use instead of
+                  downscaling source, e.g. from a reduced-resolution decode.
+                """
+        self.source = source
+        self.operations = []
+        self.long_side = long_side
+        self._size = size or (source.shape[1], source.shape[0])
+        self._preview_source = None
+        if preview_source is not None:
+            width, height = fit_size(*self._size, long_side)
+            if preview_source.shape[:2] != (height, width):
+                preview_source = ops.resize(preview_source, width, height)
+            self._preview_source = ops.contiguous(preview_source)
+
+    def source_size(self):
+        return self._size
+
+    def has_source(self):
+        return self.source is not None
+
+    def set_source(self, source):
+        """
+                Provide the full-resolution image once it has been decoded.
+
+                Args:
+                - source (numpy.ndarray): Image of exactly source_size().
+                """
+        if (source.shape[1], source.shape[0]) != self._size:
+            raise ValueError("Decoded image size does not match the header.")
+        self.source = source
+
+    def output_size(self):
+        """
+                Returns:
+                - tuple: Full-resolution (width, height) after all recorded edits.
+                """
+        size = self.source_size()
+        for operation in self.operations:
+            size = output_size(size, operation)
+        return size
+
+    def push(self, operation):
+        self.operations.append(operation)
+
+    def pop(self):
+        return self.operations.pop()
+
+    def preview_source(self):
+        """
+                Returns:
+                - numpy.ndarray: The source image downscaled to proxy size (cached).
+                """
+        if self._preview_source is None:
+            width, height = fit_size(*self.source_size(), self.long_side)
+            if (width, height) == self.source_size():
+                self._preview_source = ops.contiguous(self.source)
+            else:
+                self._preview_source = ops.resize(ops.contiguous(self.source),
+                                                  width, height)
+        return self._preview_source
+
+    def preview_operation(self, operation):
+        """
+                Map a new full-resolution operation onto the current preview image.
+
+                Args:
+                - operation (tuple): (name, params) about to be pushed.
+
+                Returns:
+                - tuple: (name, params) to apply to the preview image.
+                """
+        return scale_operation(operation, self.output_size(), self.long_side)
+
+    def scaled_operations(self, long_side):
+        """
+                Map the whole chain onto an image fitted into long_side.
+
+                Args:
+                - long_side (int): Long side limit, or None for full resolution.
+
+                Returns:
+                - list: (name, params) tuples for the scaled image.
+                """
+        size = self.source_size()
+        scaled = []
+        for operation in self.operations:
+            scaled.append(scale_operation(operation, size, long_side))
+            size = output_size(size, operation)
+        return scaled
+
+    def evaluate_preview(self):
+        """
+                Re-run the whole chain on the preview proxy.
+
+                Returns:
+                - numpy.ndarray: The preview image after all edits.
+                """
+        return ops.run_operations(self.preview_source(),
+                                  self.scaled_operations(self.long_side),
+                                  in_place=False)
+
+    def materialize(self):
+        """
+                Run the chain at full resolution, for export.
+
+                Large images go through the tiled engine, which gives the same
+                pixels with memory bounded to a few strips; others are split
+                across the CPU cores by the parallel executor.
+
+                Returns:
+                - numpy.ndarray: The full-resolution edited image.
+                """
+        if self.source is None:
+            raise ValueError("The full-resolution image is still loading.")
+        if self.source.nbytes > TILED_EXPORT_BYTES:
+            return tiled.run_operations_tiled(self.source,
+                                              list(self.operations))
+        return parallel.run_operations_parallel(self.source,
+                                                list(self.operations))
+
+    def snapshot(self):
+        """
+                Returns:
+                - EditGraph: Copy sharing the source, safe to evaluate in the background.
+                """
+        graph = EditGraph(self.source, self.long_side, self._size,
+                          self._preview_source)
+        graph.operations = list(self.operations)
+        return graph
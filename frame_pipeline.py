@@ -0,0 +1,156 @@
+"""
+Operation chains compiled for per-frame use on a live video feed.
+
+The editor's operations are dispatched one by one on stills; a camera
+preview instead applies the same chain to every frame within the frame
+budget. FramePipeline compiles the chain once per setting change and frame
+size into a short list of steps over preallocated buffers:
+- an optional downscale to the preview size, done first on the camera's
+  BGR frame so every later step touches fewer pixels;
+- the BGR to RGB conversion the display needs anyway;
+- every run of point operations and channel isolations, fused into a
+  single three-channel lookup table pass;
+- resizes, rectangles and annotations, with their parameters precomputed.
+
+Geometric parameters are given in camera frame coordinates and scaled to
+the preview size like the edit graph does for its proxy. Point operations
+run after the preview downscale rather than before it, so a preview can
+differ slightly from the same chain applied to the captured still.
+"""
+import time
+
+import cv2
+import numpy as np
+
+import edit_graph
+import ops
+import point_ops
+
+
+def channel_luts(operations):
+    """
+        Fuse point operations and channel isolations into per-channel tables.
+
+        Args:
+        - operations (list): (name, params) tuples, each a point operation
+          or 'channel'.
+
+        Returns:
+        - numpy.ndarray: (256, 1, 3) uint8 table for cv2.LUT on an RGB image.
+        """
+    tables = [point_ops.identity_lut() for _ in ops.CHANNELS]
+    for name, params in operations:
+        if name == 'channel':
+            if params['channel'] not in ops.CHANNELS:
+                raise ValueError("Channel must be one of R, G, B.")
+            kept = ops.CHANNELS.index(params['channel'])
+            for index in range(len(tables)):
+                if index != kept:
+                    tables[index] = np.zeros(256, dtype=np.uint8)
+        else:
+            lut = point_ops.lut_for(name, params)
+            tables = [lut[table] for table in tables]
+    return np.ascontiguousarray(np.stack(tables, axis=-1)[:, np.newaxis])
+
+
+def is_fusable(name):
+    return name == 'channel' or point_ops.is_point_operation(name)
+
+
+class FramePipeline:
+    """
+        An operation chain compiled for BGR frames of one size.
+
+        Attributes:
+        - operations (list): (name, params) tuples in frame coordinates.
+        - long_side (int): Preview long side limit, or None for full size.
+        - frame_ms (float): Cost of the last processed frame in milliseconds.
+        """
+    def __init__(self, operations=(), long_side=None):
+        for name, params in operations:
+            if not is_fusable(name) and name not in ('resize', 'rectangle',
+                                                     'annotations'):
+                raise ValueError(f"Unknown operation: {name}")
+            if is_fusable(name):
+                channel_luts([(name, params)])  # validate up front
+        self.operations = list(operations)
+        self.long_side = long_side
+        self.frame_ms = 0.0
+        self._shape = None
+        self._steps = []
+
+    def compile(self, shape):
+        """
+                Build the steps and buffers for frames of the given shape.
+
+                Args:
+                - shape (tuple): (height, width, 3) of the camera frames.
+                """
+        height, width = shape[:2]
+        size = (width, height)
+        steps = []
+        preview = edit_graph.fit_size(width, height, self.long_side)
+        if preview != size:
+            scaled = np.empty((preview[1], preview[0], 3), np.uint8)
+            steps.append(lambda frame, target=preview: ops.resize(
+                frame, *target, out=scaled, quality='fast'))
+        rgb = np.empty((preview[1], preview[0], 3), np.uint8)
+        steps.append(lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB,
+                                                dst=rgb))
+
+        pending = []
+        for operation in self.operations:
+            name = operation[0]
+            if is_fusable(name):
+                pending.append(operation)
+                continue
+            self._add_lut_step(steps, pending)
+            pending = []
+            name, params = edit_graph.scale_operation(operation, size,
+                                                      self.long_side)
+            size = edit_graph.output_size(size, operation)
+            steps.append(self._compile_step(name, params, preview))
+            preview = edit_graph.output_size(preview, (name, params))
+        self._add_lut_step(steps, pending)
+        self._steps = steps
+        self._shape = shape
+
+    def _add_lut_step(self, steps, operations):
+        if operations:
+            lut = channel_luts(operations)
+            steps.append(lambda image: cv2.LUT(image, lut, dst=image))
+
+    def _compile_step(self, name, params, size):
+        if name == 'resize':
+            target = ops.compute_target_size(size[0], size[1], **params)
+            out = np.empty((target[1], target[0], 3), np.uint8)
+            quality = params.get('quality', ops.DEFAULT_RESIZE_QUALITY)
+            return lambda image: ops.resize(image, *target, out=out,
+                                            quality=quality)
+        if name == 'rectangle':
+            return lambda image: ops.fill_rectangle(
+                image, params['x'], params['y'], params['width'],
+                params['height'])
+        return lambda image: ops.draw_rectangles(image, params['rectangles'])
+
+    def process(self, frame):
+        """
+                Apply the chain to one BGR frame.
+
+                The frame is not modified. The result is a buffer owned by the
+                pipeline and reused for the next frame of the same size.
+
+                Args:
+                - frame (numpy.ndarray): BGR frame from cv2.VideoCapture.
+
+                Returns:
+                - numpy.ndarray: The processed RGB image.
+                """
+        start = time.perf_counter()
+        if frame.shape != self._shape:
+            self.compile(frame.shape)
+        image = frame
+        for step in self._steps:
+            image = step(image)
+        self.frame_ms = (time.perf_counter() - start) * 1000
+        return image
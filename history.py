@@ -0,0 +1,331 @@
+"""
+Memory-bounded undo/redo history for the working image.
+
+Each entry records the edit as an operation for the edit graph, plus the
+cheapest representation that can restore the displayed image:
+- a rectangle or annotation edit keeps only the pixels it covered, before
+  and after;
+- any other edit is replayed from its parameters for redo and keeps a
+  losslessly compressed copy of the full frame it replaced for undo.
+
+The history has a byte budget. When stored data exceeds it, the oldest
+entries are spilled to a scratch directory on disk (or dropped when spilling
+is disabled) until the in-memory size fits again.
+
+Entries are only changed on the GUI thread. Undo and redo tasks on a worker
+thread read a spilled entry's data with read(), which leaves the entry as
+it is. The data is handed back to EditHistory.mark_undone or mark_redone,
+which keep it in memory again and re-check the budget.
+"""
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+import ops
+
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+
+def remove_spilled(path):
+    # Already gone if the history was cleared in the meantime
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class PatchEntry:
+    """
+        Undo record of an edit confined to a rectangle.
+
+        Attributes:
+        - label (str): Description of the edit.
+        - operation (tuple): (name, params) of the edit in full resolution.
+        - x (int): Left coordinate of the patch.
+        - y (int): Top coordinate of the patch.
+        - before (numpy.ndarray): Pixels of the region before the edit.
+        - after (numpy.ndarray): Pixels of the region after the edit.
+        """
+    replays_redo = False
+
+    def __init__(self, label, operation, x, y, before, after):
+        self.label = label
+        self.operation = operation
+        self.x = x
+        self.y = y
+        self.before = before
+        self.after = after
+        self.spill_path = None
+
+    @classmethod
+    def capture(cls, label, operation, before_image, after_image,
+                x, y, width, height):
+        """
+                Build an entry from the images before and after a rectangle edit.
+
+                Args:
+                - label (str): Description of the edit.
+                - operation (tuple): (name, params) of the edit in full resolution.
+                - before_image (numpy.ndarray): Image before the edit.
+                - after_image (numpy.ndarray): Image after the edit.
+                - x, y, width, height (int): Rectangle as passed to ops.fill_rectangle.
+
+                Returns:
+                - PatchEntry: The new entry.
+                """
+        # cv2.rectangle includes the far corner, hence the + 1
+        rows = slice(max(y, 0), y + height + 1)
+        cols = slice(max(x, 0), x + width + 1)
+        return cls(label, operation, cols.start, rows.start,
+                   before_image[rows, cols].copy(),
+                   after_image[rows, cols].copy())
+
+    def nbytes(self):
+        if self.spill_path is not None:
+            return 0
+        return self.before.nbytes + self.after.nbytes
+
+    def spill(self, directory):
+        path = os.path.join(directory, f"{id(self)}.npz")
+        np.savez(path, before=self.before, after=self.after)
+        # The file is complete before the arrays go, for read()
+        self.spill_path = path
+        self.before = self.after = None
+
+    def read(self):
+        """
+                Return the patches, from disk if spilled, without changing the entry.
+
+                Returns:
+                - tuple: (before, after) patches.
+                """
+        before, after = self.before, self.after
+        if before is not None:
+            return before, after
+        with np.load(self.spill_path) as data:
+            return data['before'], data['after']
+
+    def restore(self, data):
+        """
+                Keep data returned by read() in memory and remove the spilled file.
+                """
+        if self.spill_path is not None:
+            self.before, self.after = data
+            remove_spilled(self.spill_path)
+            self.spill_path = None
+
+    def _apply(self, image, patch):
+        result = image.copy()
+        height, width = patch.shape[:2]
+        result[self.y:self.y + height, self.x:self.x + width] = patch
+        return result
+
+    def undo(self, image, data=None):
+        """
+                Args:
+                - image (numpy.ndarray): Image as it is after the edit.
+                - data (tuple): The result of read(); read here if None.
+                """
+        before, _ = data or self.read()
+        return self._apply(image, before)
+
+    def redo(self, image, operation=None, data=None):
+        _, after = data or self.read()
+        return self._apply(image, after)
+
+
+class FrameEntry:
+    """
+        Undo record of an edit that can change every pixel or the image size.
+
+        Attributes:
+        - label (str): Description of the edit.
+        - operation (tuple): (name, params) of the edit in full resolution.
+        - frame (numpy.ndarray): PNG-encoded image before the edit.
+        """
+    # Redo replays the operation and never needs the stored frame
+    replays_redo = True
+
+    def __init__(self, label, operation, frame):
+        self.label = label
+        self.operation = operation
+        self.frame = frame
+        self.spill_path = None
+
+    @classmethod
+    def capture(cls, label, operation, before_image):
+        """
+                Build an entry by compressing the image an operation is about to replace.
+
+                Args:
+                - label (str): Description of the edit.
+                - operation (tuple): (name, params) of the edit in full resolution.
+                - before_image (numpy.ndarray): Image before the edit.
+
+                Returns:
+                - FrameEntry: The new entry.
+                """
+        # PNG is lossless; channel order is irrelevant for a round trip
+        ok, frame = cv2.imencode('.png', before_image,
+                                 [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        if not ok:
+            raise ValueError("Failed to compress image for undo history.")
+        return cls(label, operation, frame)
+
+    def nbytes(self):
+        if self.spill_path is not None:
+            return 0
+        return self.frame.nbytes
+
+    def spill(self, directory):
+        path = os.path.join(directory, f"{id(self)}.png")
+        self.frame.tofile(path)
+        # The file is complete before the frame goes, for read()
+        self.spill_path = path
+        self.frame = None
+
+    def read(self):
+        """
+                Return the compressed frame, from disk if spilled, without
+                changing the entry.
+                """
+        frame = self.frame
+        if frame is not None:
+            return frame
+        return np.fromfile(self.spill_path, dtype=np.uint8)
+
+    def restore(self, data):
+        """
+                Keep data returned by read() in memory and remove the spilled file.
+                """
+        if self.spill_path is not None:
+            self.frame = data
+            remove_spilled(self.spill_path)
+            self.spill_path = None
+
+    def undo(self, image, data=None):
+        """
+                Args:
+                - image (numpy.ndarray): Image as it is after the edit (unused).
+                - data (numpy.ndarray): The result of read(); read here if None.
+                """
+        frame = data if data is not None else self.read()
+        return cv2.imdecode(frame, cv2.IMREAD_UNCHANGED)
+
+    def redo(self, image, operation=None, data=None):
+        """
+                Replay the edit on image.
+
+                Args:
+                - image (numpy.ndarray): Image as it was before the edit.
+                - operation (tuple): The edit mapped to the resolution of image;
+                  defaults to self.operation.
+                - data: Unused; redo never needs the stored frame.
+                """
+        name, params = operation or self.operation
+        return ops.apply_operation(image.copy(), name, params)
+
+
+class EditHistory:
+    """
+        Undo and redo stacks with a byte budget for the data kept in memory.
+
+        Entries are created off the GUI thread with PatchEntry.capture or
+        FrameEntry.capture and pushed once the edit has been applied.
+        """
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES, spill_to_disk=True):
+        """
+                Args:
+                - budget_bytes (int): Maximum bytes of undo data kept in memory.
+                - spill_to_disk (bool): Spill entries over budget to disk
+                  instead of dropping them.
+                """
+        self.budget_bytes = budget_bytes
+        self.spill_to_disk = spill_to_disk
+        self.undo_stack = []
+        self.redo_stack = []
+        self._spill_dir = None
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def memory_bytes(self):
+        return sum(entry.nbytes()
+                   for entry in self.undo_stack + self.redo_stack)
+
+    def push(self, entry):
+        """
+                Record a new edit; this discards everything that could be redone.
+                """
+        self.undo_stack.append(entry)
+        self._discard(self.redo_stack)
+        self.redo_stack = []
+        self._enforce_budget()
+
+    def mark_undone(self, entry, data=None):
+        """
+                Move entry from the undo to the redo stack once its undo is displayed.
+
+                Args:
+                - entry: The undone entry.
+                - data: What the undo task read with entry.read(), kept in
+                  memory again if the entry was spilled.
+                """
+        self.undo_stack.remove(entry)
+        self.redo_stack.append(entry)
+        self._restore(entry, data)
+
+    def mark_redone(self, entry, data=None):
+        """
+                Move entry from the redo to the undo stack once its redo is displayed.
+
+                Args:
+                - entry: The redone entry.
+                - data: What the redo task read with entry.read(), or None.
+                """
+        self.redo_stack.remove(entry)
+        self.undo_stack.append(entry)
+        self._restore(entry, data)
+
+    def _restore(self, entry, data):
+        if data is not None:
+            entry.restore(data)
+        self._enforce_budget()
+
+    def clear(self):
+        """
+                Forget all entries and remove spilled files.
+                """
+        self._discard(self.undo_stack + self.redo_stack)
+        self.undo_stack = []
+        self.redo_stack = []
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _discard(self, entries):
+        for entry in entries:
+            if entry.spill_path is not None and \
+                    os.path.exists(entry.spill_path):
+                os.remove(entry.spill_path)
+
+    def _enforce_budget(self):
+        # Oldest undo entries go first, then the redo entries farthest away
+        candidates = self.undo_stack[:-1] + self.redo_stack[:-1]
+        for entry in candidates:
+            if self.memory_bytes() <= self.budget_bytes:
+                return
+            if entry.nbytes() == 0:
+                continue
+            if self.spill_to_disk:
+                if self._spill_dir is None:
+                    self._spill_dir = tempfile.mkdtemp(prefix='undo_')
+                entry.spill(self._spill_dir)
+            elif entry in self.undo_stack:
+                self.undo_stack.remove(entry)
+            else:
+                self.redo_stack.remove(entry)
@@ -0,0 +1,154 @@
+"""
+Session cache of decoded images and their display pixmaps.
+
+Going back to the start screen and re-opening a recent file would otherwise
+read, decode and orient it again, and rebuild every pixmap shown for it.
+Entries are keyed by the file's absolute path, modification time and size,
+so a file changed on disk is decoded afresh. Each entry keeps the decoded
+full-resolution source (once known), the preview proxy and the pixmaps
+rendered for the unedited image; the least recently used entries are
+evicted once their total size passes the memory cap.
+
+The cap defaults to DEFAULT_MAX_MB and can be set with the
+PHOTO_EDITOR_IMAGE_CACHE_MB environment variable (0 disables the cache).
+"""
+import collections
+import os
+
+CACHE_ENV = 'PHOTO_EDITOR_IMAGE_CACHE_MB'
+DEFAULT_MAX_MB = 512
+
+
+def file_key(file_path):
+    """
+        Args:
+        - file_path (str): Path of an image file.
+
+        Returns:
+        - tuple: (absolute path, mtime in ns, size in bytes), or None if the
+          file cannot be stat'ed.
+        """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+
+def max_bytes_from_environment():
+    """
+        Returns:
+        - int: Cache cap in bytes from PHOTO_EDITOR_IMAGE_CACHE_MB, or the default.
+        """
+    value = os.environ.get(CACHE_ENV)
+    try:
+        megabytes = float(value) if value else DEFAULT_MAX_MB
+    except ValueError:
+        print(f"Ignoring {CACHE_ENV}={value!r}: not a number")
+        megabytes = DEFAULT_MAX_MB
+    return int(max(megabytes, 0) * 1024 * 1024)
+
+
+class CachedImage:
+    """
+        A decoded image file.
+
+        Attributes:
+        - source (numpy.ndarray): Full-resolution upright image, or None while
+          only the reduced JPEG decode is known.
+        - preview (numpy.ndarray): Preview proxy of the source.
+        - size (tuple): Full-resolution (width, height).
+        - pixmaps (dict): Key -> QPixmap renders of the unedited image.
+        """
+    def __init__(self, source, preview, size):
+        self.source = source
+        self.preview = preview
+        self.size = size
+        self.pixmaps = {}
+
+    def nbytes(self):
+        total = self.preview.nbytes
+        # An image that needed no proxy shares its array with the preview
+        if self.source is not None and self.source is not self.preview:
+            total += self.source.nbytes
+        for pixmap in self.pixmaps.values():
+            total += pixmap.width() * pixmap.height() * pixmap.depth() // 8
+        return total
+
+
+class ImageCache:
+    """
+        Least recently used cache of CachedImage entries under a memory cap.
+
+        Attributes:
+        - max_bytes (int): Memory cap; entries are evicted past it.
+        - hits (int): Lookups answered from the cache.
+        - misses (int): Lookups that needed a decode.
+        - evictions (int): Entries dropped to stay under max_bytes.
+        """
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = max_bytes_from_environment()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()  # file key -> CachedImage
+
+    def get(self, key):
+        """
+                Returns:
+                - CachedImage: The entry for key, or None.
+                """
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """
+                Store entry as the most recently used one and enforce the cap.
+
+                Returns:
+                - CachedImage: entry, or None if it does not fit at all.
+                """
+        if key is None or entry.nbytes() > self.max_bytes:
+            return None
+        # Versions of the file from before it changed on disk are dead
+        for stale in [cached for cached in self._entries
+                      if cached[0] == key[0] and cached != key]:
+            del self._entries[stale]
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self.trim()
+        return entry
+
+    def trim(self):
+        """
+                Evict least recently used entries until the cache fits max_bytes.
+
+                Call after an entry grew, e.g. when its full-resolution source
+                arrived or a pixmap was added.
+                """
+        total = self.nbytes()
+        while total > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes()
+            self.evictions += 1
+
+    def nbytes(self):
+        return sum(entry.nbytes() for entry in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summary(self):
+        return (f"Image cache: {self.hits} hits, {self.misses} misses, "
+                f"{self.evictions} evictions, {len(self)} images, "
+                f"{self.nbytes() / (1024 * 1024):.1f} MB")
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,169 @@
+"""
+Per-channel histograms and intensity statistics of the working image.
+
+Histograms are computed with cv2.calcHist and cached against the image
+version counter. A first estimate comes from a small pyramid level, so the
+statistics panel opens at once; the exact histogram of the working image is
+then computed in the background. An edit confined to a rectangle does not
+need a full recount: the pixels it replaced are subtracted and the new ones
+added (see update_histograms).
+"""
+import collections
+
+import cv2
+import numpy as np
+
+import ops
+import tracing
+
+# Long side of the pyramid level the first estimate is computed from
+ESTIMATE_LONG_SIDE = 256
+CACHE_SIZE = 8
+
+
+def compute_histograms(image):
+    """
+        Args:
+        - image (numpy.ndarray): RGB image.
+
+        Returns:
+        - numpy.ndarray: (3, 256) int64 counts, one row per channel in RGB order.
+        """
+    return np.stack([
+        cv2.calcHist([image], [index], None, [256], [0, 256]).ravel()
+        for index in range(len(ops.CHANNELS))]).astype(np.int64)
+
+
+def update_histograms(histograms, before, after):
+    """
+        Histograms of an image after an edit that replaced one region.
+
+        Args:
+        - histograms (numpy.ndarray): Exact histograms before the edit.
+        - before (numpy.ndarray): Pixels of the region before the edit.
+        - after (numpy.ndarray): Pixels of the same region after the edit.
+
+        Returns:
+        - numpy.ndarray: New (3, 256) counts; histograms is not modified.
+        """
+    return (histograms - compute_histograms(before)
+            + compute_histograms(after))
+
+
+def channel_statistics(histogram):
+    """
+        Summary statistics of one channel.
+
+        Args:
+        - histogram (numpy.ndarray): 256 counts of the channel.
+
+        Returns:
+        - dict: 'mean', 'min' and 'max' intensity, and 'dark' and 'bright',
+          the percentage of pixels clipped at 0 and at 255.
+        """
+    total = histogram.sum()
+    if not total:
+        return {'mean': 0.0, 'min': 0, 'max': 0, 'dark': 0.0, 'bright': 0.0}
+    present = np.flatnonzero(histogram)
+    return {'mean': float(np.dot(histogram, np.arange(256)) / total),
+            'min': int(present[0]), 'max': int(present[-1]),
+            'dark': float(histogram[0] * 100 / total),
+            'bright': float(histogram[255] * 100 / total)}
+
+
+class ImageStatistics:
+    """
+        Histograms of one image version.
+
+        Attributes:
+        - histograms (numpy.ndarray): (3, 256) counts in RGB order.
+        - exact (bool): False for an estimate from a downscaled level.
+        - channels (dict): Channel ('R', 'G', 'B') -> channel_statistics().
+        """
+    def __init__(self, histograms, exact):
+        self.histograms = histograms
+        self.exact = exact
+        self.channels = {channel: channel_statistics(histogram)
+                         for channel, histogram in zip(ops.CHANNELS,
+                                                       histograms)}
+
+
+class StatisticsCache:
+    """
+        Statistics of recent image versions, exact ones preferred over estimates.
+        """
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = collections.OrderedDict()  # version -> ImageStatistics
+
+    def get(self, version):
+        """
+                Returns:
+                - ImageStatistics: Cached statistics of version, or None.
+                """
+        statistics = self._entries.get(version)
+        if statistics is not None:
+            self._entries.move_to_end(version)
+        return statistics
+
+    def put(self, version, statistics):
+        """
+                Store statistics unless an exact result is already cached.
+                """
+        cached = self._entries.get(version)
+        if cached is not None and cached.exact and not statistics.exact:
+            return
+        self._entries[version] = statistics
+        self._entries.move_to_end(version)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def derive(self, version, new_version, before, after):
+        """
+                Cache exact statistics of new_version from those of version.
+
+                Nothing is done unless version has exact statistics, so edits
+                made while the panel has never been opened cost nothing.
+
+                Args:
+                - version (int): Version the region was edited in.
+                - new_version (int): Version after the edit.
+                - before (numpy.ndarray): Pixels of the region before the edit.
+                - after (numpy.ndarray): Pixels of the region after the edit.
+
+                Returns:
+                - ImageStatistics: The new statistics, or None.
+                """
+        cached = self._entries.get(version)
+        if cached is None or not cached.exact:
+            return None
+        statistics = ImageStatistics(
+            update_histograms(cached.histograms, before, after), True)
+        self.put(new_version, statistics)
+        return statistics
+
+    def clear(self):
+        self._entries.clear()
+
+
+def estimate_statistics(level):
+    """
+        Args:
+        - level (numpy.ndarray): A small pyramid level of the image.
+
+        Returns:
+        - ImageStatistics: Estimate from the level.
+        """
+    return ImageStatistics(compute_histograms(level), False)
+
+
+def statistics_task(task, image):
+    """
+        Background task: exact statistics of the working image.
+
+        Returns:
+        - ImageStatistics: Exact statistics.
+        """
+    task.report_progress(0)
+    with tracing.span('stats.histogram', size=image.shape[:2]):
+        return ImageStatistics(compute_histograms(image), True)
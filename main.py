@@ -1,11 +1,33 @@
 """
 Initializes a PyQt5 application and starts the main window.
+
+Run with the 'batch' sub-command to process a directory of images
+headlessly instead, e.g. `python main.py batch photos/ out/ --op resize:50%`,
+'stream' to process a video file or camera stream (see streaming.py), or
+'benchmark' to time the image operations (see benchmark.py).
 """
 import sys
-from PyQt5.QtWidgets import QApplication
-from start_window import StartWindow
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'stream':
+        from streaming import main as stream_main
+        sys.exit(stream_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        from benchmark import main as benchmark_main
+        sys.exit(benchmark_main(sys.argv[2:]))
+
+    from PyQt5.QtWidgets import QApplication
+    from start_window import StartWindow
+    import tracing
+
+    # PHOTO_EDITOR_TRACE=trace.json records stage timings (see tracing.py)
+    trace_path = tracing.enable_from_environment()
     app = QApplication(sys.argv)
     window = StartWindow()
-    sys.exit(app.exec_())
+    status = app.exec_()
+    if trace_path:
+        tracing.write_trace(trace_path)
+    sys.exit(status)
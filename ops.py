@@ -0,0 +1,457 @@
+"""
+GUI-free image operations on RGB NumPy arrays.
+
+The working image is a single C-contiguous uint8 array of shape
+(height, width, 3) in RGB order. Every operation works on it directly, with
+no PIL or BGR round trips: point operations and rectangle fills modify the
+array in place (or write into an optional `out` buffer), and resize writes
+into `out` when one of the right size is supplied. Point operations are
+lookup tables (see point_ops), and runs of them are fused into one pass.
+"""
+import cv2
+import numpy as np
+
+import point_ops
+
+CHANNELS = 'RGB'
+BLUE = (0, 0, 255)
+
+# Resize quality tiers, from fastest to sharpest
+RESIZE_QUALITIES = ('fast', 'balanced', 'best')
+DEFAULT_RESIZE_QUALITY = 'balanced'
+# Smallest non-integer reduction that goes through an image pyramid first
+PYRAMID_MIN_FACTOR = {'fast': 2, 'balanced': 4}
+UPSCALE_INTERPOLATION = {'fast': cv2.INTER_LINEAR,
+                         'balanced': cv2.INTER_CUBIC,
+                         'best': cv2.INTER_LANCZOS4}
+# Source rows each interpolation kernel reaches past an output row
+KERNEL_RADIUS = {cv2.INTER_AREA: 1, cv2.INTER_LINEAR: 1, cv2.INTER_CUBIC: 2,
+                 cv2.INTER_LANCZOS4: 4}
+
+
+def from_pil(pil_image):
+    """
+        Convert a PIL image into a contiguous RGB working array.
+
+        Args:
+        - pil_image (PIL.Image.Image): The input PIL image.
+
+        Returns:
+        - numpy.ndarray: Writable uint8 array of shape (height, width, 3).
+        """
+    if pil_image.mode != 'RGB':
+        pil_image = pil_image.convert('RGB')
+    return np.array(pil_image)
+
+
+def ensure_rgb(image):
+    """
+        Return image as a contiguous uint8 RGB array, copying only when required.
+
+        Args:
+        - image (numpy.ndarray): Grayscale, RGB or RGBA uint8 array.
+
+        Returns:
+        - numpy.ndarray: Array of shape (height, width, 3).
+        """
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+    return np.ascontiguousarray(image)
+
+
+def contiguous(image):
+    """
+        Return image as a C-contiguous array, copying flipped or transposed views with OpenCV.
+
+        NumPy copies such views (e.g. from utils.orient_array) pixel by pixel,
+        several times slower than cv2.flip, cv2.rotate and cv2.transpose.
+
+        Args:
+        - image (numpy.ndarray): RGB image, possibly a strided view.
+
+        Returns:
+        - numpy.ndarray: image itself when already contiguous, otherwise a copy.
+        """
+    if image.flags['C_CONTIGUOUS']:
+        return image
+    if image.ndim != 3 or image.strides[2] != 1:
+        return np.array(image, order='C')
+    swapped = abs(image.strides[0]) < abs(image.strides[1])
+    base = image.swapaxes(0, 1) if swapped else image
+    flip_y = base.strides[0] < 0
+    flip_x = base.strides[1] < 0
+    base = base[::-1 if flip_y else 1, ::-1 if flip_x else 1]
+    if base.strides[1] != base.shape[2]:
+        # Not a flip or transpose of whole rows, e.g. a strided crop
+        return np.array(image, order='C')
+
+    if not swapped:
+        if flip_y and flip_x:
+            return cv2.flip(base, -1)
+        if not flip_y and not flip_x:
+            return np.array(base, order='C')
+        return cv2.flip(base, 0 if flip_y else 1)
+    if flip_y and not flip_x:
+        return cv2.rotate(base, cv2.ROTATE_90_CLOCKWISE)
+    if flip_x and not flip_y:
+        return cv2.rotate(base, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    if flip_y:
+        base = cv2.flip(base, -1)
+    return cv2.transpose(base)
+
+
+def compute_target_size(image_width, image_height, mode, width, height,
+                        keep_aspect_ratio, quality=DEFAULT_RESIZE_QUALITY):
+    """
+        Compute the output size of a resize, using the same rules as the resize dialog.
+
+        Args:
+        - image_width (int): Current image width.
+        - image_height (int): Current image height.
+        - mode (str): 'percent' or 'pixels'.
+        - width (int): Target width (percent or pixels).
+        - height (int): Target height (percent or pixels).
+        - keep_aspect_ratio (bool): Shrink one side to keep the aspect ratio.
+        - quality (str): Resize quality tier; only validated here.
+
+        Returns:
+        - tuple: (new_width, new_height) in pixels.
+        """
+    if quality not in RESIZE_QUALITIES:
+        raise ValueError("Resize quality must be one of "
+                         + ", ".join(RESIZE_QUALITIES) + ".")
+    if mode == 'percent':
+        if width <= 0 or height <= 0 or width > 300 or height > 300:
+            raise ValueError("Size in percent must be"
+                             " greater than 0 and less than 300.")
+        new_width = int(image_width * width / 100)
+        new_height = int(image_height * height / 100)
+    else:
+        if width <= 0 or height <= 0 or width > 10000 or height > 10000:
+            raise ValueError("Size in pixels must be "
+                             "greater than 0 and less than 10000.")
+        new_width = width
+        new_height = height
+
+    if keep_aspect_ratio:
+        aspect_ratio = image_width / image_height
+        if new_width / aspect_ratio < new_height:
+            new_height = int(new_width / aspect_ratio)
+        else:
+            new_width = int(new_height * aspect_ratio)
+
+    return max(new_width, 1), max(new_height, 1)
+
+
+def resize_plan(image_width, image_height, width, height,
+                quality=DEFAULT_RESIZE_QUALITY):
+    """
+        Choose how to resize, by direction and factor, for a quality tier.
+
+        - Enlargements interpolate with linear ('fast'), cubic ('balanced')
+          or Lanczos ('best') kernels.
+        - Reductions by an integer factor use area interpolation, which
+          OpenCV runs on a fast path.
+        - Other large reductions first halve the image with pyrDown until it
+          is less than twice the target size, then finish with an area
+          ('balanced') or linear ('fast') step. 'best' always uses area
+          interpolation straight from the source.
+
+        Args:
+        - image_width (int): Source width.
+        - image_height (int): Source height.
+        - width (int): Target width.
+        - height (int): Target height.
+        - quality (str): One of RESIZE_QUALITIES.
+
+        Returns:
+        - tuple: (number of pyrDown steps, OpenCV interpolation flag).
+        """
+    if quality not in RESIZE_QUALITIES:
+        raise ValueError(f"Unknown resize quality: {quality}")
+    if width >= image_width and height >= image_height:
+        return 0, UPSCALE_INTERPOLATION[quality]
+    if image_width % width == 0 and image_height % height == 0:
+        return 0, cv2.INTER_AREA
+    final = cv2.INTER_LINEAR if quality == 'fast' else cv2.INTER_AREA
+    factor = min(image_width / width, image_height / height)
+    if factor < PYRAMID_MIN_FACTOR.get(quality, float('inf')):
+        return 0, final
+    levels = 0
+    while image_width >= 2 * width and image_height >= 2 * height:
+        image_width = (image_width + 1) // 2
+        image_height = (image_height + 1) // 2
+        levels += 1
+    return levels, final
+
+
+def resize(image, width, height, out=None, quality=DEFAULT_RESIZE_QUALITY):
+    """
+        Resize an RGB image with the strategy resize_plan picks for quality.
+
+        Args:
+        - image (numpy.ndarray): RGB image.
+        - width (int): Target width in pixels.
+        - height (int): Target height in pixels.
+        - out (numpy.ndarray): Optional (height, width, 3) destination buffer.
+        - quality (str): 'fast', 'balanced' or 'best'.
+
+        Returns:
+        - numpy.ndarray: The resized image (out, when given).
+        """
+    levels, interpolation = resize_plan(image.shape[1], image.shape[0],
+                                        width, height, quality)
+    for _ in range(levels):
+        image = cv2.pyrDown(image)
+    if out is not None:
+        cv2.resize(image, (width, height), dst=out,
+                   interpolation=interpolation)
+        return out
+    return cv2.resize(image, (width, height), interpolation=interpolation)
+
+
+def decrease_brightness(image, decrease_value, out=None):
+    """
+        Scale every pixel by (1 - decrease_value / 100) through a lookup table.
+
+        Args:
+        - image (numpy.ndarray): RGB image.
+        - decrease_value (float): Percentage decrease between 0 and 100.
+        - out (numpy.ndarray): Destination buffer; defaults to image (in place).
+
+        Returns:
+        - numpy.ndarray: The darkened image.
+        """
+    return point_ops.apply_lut(image, point_ops.brightness_lut(decrease_value),
+                               out=out)
+
+
+def isolate_channel(image, channel, out=None):
+    """
+        Keep a single color channel and zero the other two.
+
+        Args:
+        - image (numpy.ndarray): RGB image.
+        - channel (str): Channel to keep ('R', 'G' or 'B').
+        - out (numpy.ndarray): Destination buffer; defaults to image (in place).
+
+        Returns:
+        - numpy.ndarray: Image containing only the selected channel.
+        """
+    if channel not in CHANNELS:
+        raise ValueError("Channel must be one of R, G, B.")
+    if out is None:
+        out = image
+    mask = np.zeros(3, dtype=np.uint8)
+    mask[CHANNELS.index(channel)] = 1
+    np.multiply(image, mask, out=out)
+    return out
+
+
+class ChannelCache:
+    """
+        Cache of isolated-channel renders, invalidated by an image version counter.
+
+        Each channel owns one reusable buffer whose other two planes are zeroed
+        once when it is allocated; refreshing it for a new image version is a
+        single strided copy of the kept plane.
+        """
+    def __init__(self):
+        self._buffers = {}
+        self._versions = {}
+
+    def get(self, image, version, channel):
+        """
+                Return the render of a channel, recomputing it only if the image changed.
+
+                Args:
+                - image (numpy.ndarray): RGB image.
+                - version (int): Version counter of image, bumped on every edit.
+                - channel (str): Channel to keep ('R', 'G' or 'B').
+
+                Returns:
+                - numpy.ndarray: Cached buffer; treat it as read-only.
+                """
+        if channel not in CHANNELS:
+            raise ValueError("Channel must be one of R, G, B.")
+        buffer = self._buffers.get(channel)
+        if buffer is None or buffer.shape != image.shape:
+            buffer = np.zeros_like(image)
+            self._buffers[channel] = buffer
+            self._versions[channel] = None
+        if self._versions[channel] != version:
+            index = CHANNELS.index(channel)
+            buffer[..., index] = image[..., index]
+            self._versions[channel] = version
+        return buffer
+
+    def clear(self):
+        """
+                Drop all cached buffers.
+                """
+        self._buffers.clear()
+        self._versions.clear()
+
+
+def fill_rectangle(image, x, y, width, height, color=BLUE):
+    """
+        Draw a filled rectangle into the image in place.
+
+        Args:
+        - image (numpy.ndarray): RGB image, modified in place.
+        - x (int): Left coordinate.
+        - y (int): Top coordinate.
+        - width (int): Rectangle width.
+        - height (int): Rectangle height.
+        - color (tuple): RGB fill color, blue by default.
+
+        Returns:
+        - numpy.ndarray: The same image.
+        """
+    cv2.rectangle(image, (x, y), (x + width, y + height), color, -1)
+    return image
+
+
+def rectangle_margin(rectangle):
+    """
+        Returns:
+        - int: How far an outline's stroke reaches outside the rectangle (0
+          when filled).
+        """
+    return 0 if rectangle['fill'] else (rectangle['thickness'] + 1) // 2
+
+
+def rectangles_bounds(rectangles):
+    """
+        Bounding box of every pixel drawn by draw_rectangles.
+
+        Args:
+        - rectangles (list): Rectangle dicts as produced by annotations.
+
+        Returns:
+        - tuple: (x, y, width, height) in the form taken by fill_rectangle,
+          so the far corner is included; x and y may be negative.
+        """
+    left = top = float('inf')
+    right = bottom = float('-inf')
+    for rectangle in rectangles:
+        margin = rectangle_margin(rectangle)
+        left = min(left, rectangle['x'] - margin)
+        top = min(top, rectangle['y'] - margin)
+        right = max(right, rectangle['x'] + rectangle['width'] + margin)
+        bottom = max(bottom, rectangle['y'] + rectangle['height'] + margin)
+    return left, top, right - left, bottom - top
+
+
+def draw_rectangles(image, rectangles, top=0):
+    """
+        Draw many filled or outlined rectangles into the image in place.
+
+        All rectangles go into the one buffer in a single pass, and those
+        that miss the image rows are skipped without a drawing call.
+
+        Args:
+        - image (numpy.ndarray): RGB image, modified in place.
+        - rectangles (list): Rectangle dicts with x, y, width, height,
+          color, fill and thickness (see annotations.normalize_rectangle).
+        - top (int): Row of the full image that image starts at, when
+          drawing into a horizontal strip of it.
+
+        Returns:
+        - numpy.ndarray: The same image.
+        """
+    for rectangle in rectangles:
+        margin = rectangle_margin(rectangle)
+        y = rectangle['y'] - top
+        if (y - margin >= image.shape[0] or
+                y + rectangle['height'] + margin < 0):
+            continue
+        x = rectangle['x']
+        thickness = -1 if rectangle['fill'] else rectangle['thickness']
+        # Shifted into strip coordinates; cv2.rectangle clips to the image
+        cv2.rectangle(image, (x, y),
+                      (x + rectangle['width'], y + rectangle['height']),
+                      tuple(rectangle['color']), thickness)
+    return image
+
+
+def apply_operation(image, name, params):
+    """
+        Apply a single named operation to an RGB image array.
+
+        Args:
+        - image (numpy.ndarray): RGB image; point operations modify it in place.
+        - name (str): 'resize', 'channel', 'rectangle', 'annotations' or a
+          point operation
+          ('brightness', 'gain', 'gamma', 'contrast', 'curve').
+        - params (dict): Operation arguments.
+
+        Returns:
+        - numpy.ndarray: The processed RGB image.
+        """
+    if name == 'resize':
+        new_width, new_height = compute_target_size(
+            image.shape[1], image.shape[0], **params)
+        return resize(image, new_width, new_height,
+                      quality=params.get('quality', DEFAULT_RESIZE_QUALITY))
+    if point_ops.is_point_operation(name):
+        return point_ops.apply_lut(image, point_ops.lut_for(name, params))
+    if name == 'channel':
+        return isolate_channel(image, params['channel'])
+    if name == 'rectangle':
+        return fill_rectangle(image, params['x'], params['y'],
+                              params['width'], params['height'])
+    if name == 'annotations':
+        return draw_rectangles(image, params['rectangles'])
+    raise ValueError(f"Unknown operation: {name}")
+
+
+def run_operations(image, operations, in_place=True):
+    """
+        Apply operations in order, fusing each run of consecutive point operations.
+
+        A run of point operations is composed into a single lookup table, so it
+        costs one pass over the pixels however long it is. An input that may
+        not be edited in place is copied by the first operation that writes
+        pixels, rather than in a separate pass. A strided view, such as an
+        orientation transform, is made contiguous first with contiguous().
+
+        Args:
+        - image (numpy.ndarray): RGB image; may be modified in place.
+        - operations (list): List of (name, params) tuples.
+        - in_place (bool): Whether image may be modified.
+
+        Returns:
+        - numpy.ndarray: The processed RGB image.
+        """
+    owned = (in_place and image.flags['C_CONTIGUOUS'] and
+             image.flags['WRITEABLE'])
+    if not image.flags['C_CONTIGUOUS']:
+        # OpenCV would copy a strided view anyway, and more slowly
+        image, owned = contiguous(image), True
+    pending_luts = []
+
+    def flush(image, owned):
+        lut = point_ops.compose(*pending_luts)
+        del pending_luts[:]
+        if owned:
+            return point_ops.apply_lut(image, lut)
+        return point_ops.apply_lut(image, lut, out=np.empty(image.shape,
+                                                            np.uint8))
+
+    for name, params in operations:
+        if point_ops.is_point_operation(name):
+            pending_luts.append(point_ops.lut_for(name, params))
+            continue
+        if pending_luts:
+            image, owned = flush(image, owned), True
+        if name != 'resize' and not owned:
+            image = np.array(image, order='C')
+        image, owned = apply_operation(image, name, params), True
+    if pending_luts:
+        image, owned = flush(image, owned), True
+    if not owned:
+        image = image.copy()
+    return image
@@ -0,0 +1,285 @@
+"""
+Multi-core execution of the operations on one large image.
+
+The image is placed in a multiprocessing.shared_memory block and split into
+horizontal strips. Worker processes attach to the block by name and process
+their strips in place or into a shared output block, so only block names,
+row ranges and operation parameters are pickled, never pixel data. The
+result is bit-identical to ops.run_operations, whatever the number of
+workers:
+- consecutive per-pixel operations (fused point operations, channel
+  isolation, rectangles and annotations) run as one stage, each worker
+  applying all of them to its strip in one go;
+- every pyrDown step and resize is a stage of its own, with strips cut on
+  exact row periods and haloed as in tiled.py. A resize that cannot be
+  cut exactly (see tiled.exact_resize_period) is not split: it runs as
+  one cv2.resize in the calling process, which OpenCV spreads over its
+  own threads.
+
+Small images gain nothing from the copies into and out of shared memory,
+so below min_bytes (and with a single worker) ops.run_operations is used
+instead. Workers are spawned rather than forked, since the GUI calls this
+from a worker thread, and the pool is kept for reuse.
+"""
+import atexit
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import cv2
+import numpy as np
+
+import ops
+import point_ops
+import tiled
+
+# Images smaller than this are processed on the calling thread
+PARALLEL_MIN_BYTES = 24 * 1024 * 1024
+# Strips per worker, so that uneven strips still keep every core busy
+STRIPS_PER_WORKER = 2
+
+_pool = None
+_pool_workers = None
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _init_worker():
+    # Parallelism comes from the processes; OpenCV's own threads would
+    # oversubscribe the cores
+    cv2.setNumThreads(1)
+
+
+def _ready():
+    return os.getpid()
+
+
+def get_pool(workers):
+    """
+        Returns:
+        - ProcessPoolExecutor: The shared pool, recreated if workers changed.
+        """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers,
+                                    mp_context=get_context('spawn'),
+                                    initializer=_init_worker)
+        _pool_workers = workers
+    return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = _pool_workers = None
+
+
+class SharedImage:
+    """
+        A uint8 image in a shared memory block.
+
+        Attributes:
+        - array (numpy.ndarray): View of the block.
+        - spec (tuple): (block name, shape), enough for a worker to attach.
+        """
+    def __init__(self, shape):
+        self.shm = shared_memory.SharedMemory(create=True,
+                                              size=max(math.prod(shape), 1))
+        self.array = np.ndarray(shape, np.uint8, buffer=self.shm.buf)
+        self.spec = (self.shm.name, shape)
+
+    def release(self):
+        self.array = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach(spec):
+    name, shape = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, np.uint8, buffer=shm.buf)
+
+
+def apply_pixel_steps(strip, steps, top):
+    """
+        Apply per-pixel steps to a strip in place.
+
+        Args:
+        - strip (numpy.ndarray): Rows of the image, modified in place.
+        - steps (list): ('lut', table), ('channel', channel) or
+          ('rectangles', rectangle dicts) tuples.
+        - top (int): Image row the strip starts at.
+        """
+    for kind, value in steps:
+        if kind == 'lut':
+            point_ops.apply_lut(strip, value)
+        elif kind == 'channel':
+            ops.isolate_channel(strip, value)
+        else:
+            ops.draw_rectangles(strip, value, top)
+
+
+def run_strip(job):
+    """
+        Worker entry point: run one stage on rows start:stop.
+
+        Args:
+        - job (tuple): (kind, source spec, output spec, start, stop, args)
+          where kind is 'pixels', 'pyr_down' or 'resize'.
+        """
+    kind, source_spec, out_spec, start, stop, args = job
+    blocks = []
+    try:
+        source_block, source = _attach(source_spec)
+        blocks.append(source_block)
+        if out_spec == source_spec:
+            out = source
+        else:
+            out_block, out = _attach(out_spec)
+            blocks.append(out_block)
+        if kind == 'pixels':
+            apply_pixel_steps(out[start:stop], args, start)
+        elif kind == 'pyr_down':
+            tiled.pyr_down_rows(source, out, start, stop)
+        else:
+            width, height, halo_rows, interpolation = args
+            tiled.resize_rows(source, width, height, out, start, stop,
+                              halo_rows, interpolation)
+        source = out = None
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def plan_pixel_steps(operations):
+    """
+        Turn a run of per-pixel operations into strip steps, fusing point operations.
+
+        Returns:
+        - list: Steps for apply_pixel_steps.
+        """
+    steps = []
+    luts = []
+    for name, params in operations:
+        if point_ops.is_point_operation(name):
+            luts.append(point_ops.lut_for(name, params))
+            continue
+        if luts:
+            steps.append(('lut', point_ops.compose(*luts)))
+            luts = []
+        if name == 'channel':
+            steps.append(('channel', params['channel']))
+        elif name == 'rectangle':
+            steps.append(('rectangles', [dict(
+                params, color=ops.BLUE, fill=True, thickness=1)]))
+        elif name == 'annotations':
+            steps.append(('rectangles', params['rectangles']))
+        else:
+            raise ValueError(f"Unknown operation: {name}")
+    if luts:
+        steps.append(('lut', point_ops.compose(*luts)))
+    return steps
+
+
+def split_rows(height, strips, period=1):
+    """
+        Split height rows into about strips ranges cut on multiples of period.
+
+        Returns:
+        - list: (start, stop) row ranges.
+        """
+    rows = max(-(-height // strips), 1)
+    rows = -(-rows // period) * period
+    return list(tiled.iter_strips(height, rows))
+
+
+def run_operations_parallel(image, operations, workers=None,
+                            min_bytes=PARALLEL_MIN_BYTES):
+    """
+        Apply operations in order using several processes; never modifies image.
+
+        Args:
+        - image (numpy.ndarray): RGB image (may be a strided view).
+        - operations (list): List of (name, params) tuples.
+        - workers (int): Worker processes (defaults to the CPU count).
+        - min_bytes (int): Smaller images are processed by ops.run_operations.
+
+        Returns:
+        - numpy.ndarray: The processed RGB image.
+        """
+    workers = workers or default_workers()
+    if workers < 2 or image.nbytes < min_bytes:
+        return ops.run_operations(image, operations, in_place=False)
+
+    pool = get_pool(workers)
+    strips = workers * STRIPS_PER_WORKER
+    current = SharedImage(image.shape)
+    blocks = [current]
+
+    def run_stage(kind, out, args, period=1):
+        jobs = [(kind, current.spec, out.spec, start, stop, args)
+                for start, stop in split_rows(out.array.shape[0], strips,
+                                              period)]
+        for _ in pool.map(run_strip, jobs):
+            pass
+
+    try:
+        current.array[:] = ops.contiguous(image)
+        pending = []
+        for name, params in list(operations) + [(None, None)]:
+            if name is not None and name != 'resize':
+                pending.append((name, params))
+                continue
+            if pending:
+                run_stage('pixels', current, plan_pixel_steps(pending))
+                pending = []
+            if name is None:
+                break
+            height, width = current.array.shape[:2]
+            new_width, new_height = ops.compute_target_size(width, height,
+                                                            **params)
+            levels, interpolation = ops.resize_plan(
+                width, height, new_width, new_height,
+                params.get('quality', ops.DEFAULT_RESIZE_QUALITY))
+            for _ in range(levels):
+                height, width = current.array.shape[:2]
+                out = SharedImage(((height + 1) // 2, (width + 1) // 2, 3))
+                blocks.append(out)
+                run_stage('pyr_down', out, None)
+                current = out
+            out = SharedImage((new_height, new_width, 3))
+            blocks.append(out)
+            height, width = current.array.shape[:2]
+            period = tiled.exact_resize_period(width, height, new_width,
+                                               new_height, interpolation)
+            if period is None:
+                # Strips would not be exact; OpenCV threads this itself
+                cv2.resize(current.array, (new_width, new_height),
+                           dst=out.array, interpolation=interpolation)
+            else:
+                run_stage('resize', out,
+                          (new_width, new_height,
+                           ops.KERNEL_RADIUS[interpolation], interpolation),
+                          period)
+            current = out
+        return current.array.copy()
+    finally:
+        for block in blocks:
+            block.release()
+
+
+def warm_up(workers=None):
+    """
+        Start the worker processes ahead of the first large image.
+        """
+    workers = workers or default_workers()
+    if workers >= 2:
+        pool = get_pool(workers)
+        for future in [pool.submit(_ready) for _ in range(workers)]:
+            future.result()
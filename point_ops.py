@@ -0,0 +1,173 @@
+"""
+Lookup-table engine for point operations on uint8 images.
+
+A point operation maps every 8-bit value independently, so it can be
+expressed as a 256-entry table and applied with a single `cv2.LUT` pass.
+Consecutive point operations are composed into one table, so a chain of
+adjustments costs one pass over the pixels and never creates a float copy
+of the frame.
+"""
+import cv2
+import numpy as np
+
+_VALUES = np.arange(256, dtype=np.float64)
+
+
+def _to_lut(values):
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+def identity_lut():
+    """
+        Returns:
+        - numpy.ndarray: The 256-entry table that leaves every value unchanged.
+        """
+    return np.arange(256, dtype=np.uint8)
+
+
+def brightness_lut(decrease_value):
+    """
+        Build the table for a percentage brightness decrease.
+
+        Values are truncated like the original float implementation, so results
+        are bit-identical to `np.clip(image * factor, 0, 255).astype(np.uint8)`.
+
+        Args:
+        - decrease_value (float): Percentage decrease between 0 and 100.
+
+        Returns:
+        - numpy.ndarray: uint8 lookup table.
+        """
+    if not (0 <= decrease_value <= 100):
+        raise ValueError("Brightness decrease value "
+                         "must be between 0 and 100.")
+    return _to_lut(_VALUES * (1 - decrease_value / 100.0))
+
+
+def gain_lut(gain):
+    """
+        Build the table for a multiplicative gain (1.0 leaves the image unchanged).
+
+        Args:
+        - gain (float): Non-negative multiplier.
+
+        Returns:
+        - numpy.ndarray: uint8 lookup table.
+        """
+    if gain < 0:
+        raise ValueError("Gain must not be negative.")
+    return _to_lut(np.rint(_VALUES * gain))
+
+
+def gamma_lut(gamma):
+    """
+        Build the table for a gamma correction (values above 1.0 brighten midtones).
+
+        Args:
+        - gamma (float): Positive gamma value.
+
+        Returns:
+        - numpy.ndarray: uint8 lookup table.
+        """
+    if gamma <= 0:
+        raise ValueError("Gamma must be positive.")
+    return _to_lut(np.rint(255.0 * (_VALUES / 255.0) ** (1.0 / gamma)))
+
+
+def contrast_lut(contrast):
+    """
+        Build the table for a contrast change around mid-gray.
+
+        Args:
+        - contrast (float): Non-negative factor; 1.0 leaves the image unchanged.
+
+        Returns:
+        - numpy.ndarray: uint8 lookup table.
+        """
+    if contrast < 0:
+        raise ValueError("Contrast must not be negative.")
+    return _to_lut(np.rint((_VALUES - 128.0) * contrast + 128.0))
+
+
+def curve_lut(points):
+    """
+        Build the table for a tone curve through the given control points.
+
+        Args:
+        - points (list): (input, output) pairs in 0-255, interpolated linearly.
+
+        Returns:
+        - numpy.ndarray: uint8 lookup table.
+        """
+    points = sorted(points)
+    inputs = [x for x, _ in points]
+    outputs = [y for _, y in points]
+    return _to_lut(np.rint(np.interp(_VALUES, inputs, outputs)))
+
+
+LUT_BUILDERS = {
+    'brightness': lambda params: brightness_lut(params['decrease']),
+    'gain': lambda params: gain_lut(params['gain']),
+    'gamma': lambda params: gamma_lut(params['gamma']),
+    'contrast': lambda params: contrast_lut(params['contrast']),
+    'curve': lambda params: curve_lut(params['points']),
+}
+
+
+def is_point_operation(name):
+    """
+        Args:
+        - name (str): Operation name.
+
+        Returns:
+        - bool: True when the operation can be expressed as a lookup table.
+        """
+    return name in LUT_BUILDERS
+
+
+def lut_for(name, params):
+    """
+        Build the lookup table of a named point operation.
+
+        Args:
+        - name (str): One of the names in LUT_BUILDERS.
+        - params (dict): Operation arguments.
+
+        Returns:
+        - numpy.ndarray: uint8 lookup table.
+        """
+    return LUT_BUILDERS[name](params)
+
+
+def compose(*luts):
+    """
+        Compose lookup tables applied left to right into a single table.
+
+        Args:
+        - luts (numpy.ndarray): Tables in the order they would be applied.
+
+        Returns:
+        - numpy.ndarray: One table equivalent to applying all of them in turn.
+        """
+    result = identity_lut()
+    for lut in luts:
+        result = lut[result]
+    return result
+
+
+def apply_lut(image, lut, out=None):
+    """
+        Apply a lookup table to every channel of a uint8 image in one pass.
+
+        Args:
+        - image (numpy.ndarray): uint8 image.
+        - lut (numpy.ndarray): 256-entry uint8 table.
+        - out (numpy.ndarray): Destination buffer; defaults to image (in place).
+
+        Returns:
+        - numpy.ndarray: The mapped image.
+        """
+    if out is None:
+        out = image
+    cv2.LUT(image, lut, dst=out)
+    return out
@@ -0,0 +1,66 @@
+"""
+Multi-resolution preview pyramid used to draw the working image on screen.
+
+Level 0 is the full-resolution image and every further level halves both
+sides with area interpolation. Levels are built lazily, once per image
+version, and the display always starts from the smallest level that still
+covers the size it is drawn at, so redraw cost follows the window size
+instead of the photo size.
+"""
+import cv2
+
+
+class PreviewPyramid:
+    """
+        Lazily built image pyramid invalidated by an image version counter.
+        """
+    def __init__(self):
+        self._levels = []
+        self._version = None
+
+    def level_for(self, image, version, width, height):
+        """
+                Return the smallest pyramid level that covers image fitted into width x height.
+
+                Args:
+                - image (numpy.ndarray): Full-resolution RGB image.
+                - version (int): Version counter of image, bumped on every edit.
+                - width (int): Width of the area the image is drawn in.
+                - height (int): Height of the area the image is drawn in.
+
+                Returns:
+                - numpy.ndarray: The chosen level; treat it as read-only.
+                """
+        if version != self._version or not self._levels:
+            self._levels = [image]
+            self._version = version
+
+        image_height, image_width = image.shape[:2]
+        scale = min(width / image_width, height / image_height, 1.0)
+        target_width = max(int(image_width * scale), 1)
+        target_height = max(int(image_height * scale), 1)
+
+        index = 0
+        while True:
+            if index + 1 == len(self._levels):
+                level = self._levels[index]
+                next_width = level.shape[1] // 2
+                next_height = level.shape[0] // 2
+                if next_width < target_width or next_height < target_height:
+                    break
+                self._levels.append(cv2.resize(
+                    level, (next_width, next_height),
+                    interpolation=cv2.INTER_AREA))
+            next_level = self._levels[index + 1]
+            if (next_level.shape[1] < target_width or
+                    next_level.shape[0] < target_height):
+                break
+            index += 1
+        return self._levels[index]
+
+    def clear(self):
+        """
+                Drop every level, including the reference to the full image.
+                """
+        self._levels = []
+        self._version = None
@@ -0,0 +1,22 @@
+"""
+Qt helpers shared by the editor window and its dialogs.
+
+Kept apart from utils, which the headless batch workers import, so that
+only GUI code pulls in PyQt5.
+"""
+from PyQt5.QtGui import QImage, QPixmap
+
+
+def array_to_pixmap(image):
+    """
+        Wrap an RGB image array in a QImage without copying and convert it to a QPixmap.
+
+        Args:
+        - image (numpy.ndarray): RGB uint8 array of shape (height, width, 3).
+
+        Returns:
+        - QPixmap: Pixmap holding a copy of the image data.
+        """
+    q_img = QImage(image.data, image.shape[1], image.shape[0],
+                   image.strides[0], QImage.Format_RGB888)
+    return QPixmap.fromImage(q_img)
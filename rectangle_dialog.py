@@ -20,8 +20,7 @@ class RectangleDialog(QDialog):
 
         self.layout = QVBoxLayout(self)
 
-        parent_width = parent.pil_image.width
-        parent_height = parent.pil_image.height
+        parent_width, parent_height = parent.image_size()
 
         self.label_x = QLabel(f"X Coordinate (0 to {parent_width}):")
         self.input_x = QLineEdit()
@@ -73,8 +72,7 @@ class RectangleDialog(QDialog):
             width = int(self.input_width.text())
             height = int(self.input_height.text())
 
-            parent_width = self.parent().pil_image.width
-            parent_height = self.parent().pil_image.height
+            parent_width, parent_height = self.parent().image_size()
 
             if not (0 <= x <= parent_width) or not (0 <= y <= parent_height):
                 raise ValueError(f"Coordinates must be "
@@ -1,24 +1,80 @@
 """
 Module containing a dialog for resizing images with options to maintain aspect ratio.
+
+The dialog shows a live preview of the result. It is computed in the
+background from a small proxy of the current image, and only once typing
+pauses for PREVIEW_DEBOUNCE_MS; the full-resolution resize runs only after
+OK is clicked.
 """
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout,
                              QRadioButton, QLabel, QLineEdit, QPushButton,
-                             QCheckBox, QMessageBox)
+                             QCheckBox, QMessageBox, QComboBox)
+from PyQt5.QtCore import Qt, QTimer
 import re
+from qt_utils import array_to_pixmap
+from workers import TaskRunner
+
+PREVIEW_WIDTH = 280
+PREVIEW_HEIGHT = 210
+PREVIEW_DEBOUNCE_MS = 150
+# Combo box label -> ops resize quality tier
+QUALITY_CHOICES = (('Balanced', 'balanced'), ('Fast', 'fast'),
+                   ('Best quality', 'best'))
+
+
+def preview_size(width, height):
+    """
+        Size at which an image of width x height is shown in the preview box.
+
+        Images smaller than the box are shown at their actual size, so the
+        loss of detail of a strong reduction is visible.
+
+        Returns:
+        - tuple: (width, height) fitted into PREVIEW_WIDTH x PREVIEW_HEIGHT.
+        """
+    scale = min(PREVIEW_WIDTH / width, PREVIEW_HEIGHT / height, 1.0)
+    return max(int(round(width * scale)), 1), max(int(round(height * scale)), 1)
+
+
+def resize_preview_task(task, proxy, width, height, quality):
+    """
+        Background task: render how a resize to width x height will look.
+
+        Args:
+        - task (workers.Task): Running task.
+        - proxy (numpy.ndarray): The current image fitted into the preview box.
+        - width (int): Target width in full-resolution pixels.
+        - height (int): Target height in full-resolution pixels.
+        - quality (str): Resize quality tier.
+
+        Returns:
+        - numpy.ndarray: The proxy resized to the preview size of the target.
+        """
+    import ops
+    task.report_progress(0)
+    return ops.resize(proxy, *preview_size(width, height), quality=quality)
 
 
 class ResizeDialog(QDialog):
     """
         Dialog window for resizing images. Provides options for resizing by percent or pixels,
         maintaining aspect ratio, and validating input values.
+
+        Attributes:
+        - preview_proxy (numpy.ndarray): The current image fitted into the
+          preview box, or None if the parent has no image.
+        - preview_label (QLabel): Shows the preview of the resized image.
+        - size_label (QLabel): Shows the resulting size in pixels.
+        - preview_timer (QTimer): Debounces preview updates while typing.
+        - preview_runner (TaskRunner): Renders previews off the GUI thread;
+          only the latest request completes.
         """
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Resize Image")
         self.setGeometry(100, 100, 300, 200)
 
-        self.image_width = parent.pil_image.width
-        self.image_height = parent.pil_image.height
+        self.image_width, self.image_height = parent.image_size()
 
         self.resize_type = 'pixels'
         self.keep_aspect_ratio = True
@@ -54,8 +110,36 @@ class ResizeDialog(QDialog):
         # Aspect ratio checkbox
         self.aspect_ratio_checkbox = QCheckBox("Maintain Aspect Ratio")
         self.aspect_ratio_checkbox.setChecked(True)
+        self.aspect_ratio_checkbox.stateChanged.connect(self.schedule_preview)
         self.layout.addWidget(self.aspect_ratio_checkbox)
 
+        # Speed / quality tier
+        self.quality_label = QLabel("Quality:")
+        self.quality_combo = QComboBox()
+        for text, quality in QUALITY_CHOICES:
+            self.quality_combo.addItem(text, quality)
+        self.quality_combo.currentIndexChanged.connect(self.schedule_preview)
+        self.layout.addWidget(self.quality_label)
+        self.layout.addWidget(self.quality_combo)
+
+        # Live preview
+        self.preview_label = QLabel()
+        self.preview_label.setAlignment(Qt.AlignCenter)
+        self.preview_label.setFixedSize(PREVIEW_WIDTH, PREVIEW_HEIGHT)
+        self.size_label = QLabel()
+        self.size_label.setAlignment(Qt.AlignCenter)
+        self.layout.addWidget(self.preview_label, alignment=Qt.AlignCenter)
+        self.layout.addWidget(self.size_label)
+
+        self.preview_proxy = self.create_preview_proxy(parent)
+        self.preview_runner = TaskRunner(self)
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+        self.width_input.textChanged.connect(self.schedule_preview)
+        self.height_input.textChanged.connect(self.schedule_preview)
+
         # OK and Cancel buttons
         self.button_layout = QHBoxLayout()
         self.ok_button = QPushButton("OK")
@@ -76,6 +160,73 @@ class ResizeDialog(QDialog):
         self.button_layout.addWidget(self.ok_button)
 
         self.layout.addLayout(self.button_layout)
+        self.update_preview()
+
+    def create_preview_proxy(self, parent):
+        """
+                Fit the parent's current image into the preview box once.
+
+                Returns:
+                - numpy.ndarray: The proxy, or None if there is no image.
+                """
+        image = getattr(parent, 'image', None)
+        if image is None:
+            return None
+        import ops
+        level = parent.preview_pyramid.level_for(image, parent.image_version,
+                                                 PREVIEW_WIDTH, PREVIEW_HEIGHT)
+        return ops.resize(level, *preview_size(level.shape[1],
+                                               level.shape[0]))
+
+    def schedule_preview(self):
+        """
+                Restart the debounce timer; the preview updates once input pauses.
+                """
+        self.preview_timer.start()
+
+    def target_size(self):
+        """
+                Returns:
+                - tuple: Full-resolution (width, height) of the current input, or
+                  None if the input is invalid.
+                """
+        import ops
+        width, height = self.width_input.text(), self.height_input.text()
+        if not self.validate_input(width) or not self.validate_input(height):
+            return None
+        try:
+            return ops.compute_target_size(
+                self.image_width, self.image_height, self.resize_type,
+                int(width), int(height),
+                self.aspect_ratio_checkbox.isChecked())
+        except ValueError:
+            return None
+
+    def update_preview(self):
+        """
+                Render the preview of the current input in the background.
+                """
+        size = self.target_size()
+        if size is None:
+            self.size_label.setText("Invalid size")
+            return
+        self.size_label.setText(f"Result: {size[0]} x {size[1]} px")
+        if self.preview_proxy is not None:
+            self.preview_runner.submit("Preview", resize_preview_task,
+                                       self.preview_proxy, *size,
+                                       self.get_quality(),
+                                       on_finished=self.show_preview)
+
+    def show_preview(self, image):
+        self.preview_label.setPixmap(array_to_pixmap(image))
+
+    def done(self, result):
+        """
+                Stop pending preview work when the dialog is closed.
+                """
+        self.preview_timer.stop()
+        self.preview_runner.cancel()
+        super().done(result)
 
     def on_radio_button_toggled(self):
         """
@@ -152,3 +303,9 @@ class ResizeDialog(QDialog):
                 """
         return self.resize_type, int(self.width_input.text()), int(
             self.height_input.text()), self.aspect_ratio_checkbox.isChecked()
+
+    def get_quality(self):
+        """
+                Returns the selected resize quality tier ('fast', 'balanced' or 'best').
+                """
+        return self.quality_combo.currentData()
@@ -14,20 +14,31 @@ the main UI with buttons to load an image, connect to a camera, and navigate
 between different editing modes. Also includes methods for displaying images,
 editing images (resizing, adjusting brightness, drawing rectangles), and
 displaying individual color channels.
+
+Startup imports only PyQt5. OpenCV, NumPy, PIL, the camera widget and the
+dialogs are imported where they are first used, and are warmed up on a
+background thread once the start screen has been shown.
 """
+import threading
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QFileDialog,
-                             QMessageBox, QSizePolicy, QDialog)
-from PyQt5.QtGui import QPixmap, QImage
-from PyQt5.QtCore import Qt
-from PIL import Image
-from camera_widget import CameraWidget
-from utils import correct_image_orientation
-import cv2
-import numpy as np
-from resize_dialog import ResizeDialog
-from brightness_dialog import BrightnessDialog
-from rectangle_dialog import RectangleDialog
+                             QMessageBox, QSizePolicy, QDialog,
+                             QProgressDialog, QShortcut)
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtCore import Qt, QTimer
+import time
+import tracing
+from image_cache import CachedImage, ImageCache, file_key
+from qt_utils import array_to_pixmap
+from workers import TaskRunner
+
+# Modules imported in the background once the start screen is up
+WARM_UP_MODULES = ('numpy', 'cv2', 'PIL.Image', 'ops', 'utils', 'preview',
+                   'history', 'edit_graph', 'camera_widget', 'resize_dialog',
+                   'brightness_dialog', 'rectangle_dialog', 'annotations',
+                   'image_stats', 'stats_dialog', 'thumbnails',
+                   'thumbnail_browser')
+WARM_UP_DELAY_MS = 200
 
 
 def create_button(text, slot):
@@ -48,7 +59,7 @@ def create_button(text, slot):
         button.setStyleSheet(
             "font-size: 15px; font-family: Bahnschrift; font-weight: bold;"
             " background-color: #cd4662; color: #f4dbdb;")
-    elif text == 'Load Image' or text == 'Connect to Camera':
+    elif text in ('Load Image', 'Open Folder', 'Connect to Camera'):
         button.setStyleSheet(
             "font-size: 20px; font-family: Bahnschrift; font-weight: bold;"
             " background-color: #f4dbdb; color: #cd4662;")
@@ -61,18 +72,270 @@ def create_button(text, slot):
     return button
 
 
+def warm_up_imports():
+    """
+        Import the modules deferred at startup, so first use does not wait for them.
+        """
+    import importlib
+    for name in WARM_UP_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Failed to import {name}: {e}")
+
+
+def load_preview_task(task, file_path, long_side=None):
+    """
+        Background task: decode a reduced-resolution version of an image for display.
+
+        JPEG files are decoded with DCT scaling (PIL draft mode) straight to
+        about the preview size; other formats are decoded fully, and the
+        result is then used as the full-resolution source as well. The Exif
+        orientation comes from the header and is applied as an array view.
+
+        Args:
+        - task (workers.Task): Running task, used for progress and cancellation.
+        - file_path (str): Path of the image file.
+        - long_side (int): Long side of the preview proxy (default PREVIEW_LONG_SIDE).
+
+        Returns:
+        - EditGraph: Edit graph whose source is None if a full decode is still needed.
+        """
+    from PIL import Image
+    import ops
+    from edit_graph import EditGraph, PREVIEW_LONG_SIDE, fit_size
+    from utils import orient_array, oriented_size, read_orientation
+
+    if long_side is None:
+        long_side = PREVIEW_LONG_SIDE
+    with Image.open(file_path) as pil_image:
+        with tracing.span('load.header'):
+            orientation = read_orientation(pil_image)
+            stored_width, stored_height = pil_image.size
+            pil_image.draft('RGB',
+                            fit_size(stored_width, stored_height, long_side))
+            # draft() answers for every JPEG, even at scale 1/1; only a
+            # smaller decode needs the full image decoded later
+            reduced = pil_image.size != (stored_width, stored_height)
+        task.report_progress(10)
+        with tracing.span('load.decode', size=pil_image.size):
+            image = orient_array(ops.from_pil(pil_image), orientation)
+        task.report_progress(60)
+    full_width, full_height = oriented_size(stored_width, stored_height,
+                                            orientation)
+
+    if not reduced:
+        graph = EditGraph(image, long_side)
+    else:
+        graph = EditGraph(None, long_side, size=(full_width, full_height),
+                          preview_source=image)
+    task.report_progress(80)
+    with tracing.span('load.proxy'):
+        graph.preview_source()
+    return graph
+
+
+def load_full_task(task, file_path, graph):
+    """
+        Background task: decode the full-resolution image for a graph opened from a preview.
+
+        Returns:
+        - tuple: (graph, decoded RGB image as an upright view).
+        """
+    from PIL import Image
+    import ops
+    from utils import orient_array, read_orientation
+
+    with Image.open(file_path) as pil_image:
+        orientation = read_orientation(pil_image)
+        task.report_progress(10)
+        with tracing.span('load.full_decode', size=pil_image.size):
+            image = ops.from_pil(pil_image)
+        task.report_progress(60)
+    # The transform stays a strided view until export copies the pixels
+    return graph, orient_array(image, orientation)
+
+
+def export_task(task, graph, file_path):
+    """
+        Background task: run the edit graph at full resolution and save the result.
+
+        Args:
+        - task (workers.Task): Running task, used for progress and cancellation.
+        - graph (EditGraph): Snapshot of the edit graph to materialize.
+        - file_path (str): Destination file path.
+
+        Returns:
+        - str: The path the image was saved to.
+        """
+    from PIL import Image
+
+    task.report_progress(0)
+    with tracing.span('export.materialize',
+                      operations=len(graph.operations)):
+        image = graph.materialize()
+    task.report_progress(80)
+    with tracing.span('export.encode'):
+        Image.fromarray(image).save(file_path)
+    return file_path
+
+
+def resize_task(task, image, operation, width, height, quality):
+    """
+        Background task: resize the preview image into a new array.
+
+        Args:
+        - task (workers.Task): Running task.
+        - image (numpy.ndarray): Preview image.
+        - operation (tuple): The edit in full resolution, recorded in the history.
+        - width (int): Target preview width.
+        - height (int): Target preview height.
+        - quality (str): Resize quality tier.
+
+        Returns:
+        - tuple: (resized image, history entry).
+        """
+    import ops
+    from history import FrameEntry
+
+    task.report_progress(0)
+    with tracing.span('edit.resize', size=(width, height)):
+        result = ops.resize(image, width, height, quality=quality)
+    task.report_progress(50)
+    with tracing.span('history.capture'):
+        return result, FrameEntry.capture('Resize', operation, image)
+
+
+def brightness_task(task, image, operation, decrease_value):
+    """
+        Background task: darken the image into a new array, leaving image untouched.
+
+        Returns:
+        - tuple: (darkened image, history entry).
+        """
+    import numpy as np
+    import ops
+    from history import FrameEntry
+
+    task.report_progress(0)
+    with tracing.span('edit.brightness'):
+        result = ops.decrease_brightness(image, decrease_value,
+                                         out=np.empty_like(image))
+    task.report_progress(50)
+    with tracing.span('history.capture'):
+        return result, FrameEntry.capture('Decrease Brightness', operation,
+                                          image)
+
+
+def rectangle_task(task, image, operation, coordinates):
+    """
+        Background task: draw a blue rectangle on a copy of the image.
+
+        Args:
+        - coordinates (tuple): (x, y, width, height) in preview coordinates.
+
+        Returns:
+        - tuple: (edited image, history entry holding only the covered region).
+        """
+    import ops
+    from history import PatchEntry
+
+    x, y, width, height = coordinates
+    with tracing.span('edit.rectangle'):
+        result = image.copy()
+        task.report_progress(50)
+        ops.fill_rectangle(result, x, y, width, height, ops.BLUE)
+    with tracing.span('history.capture'):
+        return result, PatchEntry.capture('Draw Rectangle', operation, image,
+                                          result, x, y, width, height)
+
+
+def annotations_task(task, image, operation, rectangles):
+    """
+        Background task: draw many rectangles on one copy of the image.
+
+        Args:
+        - rectangles (list): Rectangle dicts in preview coordinates.
+
+        Returns:
+        - tuple: (edited image, history entry holding only the region the
+          rectangles cover).
+        """
+    import ops
+    from history import PatchEntry
+
+    with tracing.span('edit.annotations', count=len(rectangles)):
+        result = image.copy()
+        task.report_progress(50)
+        ops.draw_rectangles(result, rectangles)
+    with tracing.span('history.capture'):
+        return result, PatchEntry.capture('Import Annotations', operation,
+                                          image, result,
+                                          *ops.rectangles_bounds(rectangles))
+
+
+def undo_task(task, image, entry):
+    """
+        Background task: restore the image from before a history entry.
+        """
+    task.report_progress(0)
+    with tracing.span('history.undo'):
+        # Only read a spilled entry here; finish_undo keeps the data
+        data = entry.read()
+        return entry.undo(image, data), entry, data
+
+
+def redo_task(task, image, entry, operation):
+    """
+        Background task: re-apply the edit recorded by a history entry.
+
+        Args:
+        - operation (tuple): The entry's edit mapped to the preview resolution.
+        """
+    task.report_progress(0)
+    with tracing.span('history.redo'):
+        data = None if entry.replays_redo else entry.read()
+        return entry.redo(image, operation, data), entry, data
+
+
 class StartWindow(QMainWindow):
     """
         Main window class for the Image Processing App.
 
         Attributes:
-        - pil_image (PIL.Image): Currently loaded image in PIL format.
+        - graph (EditGraph): Full-resolution source image and the edits applied to it.
+        - image (numpy.ndarray): Preview-resolution result of graph, as a contiguous
+          RGB array; this is what is displayed and edited interactively.
+        - image_version (int): Counter bumped whenever image is replaced or edited.
+        - display_pixmaps (dict): Renders of the current image version, keyed by
+          (channel, width, height, transformation); shared with the image
+          cache entry while a file is shown unedited.
+        - image_cache (ImageCache): Decoded files and their renders, so that
+          re-opening a recent file does not decode it again.
+        - channel_cache (ops.ChannelCache): Isolated-channel renders of image
+          (None until the first image is opened, like preview_pyramid and history).
+        - preview_pyramid (PreviewPyramid): Downscaled levels of image for display.
+        - stats_cache (image_stats.StatisticsCache): Histograms of recent image
+          versions.
+        - stats_dialog (StatsDialog): Statistics panel, or None until opened.
+        - stats_runner (TaskRunner): Computes exact statistics in the background.
+        - task_runner (TaskRunner): Runs loads and edits off the GUI thread.
+        - progress_dialog (QProgressDialog): Progress of the running task.
+        - history (EditHistory): Undo and redo stacks of the current image.
+        - decode_runner (TaskRunner): Decodes full-resolution images in the
+          background, independently of edits.
+        - load_started (float): perf_counter() time the current load began.
+        - trace_timer (QTimer): Refreshes the status-bar stage timings while
+          tracing is enabled; None otherwise.
         - load_image_button (QPushButton): Button to load an image.
+        - open_folder_button (QPushButton): Button to browse a folder of images.
         - connect_camera_button (QPushButton): Button to connect to a camera.
         - image_label (QLabel): Label to display loaded images.
         - back_button (QPushButton): Button to navigate back.
         - continue_button (QPushButton): Button to continue to edit mode.
         - camera_widget (CameraWidget): Widget to display camera feed.
+        - folder_browser (FolderBrowser): Thumbnail grid of a folder, or None.
+        - last_folder (str): Folder browsed last, offered again by Open Folder.
         - layout (QVBoxLayout): Layout for main window.
         """
     def __init__(self):
@@ -88,56 +351,368 @@ class StartWindow(QMainWindow):
         self.setCentralWidget(self.main_widget)
 
         self.load_image_button = None
+        self.open_folder_button = None
         self.connect_camera_button = None
         self.image_label = None
         self.back_button = None
         self.continue_button = None
         self.camera_widget = None
+        self.folder_browser = None
+        self.last_folder = ''
 
         self.layout = QVBoxLayout()
         self.main_widget.setLayout(self.layout)
 
-        self.pil_image = None  # Keep track of the loaded image
+        self.image = None  # Keep track of the loaded image
+        self.image_version = 0
+        # Created with the first image (see open_graph), since they need
+        # OpenCV and NumPy, which are not imported at startup
+        self.channel_cache = None
+        self.display_pixmaps = {}
+        self.image_cache = ImageCache()
+        self.preview_pyramid = None
+        self.stats_cache = None
+        self.stats_dialog = None
+        self.graph = None
+
+        self.progress_dialog = None
+        self.task_runner = TaskRunner(self)
+        self.task_runner.started.connect(self.show_progress)
+        self.task_runner.progress.connect(self.update_progress)
+        self.task_runner.idle.connect(self.hide_progress)
+
+        self.decode_runner = TaskRunner(self)
+        self.stats_runner = TaskRunner(self)
+        self.load_started = None
+
+        self.history = None
+        QShortcut(QKeySequence.Undo, self, self.undo)
+        QShortcut(QKeySequence.Redo, self, self.redo)
+
+        self.trace_timer = None
+        if tracing.is_enabled():
+            self.trace_timer = QTimer(self)
+            self.trace_timer.timeout.connect(self.update_trace_readout)
+            self.trace_timer.start(500)
         self.init_ui()
         self.show()
+        QTimer.singleShot(WARM_UP_DELAY_MS, lambda: threading.Thread(
+            target=warm_up_imports, name='warm-up', daemon=True).start())
 
-    def display_image(self, pil_image):
+    def display_image(self, image, pixmaps=None):
         """
-            Display the given PIL image on the GUI.
+            Display the given RGB image array on the GUI.
 
             Args:
-            - pil_image (PIL.Image.Image): The PIL image to display.
+            - image (numpy.ndarray): The RGB image to display.
+            - pixmaps (dict): Renders of image made earlier, e.g. kept by the
+              image cache; a new image starts with none.
 
             This method clears the current layout, sets the given image as the current
             image to display, converts it to QImage format, scales it to fit the window,
             and adds it to the GUI. Navigation buttons are then added for user interaction.
             """
         try:
-            self.clear_layout(self.layout)
-            self.pil_image = pil_image
-
-            q_img = QImage(pil_image.tobytes(), pil_image.width,
-                           pil_image.height, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_img)
+            with tracing.span('display.image'):
+                self.clear_layout(self.layout)
+                self.image = image
+                self.image_version += 1
+                # A new dict, not clear(): the old one may belong to the cache
+                self.display_pixmaps = {} if pixmaps is None else pixmaps
 
-            self.image_label = QLabel()
-            self.image_label.setAlignment(Qt.AlignCenter)
+                self.image_label = QLabel()
+                self.image_label.setAlignment(Qt.AlignCenter)
 
-            window_width = self.size().width()
-            window_height = self.size().height()
+                window_width = self.size().width()
+                window_height = self.size().height()
 
-            scaled_pixmap = pixmap.scaled(window_width, window_height,
-                                          Qt.KeepAspectRatio)
+                scaled_pixmap = self.cached_pixmap(window_width,
+                                                   window_height,
+                                                   Qt.FastTransformation)
 
-            self.image_label.setPixmap(scaled_pixmap)
-            self.image_label.setScaledContents(False)
+                self.image_label.setPixmap(scaled_pixmap)
+                self.image_label.setScaledContents(False)
 
-            self.layout.addWidget(self.image_label)
+                self.layout.addWidget(self.image_label)
 
-            self.add_navigation_buttons()
+                self.add_navigation_buttons()
+            self.refresh_statistics()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to display image: {e}")
 
+    def open_image(self, image):
+        """
+                Display a newly loaded or captured image and start a fresh history.
+
+                Args:
+                - image (numpy.ndarray): The full-resolution RGB image.
+                """
+        from edit_graph import EditGraph
+        self.open_graph(EditGraph(image))
+
+    def open_graph(self, graph, pixmaps=None):
+        """
+                Make graph the image being edited and display its preview.
+
+                Args:
+                - graph (EditGraph): Edit graph of a newly opened image.
+                - pixmaps (dict): Cached renders of the unedited preview.
+                """
+        if graph is not self.graph:
+            self.decode_runner.cancel()
+        if self.history is None:
+            import ops
+            from history import EditHistory
+            from image_stats import StatisticsCache
+            from preview import PreviewPyramid
+            self.channel_cache = ops.ChannelCache()
+            self.stats_cache = StatisticsCache()
+            self.preview_pyramid = PreviewPyramid()
+            self.history = EditHistory()
+        self.graph = graph
+        self.history.clear()
+        self.display_image(graph.preview_source(), pixmaps)
+
+    def image_size(self):
+        """
+                Returns:
+                - tuple: Full-resolution (width, height) of the edited image.
+                """
+        return self.graph.output_size()
+
+    def apply_edit(self, result):
+        """
+                Record a finished edit in the history and display its result.
+
+                Args:
+                - result (tuple): (edited image, history entry) returned by an edit task.
+                """
+        image, entry = result
+        self.graph.push(entry.operation)
+        self.history.push(entry)
+        self.derive_statistics(entry)
+        self.display_image(image)
+
+    def undo(self):
+        """
+                Undo the most recent edit.
+                """
+        if self.image is None or not self.history.can_undo():
+            return
+        self.run_task("Undoing...", undo_task, self.image,
+                      self.history.undo_stack[-1],
+                      on_finished=self.finish_undo,
+                      error_message="Failed to undo")
+
+    def finish_undo(self, result):
+        image, entry, data = result
+        self.graph.pop()
+        self.history.mark_undone(entry, data)
+        self.derive_statistics(entry, undone=True)
+        self.display_image(image)
+
+    def redo(self):
+        """
+                Redo the most recently undone edit.
+                """
+        if self.image is None or not self.history.can_redo():
+            return
+        entry = self.history.redo_stack[-1]
+        self.run_task("Redoing...", redo_task, self.image, entry,
+                      self.graph.preview_operation(entry.operation),
+                      on_finished=self.finish_redo,
+                      error_message="Failed to redo")
+
+    def finish_redo(self, result):
+        image, entry, data = result
+        self.graph.push(entry.operation)
+        self.history.mark_redone(entry, data)
+        self.derive_statistics(entry)
+        self.display_image(image)
+
+    def run_task(self, label, fn, *args, on_finished=None, error_message=None):
+        """
+                Run fn(task, *args) off the GUI thread with a cancellable progress dialog.
+
+                Submitting a task supersedes the one still running, so only the
+                latest request completes.
+
+                Args:
+                - label (str): Text shown in the progress dialog.
+                - fn (function): Task function; must not modify shared state.
+                - args: Extra arguments for fn.
+                - on_finished (function): Called with the result on the GUI thread.
+                - error_message (str): Prefix of the error shown if the task fails.
+                """
+        def on_error(message):
+            print(f"{error_message}: {message}")
+            QMessageBox.critical(self, "Error", f"{error_message}: {message}")
+
+        self.task_runner.submit(label, fn, *args, on_finished=on_finished,
+                                on_error=on_error)
+
+    def show_progress(self, label):
+        """
+                Show (or reuse) the progress dialog for a newly started task.
+                """
+        if self.progress_dialog is None:
+            self.progress_dialog = QProgressDialog(self)
+            self.progress_dialog.setWindowTitle("Working")
+            self.progress_dialog.setWindowModality(Qt.WindowModal)
+            self.progress_dialog.setMinimumDuration(300)
+            self.progress_dialog.setAutoClose(False)
+            self.progress_dialog.setAutoReset(False)
+            self.progress_dialog.canceled.connect(self.task_runner.cancel)
+        self.progress_dialog.setLabelText(label)
+        self.progress_dialog.setRange(0, 100)
+        self.progress_dialog.setValue(0)
+
+    def update_progress(self, percent):
+        if self.progress_dialog is not None:
+            self.progress_dialog.setValue(percent)
+
+    def hide_progress(self):
+        if self.progress_dialog is not None:
+            self.progress_dialog.reset()
+
+    def closeEvent(self, event):
+        """
+                Cancel background work and wait for the worker before closing.
+                """
+        self.close_folder_browser()
+        self.task_runner.cancel()
+        self.decode_runner.cancel()
+        self.stats_runner.cancel()
+        self.task_runner.wait()
+        self.decode_runner.wait()
+        self.stats_runner.wait()
+        super().closeEvent(event)
+
+    def show_statistics(self):
+        """
+                Open the statistics panel next to the editor.
+                """
+        if self.image is None:
+            return
+        if self.stats_dialog is None:
+            from stats_dialog import StatsDialog
+            self.stats_dialog = StatsDialog(self)
+        self.stats_dialog.show()
+        self.stats_dialog.raise_()
+        self.refresh_statistics()
+
+    def refresh_statistics(self):
+        """
+                Show the statistics of the current image version in the open panel.
+
+                Cached statistics are shown at once. Otherwise an estimate from a
+                small pyramid level is shown while the exact histograms are
+                computed in the background.
+                """
+        if self.stats_dialog is None or not self.stats_dialog.isVisible():
+            return
+        import image_stats
+        version = self.image_version
+        statistics = self.stats_cache.get(version)
+        if statistics is None:
+            level = self.preview_pyramid.level_for(
+                self.image, version, image_stats.ESTIMATE_LONG_SIDE,
+                image_stats.ESTIMATE_LONG_SIDE)
+            with tracing.span('stats.estimate'):
+                statistics = image_stats.estimate_statistics(level)
+            self.stats_cache.put(version, statistics)
+        self.stats_dialog.show_statistics(statistics)
+        if not statistics.exact:
+            self.stats_runner.submit(
+                "Statistics", image_stats.statistics_task, self.image,
+                on_finished=lambda result: self.finish_statistics(version,
+                                                                  result))
+
+    def finish_statistics(self, version, statistics):
+        self.stats_cache.put(version, statistics)
+        if version == self.image_version and self.stats_dialog.isVisible():
+            self.stats_dialog.show_statistics(statistics)
+
+    def derive_statistics(self, entry, undone=False):
+        """
+                Carry exact statistics across an edit confined to a rectangle by
+                recounting only the pixels it changed.
+
+                Must be called just before display_image shows the result.
+
+                Args:
+                - entry: History entry of the edit.
+                - undone (bool): Whether the entry was undone rather than applied.
+                """
+        before = getattr(entry, 'before', None)
+        after = getattr(entry, 'after', None)
+        if before is None or after is None:
+            return  # not a patch, or spilled to disk
+        if undone:
+            before, after = after, before
+        with tracing.span('stats.update', size=before.shape[:2]):
+            # display_image bumps the version by one
+            self.stats_cache.derive(self.image_version,
+                                    self.image_version + 1, before, after)
+
+    def update_trace_readout(self):
+        """
+                Show the latest duration of the most recently finished stages in the status bar.
+                """
+        recent = tracing.TRACER.recent()
+        if recent:
+            self.statusBar().showMessage(' | '.join(
+                f"{name} {duration:.1f} ms" for name, duration in recent))
+
+    def preview_pixmap(self, width, height,
+                       transformation=Qt.SmoothTransformation, channel=None):
+        """
+                Render the current image scaled to fit width x height.
+
+                The pixmap is built from the smallest preview pyramid level that
+                covers the requested size, so the full-resolution image is never
+                converted to a QPixmap.
+
+                Args:
+                - width (int): Available width in pixels.
+                - height (int): Available height in pixels.
+                - transformation (Qt.TransformationMode): Final scaling quality.
+                - channel (str): Optional color channel ('R', 'G', 'B') to isolate.
+
+                Returns:
+                - QPixmap: Scaled pixmap keeping the aspect ratio.
+                """
+        with tracing.span('display.pyramid'):
+            level = self.preview_pyramid.level_for(self.image,
+                                                   self.image_version,
+                                                   width, height)
+        if channel is not None:
+            with tracing.span('display.channel_split'):
+                level = self.channel_cache.get(level, self.image_version,
+                                               channel)
+        with tracing.span('display.to_pixmap', size=level.shape[:2]):
+            pixmap = array_to_pixmap(level)
+        with tracing.span('display.scale'):
+            return pixmap.scaled(width, height, Qt.KeepAspectRatio,
+                                 transformation)
+
+    def cached_pixmap(self, width, height,
+                      transformation=Qt.SmoothTransformation, channel=None):
+        """
+                Like preview_pixmap, but reuse renders of the current image version.
+
+                Returns:
+                - QPixmap: Scaled pixmap keeping the aspect ratio.
+                """
+        key = (channel, width, height, int(transformation))
+        pixmap = self.display_pixmaps.get(key)
+        if pixmap is None:
+            pixmap = self.preview_pixmap(width, height, transformation,
+                                         channel)
+            self.display_pixmaps[key] = pixmap
+            self.image_cache.trim()
+        return pixmap
+
     def init_ui(self):
         """
                 Initialize the user interface with load image and connect to camera buttons.
@@ -145,11 +720,14 @@ class StartWindow(QMainWindow):
         self.clear_layout(self.layout)
 
         self.load_image_button = create_button('Load Image', self.load_image)
+        self.open_folder_button = create_button('Open Folder',
+                                                self.open_folder)
         self.connect_camera_button = create_button('Connect to Camera',
                                                    self.connect_to_camera)
 
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.load_image_button)
+        button_layout.addWidget(self.open_folder_button)
         button_layout.addWidget(self.connect_camera_button)
 
         self.layout.addLayout(button_layout)
@@ -177,17 +755,125 @@ class StartWindow(QMainWindow):
             file_path, _ = file_dialog.getOpenFileName(self, 'Open Image',
                                                        '', 'Image Files (*.png *.jpg *.bmp)')
             if file_path:
-                pil_image = Image.open(file_path)
-                pil_image = correct_image_orientation(pil_image)
-                self.display_image(pil_image)
+                self.open_file(file_path)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load image: {e}")
 
+    def open_file(self, file_path):
+        """
+                Load an image file for editing, from the image cache if possible.
+
+                Args:
+                - file_path (str): Path of the image file.
+                """
+        self.close_folder_browser()
+        self.load_started = time.perf_counter()
+        key = file_key(file_path)
+        entry = self.image_cache.get(key)
+        if entry is not None:
+            from edit_graph import EditGraph, PREVIEW_LONG_SIDE
+            self.open_loaded_graph(
+                EditGraph(entry.source, PREVIEW_LONG_SIDE, size=entry.size,
+                          preview_source=entry.preview),
+                file_path, entry)
+            return
+        self.run_task("Loading image...", load_preview_task, file_path,
+                      on_finished=lambda graph: self.open_loaded_graph(
+                          graph, file_path,
+                          self.image_cache.put(key, CachedImage(
+                              graph.source, graph.preview_source(),
+                              graph.source_size()))),
+                      error_message="Failed to load image")
+
+    def open_folder(self):
+        """
+                Choose a folder and show its images as a thumbnail grid.
+                """
+        try:
+            directory = QFileDialog.getExistingDirectory(self, 'Open Folder',
+                                                         self.last_folder)
+            if directory:
+                self.show_folder(directory)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to open folder: {e}")
+
+    def show_folder(self, directory):
+        """
+                Show the thumbnail grid of directory; activating a thumbnail opens it.
+
+                Args:
+                - directory (str): Folder to browse.
+                """
+        from thumbnail_browser import FolderBrowser
+        self.close_folder_browser()
+        self.clear_layout(self.layout)
+        self.last_folder = directory
+        self.folder_browser = FolderBrowser(directory)
+        self.folder_browser.image_chosen.connect(self.open_file)
+        self.layout.addWidget(self.folder_browser)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(create_button('Back',
+                                              self.release_camera_and_back))
+        self.layout.addLayout(button_layout)
+
+    def close_folder_browser(self):
+        """
+                Stop the folder browser's thumbnail loading, if it is shown.
+                """
+        if self.folder_browser is not None:
+            self.folder_browser.stop()
+            self.folder_browser = None
+
+    def open_loaded_graph(self, graph, file_path, entry=None):
+        """
+                Show a freshly loaded preview and, if needed, decode the full image.
+
+                Args:
+                - graph (EditGraph): Graph returned by load_preview_task or
+                  rebuilt from the image cache.
+                - file_path (str): Path of the loaded file.
+                - entry (CachedImage): Cache entry of the file, or None if it
+                  is not cached.
+                """
+        self.open_graph(graph, entry.pixmaps if entry is not None else None)
+        print(f"Time to first pixel: "
+              f"{(time.perf_counter() - self.load_started) * 1000:.0f} ms")
+        print(self.image_cache.summary())
+        if graph.has_source():
+            return
+        self.decode_runner.submit("Decoding full resolution...",
+                                  load_full_task, file_path, graph,
+                                  on_finished=lambda result:
+                                  self.swap_in_full_resolution(result, entry),
+                                  on_error=lambda message: print(
+                                      f"Failed to decode full image: "
+                                      f"{message}"))
+
+    def swap_in_full_resolution(self, result, entry=None):
+        """
+                Attach a decoded full-resolution image to the graph it was decoded for.
+
+                Args:
+                - result (tuple): (graph, image) returned by load_full_task.
+                - entry (CachedImage): Cache entry to keep the image in too.
+                """
+        graph, image = result
+        if entry is not None:
+            entry.source = image
+            self.image_cache.trim()
+        if graph is not self.graph:
+            return
+        graph.set_source(image)
+        print(f"Time to full resolution: "
+              f"{(time.perf_counter() - self.load_started) * 1000:.0f} ms")
+
     def connect_to_camera(self):
         """
                 Connect to a camera and display the camera feed.
                 """
         try:
+            from camera_widget import CameraWidget
             self.clear_layout(self.layout)
             self.camera_widget = CameraWidget(self)
             self.layout.addWidget(self.camera_widget)
@@ -201,6 +887,7 @@ class StartWindow(QMainWindow):
                 """
         if self.camera_widget:
             self.camera_widget.release_camera()
+        self.close_folder_browser()
         self.init_ui()
 
     def clear_layout(self, layout):
@@ -234,6 +921,11 @@ class StartWindow(QMainWindow):
             ("Resize the Image", lambda: self.resize_image()),
             ("Decrease Brightness", lambda: self.decrease_brightness()),
             ("Draw a Blue Rectangle", lambda: self.draw_rectangle()),
+            ("Import Annotations", self.import_annotations),
+            ("Image Statistics", self.show_statistics),
+            ("Undo", self.undo),
+            ("Redo", self.redo),
+            ("Save Image", self.save_image),
             ("Back", self.release_camera_and_back)
         ]
         return edit_buttons
@@ -252,14 +944,10 @@ class StartWindow(QMainWindow):
         image_container.setSizePolicy(QSizePolicy.Expanding,
                                       QSizePolicy.Expanding)
 
-        if self.pil_image:  # Check if there's an image to display
-            q_img = QImage(self.pil_image.tobytes(), self.pil_image.width,
-                           self.pil_image.height, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_img)
+        if self.image is not None:  # Check if there's an image to display
             image_label = QLabel()
-            image_label.setPixmap(pixmap.scaled(self.size().width() // 2,
-                                                self.size().height(), Qt.KeepAspectRatio,
-                                                Qt.SmoothTransformation))
+            image_label.setPixmap(self.cached_pixmap(
+                self.size().width() // 2, self.size().height()))
             image_label.setAlignment(Qt.AlignCenter)
             image_label.setSizePolicy(QSizePolicy.Expanding,
                                       QSizePolicy.Expanding)
@@ -305,41 +993,19 @@ class StartWindow(QMainWindow):
         image_container.setSizePolicy(QSizePolicy.Expanding,
                                       QSizePolicy.Expanding)
 
-        if self.pil_image:
-            # Convert PIL image to OpenCV format (BGR)
-            cv_image = cv2.cvtColor(np.array(self.pil_image),
-                                    cv2.COLOR_RGB2BGR)
-
-            # Split channels
-            red_channel, green_channel, blue_channel = cv2.split(cv_image)
-
-            # Create an image with only the selected channel
-            if channel == 'R':
-                channel_image = cv2.merge((red_channel,
-                                           np.zeros_like(red_channel),
-                                           np.zeros_like(red_channel)))
-            elif channel == 'G':
-                channel_image = cv2.merge((np.zeros_like(green_channel),
-                                           green_channel,
-                                           np.zeros_like(green_channel)))
-            elif channel == 'B':
-                channel_image = cv2.merge((np.zeros_like(blue_channel),
-                                           np.zeros_like(blue_channel),
-                                           blue_channel))
-            else:
+        if self.image is not None:
+            import ops
+            if channel not in ops.CHANNELS:
                 return  # Exit if channel is not recognized
 
-            # Convert channel image to QImage for display
-            q_img = QImage(channel_image.data, channel_image.shape[1],
-                           channel_image.shape[0], channel_image.strides[0],
-                           QImage.Format_RGB888)
-
-            pixmap = QPixmap.fromImage(q_img)
+            # Renders are cached against image_version, so toggling between
+            # channels of an unedited image does no pixel work at all
+            with tracing.span('display.channel', channel=channel):
+                scaled_pixmap = self.cached_pixmap(self.size().width() // 2,
+                                                   self.size().height(),
+                                                   channel=channel)
             image_label = QLabel()
-            image_label.setPixmap(pixmap.scaled(self.size().width() // 2,
-                                                self.size().height(),
-                                                Qt.KeepAspectRatio,
-                                                Qt.SmoothTransformation))
+            image_label.setPixmap(scaled_pixmap)
             image_label.setAlignment(Qt.AlignCenter)
             image_label.setSizePolicy(QSizePolicy.Expanding,
                                       QSizePolicy.Expanding)
@@ -372,62 +1038,46 @@ class StartWindow(QMainWindow):
         """
                 Open a dialog to resize the loaded image based on user input.
                 """
-        if not self.pil_image:
+        if self.image is None:
             return
 
+        import ops
+        from resize_dialog import ResizeDialog
         dialog = ResizeDialog(self)
         if dialog.exec_() == QDialog.Accepted:
             resize_type, width, height, keep_aspect_ratio = dialog.get_values()
+            image_width, image_height = self.image_size()
 
             # Check for valid input
-            if resize_type == 'percent':
-                if width <= 0 or height <= 0 or width > 300 or height > 300:
-                    QMessageBox.warning(self, "Error",
-                                        "Size in percent must be"
-                                        " greater than 0 and less than 300.")
-                    return
-                new_width = int(self.pil_image.width * width / 100)
-                new_height = int(self.pil_image.height * height / 100)
-            else:
-                if (width <= 0 or height <= 0 or
-                        width > 10000 or height > 10000):
-                    QMessageBox.warning(self, "Error",
-                                        "Size in pixels must be "
-                                        "greater than 0 and less than 10000.")
-                    return
-                new_width = width
-                new_height = height
-
-            if keep_aspect_ratio:
-                aspect_ratio = self.pil_image.width / self.pil_image.height
-                if new_width / aspect_ratio < new_height:
-                    new_height = int(new_width / aspect_ratio)
-                else:
-                    new_width = int(new_height * aspect_ratio)
-
-            print(f"Original size: ({self.pil_image.width},"
-                  f" {self.pil_image.height})")
+            try:
+                new_width, new_height = ops.compute_target_size(
+                    image_width, image_height, resize_type, width, height,
+                    keep_aspect_ratio)
+            except ValueError as e:
+                QMessageBox.warning(self, "Error", str(e))
+                return
+
+            print(f"Original size: ({image_width}, {image_height})")
             print(f"New size: ({new_width}, {new_height})")
 
-            # Convert PIL image to OpenCV format (BGR)
-            cv_image = cv2.cvtColor(np.array(self.pil_image),
-                                    cv2.COLOR_RGB2BGR)
-
-            # Resize the image
-            resized_image = cv2.resize(cv_image, (new_width, new_height),
-                                       interpolation=cv2.INTER_AREA)
-
-            # Convert back to PIL format
-            resized_pil_image = Image.fromarray(cv2.cvtColor(resized_image,
-                                                             cv2.COLOR_BGR2RGB))
-
-            # Display the resized image
-            self.display_image(resized_pil_image)
+            # Record the full-resolution target and resize the preview to
+            # the matching proxy size; the full image is resized on export
+            operation = ('resize', {'mode': 'pixels', 'width': new_width,
+                                    'height': new_height,
+                                    'keep_aspect_ratio': False,
+                                    'quality': dialog.get_quality()})
+            _, preview_params = self.graph.preview_operation(operation)
+            self.run_task("Resizing image...", resize_task, self.image,
+                          operation, preview_params['width'],
+                          preview_params['height'], preview_params['quality'],
+                          on_finished=self.apply_edit,
+                          error_message="Failed to resize image")
 
     def decrease_brightness(self):
         """
                 Open a dialog to adjust the brightness of the loaded image based on user input.
                 """
+        from brightness_dialog import BrightnessDialog
         dialog = BrightnessDialog(self)
         if dialog.exec_():
             try:
@@ -453,12 +1103,11 @@ class StartWindow(QMainWindow):
                 raise ValueError("Brightness decrease value "
                                  "must be between 0 and 100.")
 
-            cv_img = np.array(self.pil_image)
-            factor = 1 - decrease_value / 100.0
-            cv_img = cv_img * factor
-            cv_img = np.clip(cv_img, 0, 255).astype(np.uint8)
-            self.pil_image = Image.fromarray(cv_img)
-            self.display_image(self.pil_image)
+            operation = ('brightness', {'decrease': decrease_value})
+            self.run_task("Decreasing brightness...", brightness_task,
+                          self.image, operation, decrease_value,
+                          on_finished=self.apply_edit,
+                          error_message="Failed to decrease brightness")
         except Exception as e:
             print(f"Error applying brightness decrease: {e}")
             QMessageBox.critical(self, "Error",
@@ -468,6 +1117,7 @@ class StartWindow(QMainWindow):
         """
                 Open a dialog to draw a blue rectangle on the loaded image based on user input.
                 """
+        from rectangle_dialog import RectangleDialog
         dialog = RectangleDialog(self)
         if dialog.exec_():
             coordinates = dialog.get_coordinates()
@@ -478,19 +1128,69 @@ class StartWindow(QMainWindow):
                 Draw a blue rectangle on the loaded image using given coordinates.
 
                 Args:
-                - coordinates (tuple): Tuple containing (x, y, width, height) of the rectangle.
+                - coordinates (tuple): Tuple containing (x, y, width, height) of the
+                  rectangle in full-resolution coordinates.
                 """
         try:
             x, y, width, height = coordinates
-            cv_img = np.array(self.pil_image)
-
-            # Draw the filled rectangle with a blue color (BGR format)
-            cv2.rectangle(cv_img, (x, y), (x + width, y + height),
-                          (0, 0, 255), -1)  # -1 fill the rectangle
-
-            self.pil_image = Image.fromarray(cv_img)
-            self.display_image(self.pil_image)
+            operation = ('rectangle', {'x': x, 'y': y, 'width': width,
+                                       'height': height})
+            _, params = self.graph.preview_operation(operation)
+
+            # Fill the rectangle with blue (RGB format) in the background
+            self.run_task("Drawing rectangle...", rectangle_task,
+                          self.image, operation,
+                          (params['x'], params['y'], params['width'],
+                           params['height']),
+                          on_finished=self.apply_edit,
+                          error_message="Failed to draw rectangle")
         except Exception as e:
             print(f"Error drawing rectangle: {e}")
             QMessageBox.critical(self, "Error", f"Failed to "
                                                 f"draw rectangle: {str(e)}")
+
+    def import_annotations(self):
+        """
+                Draw every rectangle of a CSV or JSON annotation file chosen by the
+                user as one edit, refreshing the display once.
+                """
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, 'Import Annotations', '', 'Annotations (*.csv *.json)')
+        if not file_path:
+            return
+        try:
+            import annotations
+            operation = annotations.annotations_operation(
+                annotations.load_rectangles(file_path))
+            if not operation[1]['rectangles']:
+                QMessageBox.information(self, "Import Annotations",
+                                        "The file contains no rectangles.")
+                return
+            _, params = self.graph.preview_operation(operation)
+            self.run_task("Drawing annotations...", annotations_task,
+                          self.image, operation, params['rectangles'],
+                          on_finished=self.apply_edit,
+                          error_message="Failed to draw annotations")
+        except (OSError, ValueError) as e:
+            print(f"Error importing annotations: {e}")
+            QMessageBox.critical(self, "Error", f"Failed to import "
+                                                f"annotations: {str(e)}")
+
+    def save_image(self):
+        """
+                Export the edited image at full resolution to a file chosen by the user.
+                """
+        if self.graph is None:
+            return
+        if not self.graph.has_source():
+            QMessageBox.information(self, "Please wait",
+                                    "The full-resolution image is still "
+                                    "loading. Try again in a moment.")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, 'Save Image', '', 'Image Files (*.png *.jpg *.bmp)')
+        if file_path:
+            self.run_task("Saving image...", export_task,
+                          self.graph.snapshot(), file_path,
+                          on_finished=lambda path: print(f"Saved {path}"),
+                          error_message="Failed to save image")
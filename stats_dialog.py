@@ -0,0 +1,102 @@
+"""
+Module containing a panel with per-channel histograms and statistics.
+
+The dialog is not modal: it stays open next to the editor and is refreshed
+by the main window whenever the image changes.
+"""
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QWidget
+from PyQt5.QtGui import QColor, QPainter, QPainterPath, QPen
+from PyQt5.QtCore import Qt
+
+CHANNEL_NAMES = {'R': 'Red', 'G': 'Green', 'B': 'Blue'}
+CHANNEL_COLORS = {'R': QColor(205, 70, 98), 'G': QColor(70, 160, 90),
+                  'B': QColor(60, 100, 205)}
+
+
+class HistogramWidget(QWidget):
+    """
+        Draws the three channel histograms on top of each other.
+
+        Attributes:
+        - statistics (image_stats.ImageStatistics): What is drawn, or None.
+        """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.statistics = None
+        self.setMinimumSize(320, 160)
+
+    def set_statistics(self, statistics):
+        self.statistics = statistics
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor('#f4f2ef'))
+        if self.statistics is None:
+            return
+        histograms = self.statistics.histograms
+        # Clipped pixels pile up in the end bins; scale to the bins between
+        peak = max(int(histograms[:, 1:255].max()), 1)
+        width, height = self.width(), self.height()
+        painter.setRenderHint(QPainter.Antialiasing)
+        for channel, histogram in zip('RGB', histograms):
+            path = QPainterPath()
+            path.moveTo(0, height)
+            for value, count in enumerate(histogram):
+                path.lineTo(value * (width - 1) / 255,
+                            height - min(count / peak, 1.0) * (height - 1))
+            path.lineTo(width - 1, height)
+            painter.setPen(QPen(CHANNEL_COLORS[channel], 1))
+            color = QColor(CHANNEL_COLORS[channel])
+            color.setAlpha(60)
+            painter.setBrush(color)
+            painter.drawPath(path)
+
+
+class StatsDialog(QDialog):
+    """
+        Non-modal panel showing histograms, mean/min/max and clipping per channel.
+
+        Attributes:
+        - histogram_widget (HistogramWidget): The histogram plot.
+        - channel_labels (dict): Channel -> QLabel with its statistics.
+        - status_label (QLabel): Whether the figures are an estimate.
+        """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Image Statistics")
+        self.setGeometry(100, 100, 360, 300)
+        self.setModal(False)
+
+        self.layout = QVBoxLayout(self)
+        self.histogram_widget = HistogramWidget()
+        self.layout.addWidget(self.histogram_widget)
+
+        self.channel_labels = {}
+        for channel in 'RGB':
+            label = QLabel()
+            label.setStyleSheet(
+                f"color: {CHANNEL_COLORS[channel].name()};")
+            self.channel_labels[channel] = label
+            self.layout.addWidget(label)
+
+        self.status_label = QLabel()
+        self.status_label.setAlignment(Qt.AlignRight)
+        self.layout.addWidget(self.status_label)
+
+    def show_statistics(self, statistics):
+        """
+                Display new statistics.
+
+                Args:
+                - statistics (image_stats.ImageStatistics): Statistics to show.
+                """
+        self.histogram_widget.set_statistics(statistics)
+        for channel, label in self.channel_labels.items():
+            values = statistics.channels[channel]
+            label.setText(f"{CHANNEL_NAMES[channel]}: mean {values['mean']:.1f}"
+                          f", min {values['min']}, max {values['max']}, "
+                          f"clipped {values['dark']:.2f}% dark / "
+                          f"{values['bright']:.2f}% bright")
+        self.status_label.setText("Exact" if statistics.exact
+                                  else "Estimate, refining...")
@@ -0,0 +1,441 @@
+"""
+Pipelined processing of video files and live camera streams.
+
+Frames flow through three kinds of stages, each on its own threads and
+connected by bounded queues:
+- decode: reads frames with cv2.VideoCapture and converts them to RGB;
+- process: applies the operation chain with ops.run_operations, on one or
+  more worker threads;
+- encode: restores frame order, converts back to BGR and writes the frames
+  with cv2.VideoWriter (or only counts them when there is no output).
+
+OpenCV releases the GIL while it works, so the stages overlap across
+cores. A full queue holds back the stage feeding it (back-pressure). For
+live sources the decode stage never waits instead: when processing falls
+behind, the oldest queued frame is dropped, so latency stays bounded.
+
+Example:
+    python main.py stream clip.avi out.avi --op resize:50% --op brightness:20
+    python main.py stream 0 --op channel:R --max-frames 300
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+import batch
+import ops
+import tracing
+from camera_capture import FrameRate
+
+DROP_POLICIES = ('block', 'drop-oldest', 'drop-newest')
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_LIVE_FPS = 30.0
+# Writer codec per output extension
+FOURCC = {'.avi': 'MJPG', '.mp4': 'mp4v', '.mov': 'mp4v', '.mkv': 'XVID'}
+# How often blocked stages check whether the pipeline was aborted
+POLL_SECONDS = 0.1
+STAGES = ('decode', 'process', 'encode')
+
+
+def parse_source(source):
+    """
+        Args:
+        - source (str): Camera index (e.g. '0') or video file path.
+
+        Returns:
+        - int or str: What cv2.VideoCapture takes; an int is a live camera.
+        """
+    return int(source) if source.isdigit() else source
+
+
+class StreamStats:
+    """
+        Frame counts and timings of a pipeline run.
+
+        Attributes:
+        - frames_read (int): Frames decoded from the source.
+        - frames_dropped (int): Live frames dropped because processing fell behind.
+        - frames_processed (int): Frames the operation chain was applied to.
+        - frames_written (int): Frames that reached the encode stage.
+        - stage_seconds (dict): Stage name -> time spent working, summed over
+          its threads (waiting on queues is not counted).
+        - started (float): perf_counter() time the pipeline started.
+        - finished (float): perf_counter() time the last frame was written.
+        - rate (FrameRate): Output rate over the last second.
+        """
+    def __init__(self):
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.frames_written = 0
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.started = None
+        self.finished = None
+        self.rate = FrameRate()
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, counter):
+        with self._lock:
+            self.stage_seconds[stage] += seconds
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def sustained_fps(self):
+        """
+                Returns:
+                - float: Frames written per second over the whole run.
+                """
+        elapsed = self.elapsed()
+        return self.frames_written / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        """
+                Returns:
+                - str: Frame counts, sustained FPS and per-frame stage costs.
+                """
+        lines = [f"Wrote {self.frames_written}/{self.frames_read} frames in "
+                 f"{self.elapsed():.2f} s ({self.sustained_fps():.1f} FPS "
+                 f"sustained), {self.frames_dropped} dropped."]
+        counts = {'decode': self.frames_read,
+                  'process': self.frames_processed,
+                  'encode': self.frames_written}
+        for stage in STAGES:
+            per_frame = (self.stage_seconds[stage] / counts[stage] * 1000
+                         if counts[stage] else 0.0)
+            lines.append(f"  {stage:8} {per_frame:8.2f} ms/frame")
+        return '\n'.join(lines)
+
+
+class PipelineAborted(Exception):
+    """
+        Raised inside a stage when another stage failed or stop(drain=False) was called.
+        """
+
+
+class StreamPipeline:
+    """
+        Decode, process and encode stages connected by bounded queues.
+
+        Attributes:
+        - source (int or str): Camera index or video file path.
+        - operations (list): (name, params) tuples applied to every frame.
+        - output (str): Output video path, or None to discard the frames.
+        - workers (int): Number of process threads.
+        - policy (str): One of DROP_POLICIES for frames entering processing.
+        - live (bool): Whether the source is a camera.
+        - max_frames (int): Stop after reading this many frames, or None.
+        - stats (StreamStats): Counters of the current run.
+        - error (Exception): First exception raised by a stage, or None.
+        """
+    def __init__(self, source, operations, output=None, workers=2,
+                 queue_size=DEFAULT_QUEUE_SIZE, policy=None, max_frames=None):
+        """
+                Args:
+                - policy (str): One of DROP_POLICIES; None picks 'drop-oldest' for
+                  cameras and 'block' for files, which must not lose frames.
+                """
+        self.source = source
+        self.operations = operations
+        self.output = output
+        self.workers = max(workers, 1)
+        self.live = isinstance(source, int)
+        self.policy = policy or ('drop-oldest' if self.live else 'block')
+        if self.policy not in DROP_POLICIES:
+            raise ValueError("Policy must be one of "
+                             + ", ".join(DROP_POLICIES) + ".")
+        self.max_frames = max_frames
+        self.stats = StreamStats()
+        self.error = None
+        self.decoded = queue.Queue(maxsize=queue_size)
+        self.processed = queue.Queue(maxsize=queue_size)
+        self.capture = None
+        self.fps = None
+        self._stopping = threading.Event()
+        self._aborted = threading.Event()
+        self._take_lock = threading.Lock()
+        self._taken = 0
+        self._threads = []
+
+    def start(self):
+        """
+                Open the source and start every stage.
+
+                Raises:
+                - ValueError: If the source cannot be opened.
+                """
+        self.capture = cv2.VideoCapture(self.source)
+        if not self.capture.isOpened():
+            raise ValueError(f"Cannot open video source: {self.source}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_LIVE_FPS
+        self.stats.started = time.perf_counter()
+        targets = ([('decode', self._decode)] +
+                   [(f'process-{index}', self._process)
+                    for index in range(self.workers)] +
+                   [('encode', self._encode)])
+        for name, target in targets:
+            thread = threading.Thread(target=self._guard, args=(target,),
+                                      name=f'stream-{name}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self, drain=True):
+        """
+                Stop reading new frames.
+
+                Args:
+                - drain (bool): Finish the frames already read; False abandons them.
+                """
+        self._stopping.set()
+        if not drain:
+            self._aborted.set()
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def wait(self, timeout=None):
+        """
+                Wait for every stage to finish.
+
+                Args:
+                - timeout (float): Seconds to wait at most, or None.
+
+                Returns:
+                - bool: True once the pipeline has finished.
+                """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for thread in self._threads:
+            remaining = (None if deadline is None
+                         else max(deadline - time.perf_counter(), 0))
+            thread.join(remaining)
+        if self.is_running():
+            return False
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+        return True
+
+    def run(self, report_interval=1.0):
+        """
+                Run the pipeline to the end, printing progress every report_interval.
+
+                Ctrl+C stops reading and drains the frames already read.
+
+                Returns:
+                - StreamStats: Counters of the run.
+                """
+        self.start()
+        try:
+            while not self.wait(report_interval):
+                print(f"{self.stats.frames_written} frames, "
+                      f"{self.stats.rate.fps:.1f} FPS, "
+                      f"{self.stats.frames_dropped} dropped, queues "
+                      f"{self.decoded.qsize()}/{self.processed.qsize()}")
+        except KeyboardInterrupt:
+            self.stop()
+            self.wait()
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+    def _guard(self, target):
+        try:
+            target()
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+            self._stopping.set()
+            self._aborted.set()
+
+    def _put(self, target_queue, item):
+        # Blocks while the queue is full: back-pressure on the caller
+        while True:
+            if self._aborted.is_set():
+                raise PipelineAborted()
+            try:
+                target_queue.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, source_queue):
+        while True:
+            if self._aborted.is_set():
+                raise PipelineAborted()
+            try:
+                return source_queue.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                pass
+
+    def _offer(self, frame):
+        """
+                Queue a decoded frame according to the drop policy.
+                """
+        if self.policy == 'block':
+            self._put(self.decoded, frame)
+            return
+        try:
+            self.decoded.put_nowait(frame)
+            return
+        except queue.Full:
+            pass
+        self.stats.frames_dropped += 1
+        if self.policy == 'drop-newest':
+            return
+        try:
+            self.decoded.get_nowait()
+        except queue.Empty:
+            pass
+        # This thread is the only producer, so there is room now
+        self.decoded.put_nowait(frame)
+
+    def _decode(self):
+        try:
+            while not self._stopping.is_set():
+                if (self.max_frames is not None and
+                        self.stats.frames_read >= self.max_frames):
+                    break
+                start = time.perf_counter()
+                with tracing.span('stream.decode'):
+                    ok, frame = self.capture.read()
+                    if not ok and not self.live:
+                        break
+                if not ok:
+                    # A camera hiccup; avoid spinning
+                    time.sleep(0.005)
+                    continue
+                with tracing.span('stream.convert'):
+                    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+                self.stats.add('decode', time.perf_counter() - start,
+                               'frames_read')
+                self._offer(frame)
+        finally:
+            if not self._aborted.is_set():
+                for _ in range(self.workers):
+                    self._put(self.decoded, None)
+
+    def _take(self):
+        # Frames are numbered as they leave the queue, so drops leave no gaps
+        with self._take_lock:
+            frame = self._get(self.decoded)
+            if frame is None:
+                return None, None
+            sequence = self._taken
+            self._taken += 1
+            return sequence, frame
+
+    def _process(self):
+        while True:
+            sequence, frame = self._take()
+            if frame is None:
+                self._put(self.processed, None)
+                return
+            start = time.perf_counter()
+            with tracing.span('stream.process'):
+                frame = ops.run_operations(frame, self.operations)
+            self.stats.add('process', time.perf_counter() - start,
+                           'frames_processed')
+            self._put(self.processed, (sequence, frame))
+
+    def _encode(self):
+        writer = None
+        pending = {}  # sequence -> frame finished out of order
+        next_sequence = 0
+        finished_workers = 0
+        try:
+            while finished_workers < self.workers:
+                item = self._get(self.processed)
+                if item is None:
+                    finished_workers += 1
+                    continue
+                pending[item[0]] = item[1]
+                while next_sequence in pending:
+                    frame = pending.pop(next_sequence)
+                    next_sequence += 1
+                    start = time.perf_counter()
+                    with tracing.span('stream.encode'):
+                        if self.output:
+                            if writer is None:
+                                writer = self._open_writer(frame)
+                            cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=frame)
+                            writer.write(frame)
+                    self.stats.add('encode', time.perf_counter() - start,
+                                   'frames_written')
+                    self.stats.rate.tick()
+                    self.stats.finished = time.perf_counter()
+        finally:
+            if writer is not None:
+                writer.release()
+
+    def _open_writer(self, frame):
+        extension = os.path.splitext(self.output)[1].lower()
+        fourcc = cv2.VideoWriter_fourcc(*FOURCC.get(extension, 'mp4v'))
+        writer = cv2.VideoWriter(self.output, fourcc, self.fps,
+                                 (frame.shape[1], frame.shape[0]))
+        if not writer.isOpened():
+            raise ValueError(f"Cannot write video: {self.output}")
+        return writer
+
+
+def main(argv=None):
+    """
+        Command line entry point for stream processing.
+
+        Args:
+        - argv (list): Arguments without the program name (defaults to sys.argv[1:]).
+
+        Returns:
+        - int: Process exit code.
+        """
+    parser = argparse.ArgumentParser(
+        prog='main.py stream',
+        description='Apply image operations to every frame of a video file '
+                    'or camera stream.')
+    parser.add_argument('source', help='video file path or camera index')
+    parser.add_argument('output', nargs='?', default=None,
+                        help='output video path (.avi, .mp4); omit to only '
+                             'measure throughput')
+    parser.add_argument('--op', dest='operations', action='append',
+                        type=batch.operation_argument, default=[],
+                        metavar='SPEC',
+                        help='operation to apply, in order (repeatable); '
+                             'same forms as the batch command')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='number of processing threads (default: 2)')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='frames held between stages '
+                             f'(default: {DEFAULT_QUEUE_SIZE})')
+    parser.add_argument('--policy', choices=DROP_POLICIES, default=None,
+                        help='what to do when processing falls behind '
+                             '(default: drop-oldest for cameras, block for '
+                             'files)')
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help='stop after this many frames')
+    args = parser.parse_args(argv)
+
+    pipeline = StreamPipeline(parse_source(args.source), args.operations,
+                              args.output, args.workers, args.queue_size,
+                              args.policy, args.max_frames)
+    try:
+        stats = pipeline.run()
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(stats.summary())
+    if args.output:
+        print(f"Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""
+Tests of annotation file parsing.
+
+Run with: python -m pytest -q
+"""
+import json
+
+import pytest
+
+import annotations
+
+
+def test_rectangles_are_normalized():
+    rectangles = annotations.normalize_rectangles(
+        [{'x': '1', 'y': 2, 'width': 3, 'height': 4, 'fill': 'no'}])
+    assert rectangles == [{'x': 1, 'y': 2, 'width': 3, 'height': 4,
+                           'color': annotations.parse_color(None),
+                           'fill': False,
+                           'thickness': annotations.DEFAULT_THICKNESS}]
+
+
+def test_non_object_item_is_reported_with_its_index(tmp_path):
+    path = tmp_path / 'boxes.json'
+    path.write_text(json.dumps(
+        [{'x': 0, 'y': 0, 'width': 5, 'height': 5}, [1, 2]]))
+    with pytest.raises(ValueError, match='Rectangle 2: Expected an object'):
+        annotations.load_rectangles(str(path))
@@ -0,0 +1,37 @@
+"""
+Tests of headless batch processing.
+
+Run with: python -m pytest -q
+"""
+import os
+
+import numpy as np
+from PIL import Image
+
+import batch
+
+
+def write_image(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.fromarray(np.full((8, 8, 3), value, np.uint8)).save(path)
+
+
+def test_recursive_glob_mirrors_subdirectories(tmp_path):
+    photos = tmp_path / 'photos'
+    write_image(str(photos / 'a' / 'img.png'), 10)
+    write_image(str(photos / 'b' / 'img.png'), 200)
+    out = tmp_path / 'out'
+
+    assert batch.main([str(photos / '**' / '*.png'), str(out),
+                       '--workers', '1']) == 0
+    for name, value in (('a', 10), ('b', 200)):
+        result = np.asarray(Image.open(out / name / 'img.png'))
+        assert (result == value).all()
+
+
+def test_output_over_input_is_rejected(tmp_path):
+    write_image(str(tmp_path / 'img.png'), 10)
+
+    assert batch.main([str(tmp_path), str(tmp_path),
+                       '--op', 'brightness:50']) == 1
+    assert (np.asarray(Image.open(tmp_path / 'img.png')) == 10).all()
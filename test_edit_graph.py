@@ -0,0 +1,39 @@
+"""
+Tests of the edit graph's preview proxy.
+
+Run with: python -m pytest -q
+"""
+import numpy as np
+
+import ops
+from edit_graph import EditGraph, fit_size
+
+
+def test_enlarging_resize_keeps_the_preview_proxy_sized():
+    graph = EditGraph(np.zeros((800, 1000, 3), np.uint8), long_side=2048)
+    graph.push(('resize', {'mode': 'pixels', 'width': 5000, 'height': 4000,
+                           'keep_aspect_ratio': False}))
+    graph.push(('rectangle', {'x': 4000, 'y': 3000, 'width': 500,
+                              'height': 500}))
+
+    preview = graph.evaluate_preview()
+    width, height = fit_size(5000, 4000, 2048)
+    assert preview.shape == (height, width, 3)
+
+    # The rectangle lands where the full-resolution one does, scaled
+    scale = width / 5000
+    blue = np.all(preview == ops.BLUE, axis=-1)
+    rows, columns = np.nonzero(blue)
+    assert abs(columns.min() - 4000 * scale) <= 1
+    assert abs(rows.min() - 3000 * scale) <= 1
+    assert abs(columns.max() - 4500 * scale) <= 1
+    assert abs(rows.max() - 3500 * scale) <= 1
+
+
+def test_preview_operation_after_enlargement_uses_the_proxy_scale():
+    graph = EditGraph(np.zeros((800, 1000, 3), np.uint8), long_side=2048)
+    graph.push(('resize', {'mode': 'pixels', 'width': 5000, 'height': 4000,
+                           'keep_aspect_ratio': False}))
+    name, params = graph.preview_operation(
+        ('rectangle', {'x': 4000, 'y': 0, 'width': 10, 'height': 10}))
+    assert params['x'] == round(4000 * 2048 / 5000)
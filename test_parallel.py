@@ -0,0 +1,37 @@
+"""
+Tests of the multi-process pipeline.
+
+Run with: python -m pytest -q
+"""
+import numpy as np
+
+import ops
+import parallel
+
+RESIZE = {'mode': 'percent', 'keep_aspect_ratio': True}
+CHAINS = [
+    # Periods that split exactly
+    [('resize', dict(RESIZE, width=50, height=50))],
+    # 1000 and 997 rows share no factor: no exact periods
+    [('resize', {'mode': 'pixels', 'width': 700, 'height': 997,
+                 'keep_aspect_ratio': False})],
+    [('gamma', {'gamma': 1.2}),
+     ('resize', dict(RESIZE, width=37, height=37, quality='fast')),
+     ('channel', {'channel': 'R'})],
+    [('resize', dict(RESIZE, width=180, height=180, quality='best')),
+     ('rectangle', {'x': 10, 'y': 20, 'width': 30, 'height': 40})],
+]
+
+
+def test_parallel_matches_in_memory_operations_for_any_worker_count():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (1000, 750, 3), dtype=np.uint8)
+    try:
+        for operations in CHAINS:
+            expected = ops.run_operations(image, operations, in_place=False)
+            for workers in (2, 4):
+                result = parallel.run_operations_parallel(
+                    image, operations, workers=workers, min_bytes=0)
+                assert np.array_equal(result, expected)
+    finally:
+        parallel.shutdown_pool()
@@ -0,0 +1,113 @@
+"""
+Tests of the strip-tiled resize.
+
+Run with: python -m pytest -q
+"""
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import ops
+import tiled
+
+BUDGET_BYTES = 1024 * 1024
+
+
+def gradient_image(height, width):
+    rows = np.linspace(0, 255, height, dtype=np.float32)[:, np.newaxis]
+    columns = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis]
+    image = np.empty((height, width, 3), np.uint8)
+    image[..., 0] = rows
+    image[..., 1] = columns
+    image[..., 2] = (rows + columns) / 2
+    return image
+
+
+def test_period_aligned_resize_is_bit_identical():
+    image = gradient_image(3000, 400)
+    out = np.empty((1000, 200, 3), np.uint8)
+    tiled.resize_tiled(image, 200, 1000, out, budget_bytes=64 * 1024)
+    assert np.array_equal(out, cv2.resize(image, (200, 1000),
+                                          interpolation=cv2.INTER_AREA))
+
+
+def test_resampled_resize_matches_opencv_within_one_level():
+    image = gradient_image(3024, 300)
+    image[::7] = 255  # some detail, so rounding differences would show
+    for interpolation, width, height in ((cv2.INTER_AREA, 100, 997),
+                                         (cv2.INTER_AREA, 400, 1001),
+                                         (cv2.INTER_LINEAR, 100, 997),
+                                         (cv2.INTER_LINEAR, 100, 1008),
+                                         (cv2.INTER_CUBIC, 100, 4001),
+                                         (cv2.INTER_LANCZOS4, 100, 4001)):
+        expected = cv2.resize(image, (width, height),
+                              interpolation=interpolation)
+        outputs = []
+        for budget_bytes in (4 * 1024, 64 * 1024, 1024 * 1024 * 1024):
+            out = np.empty((height, width, 3), np.uint8)
+            tiled.resize_tiled(image, width, height, out, halo_rows=4,
+                               interpolation=interpolation,
+                               budget_bytes=budget_bytes)
+            outputs.append(out)
+        assert np.abs(outputs[0].astype(int) - expected).max() <= 1
+        # The strip size never changes the result
+        for out in outputs[1:]:
+            assert np.array_equal(out, outputs[0])
+
+
+def test_tiled_operations_match_in_memory_operations():
+    image = gradient_image(600, 450)
+    image[::5] = 0
+    resize = {'mode': 'percent', 'keep_aspect_ratio': True}
+    exact = [('resize', dict(resize, width=50, height=50)),
+             ('gamma', {'gamma': 1.5}),
+             ('resize', dict(resize, width=20, height=20))]
+    reduced = [('gamma', {'gamma': 0.8}),
+               ('resize', dict(resize, width=33, height=33,
+                               quality='fast'))]
+    enlarged = [('resize', dict(resize, width=250, height=250,
+                                quality='best'))]
+    # Each resampled resize is within one level; chained ones can add up
+    for operations, tolerance in ((exact, 0), (reduced, 1), (enlarged, 1)):
+        expected = ops.run_operations(image, operations, in_place=False)
+        outputs = [tiled.run_operations_tiled(image, operations, budget_bytes)
+                   for budget_bytes in (16 * 1024, 256 * 1024)]
+        assert outputs[0].shape == expected.shape
+        assert np.abs(outputs[0].astype(int) - expected).max() <= tolerance
+        assert np.array_equal(outputs[0], outputs[1])
+
+
+def test_coprime_resize_keeps_strips_bounded(monkeypatch):
+    # gcd(9001, 2970) == 1: one exact period would be the whole output
+    source_height, source_width = 9001, 2000
+    height, width = 2970, 660
+    src = tiled.scratch_array((source_height, source_width, 3))
+    for start, stop in tiled.iter_strips(source_height, 500):
+        src[start:stop] = (np.arange(start, stop) % 256)[:, None, None]
+    out = tiled.scratch_array((height, width, 3))
+
+    strips = []
+    resample_rows = tiled.resample_rows
+
+    def recording_resample_rows(src, width, height, out, start, stop,
+                                interpolation):
+        strips.append(stop - start)
+        resample_rows(src, width, height, out, start, stop, interpolation)
+    monkeypatch.setattr(tiled, 'resample_rows', recording_resample_rows)
+
+    tracemalloc.start()
+    try:
+        tiled.resize_tiled(src, width, height, out,
+                           budget_bytes=BUDGET_BYTES)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    rows = tiled.resample_strip_rows(source_width, source_height, width,
+                                     height, BUDGET_BYTES)
+    assert len(strips) == -(-height // rows)
+    assert len(strips) > 1
+    assert max(strips) <= rows
+    # The float32 buffers of one strip, well below the 54 MB source
+    assert peak < 3 * BUDGET_BYTES
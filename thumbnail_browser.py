@@ -0,0 +1,299 @@
+"""
+Folder browser showing a grid of image thumbnails.
+
+The grid is a QListView in icon mode over a list model, with uniform item
+sizes, so only the rows on screen are ever asked for their icon, however
+many files the folder holds. A missing icon is requested from a
+ThumbnailLoader and a placeholder is shown until it arrives. The loader
+decodes on a pool of threads (PIL releases the GIL while decoding) and
+always takes the most recent request first, so the rows just scrolled to
+are loaded before the ones scrolled past; stale requests beyond
+MAX_PENDING are dropped and simply requested again if they are shown.
+"""
+import collections
+import os
+import threading
+
+from PyQt5.QtCore import (QAbstractListModel, QModelIndex, QObject,
+                          QRunnable, QSize, Qt, QThreadPool, pyqtSignal,
+                          pyqtSlot)
+from PyQt5.QtGui import QColor, QImage, QPixmap
+from PyQt5.QtWidgets import QLabel, QListView, QVBoxLayout, QWidget
+
+import thumbnails
+import tracing
+
+# Requests kept waiting; older ones are dropped first
+MAX_PENDING = 256
+# Decoded thumbnails kept in memory per browser
+MEMORY_THUMBNAILS = 2000
+GRID_MARGIN = 24
+
+
+class ThumbnailSignals(QObject):
+    """
+        Signals of the loader's jobs, delivered on the GUI thread.
+        """
+    loaded = pyqtSignal(str, QImage)
+    failed = pyqtSignal(str, str)
+
+
+class ThumbnailJob(QRunnable):
+    """
+        Runnable that loads the most recent pending thumbnail request.
+
+        Every request starts one job, but a job does not load its own
+        request: it takes whichever is newest when a thread becomes free.
+        """
+    def __init__(self, loader):
+        super().__init__()
+        self.loader = loader
+
+    @pyqtSlot()
+    def run(self):
+        path = self.loader.take()
+        if path is None:
+            return
+        try:
+            with tracing.span('thumbnail.load'):
+                image, _ = thumbnails.load_thumbnail(
+                    path, self.loader.cache_dir, self.loader.size)
+            # QImage, unlike QPixmap, may be created off the GUI thread
+            q_image = QImage(image.data, image.shape[1], image.shape[0],
+                             image.strides[0], QImage.Format_RGB888).copy()
+        except Exception as e:
+            self.loader.signals.failed.emit(path, str(e))
+        else:
+            self.loader.signals.loaded.emit(path, q_image)
+        finally:
+            self.loader.done(path)
+
+
+class ThumbnailLoader:
+    """
+        Loads thumbnails on a thread pool, newest request first.
+
+        Attributes:
+        - cache_dir (str): Disk cache directory, or None to disable it.
+        - size (int): Thumbnail long side.
+        - signals (ThumbnailSignals): loaded(path, QImage) and failed(path,
+          message) signals.
+        """
+    def __init__(self, cache_dir=None, size=thumbnails.THUMBNAIL_SIZE,
+                 threads=None):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.signals = ThumbnailSignals()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(threads or os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict()  # path -> None, newest last
+        self._running = set()
+
+    def request(self, path):
+        """
+                Queue path, or move it to the front if it is already waiting.
+                """
+        with self._lock:
+            if path in self._running:
+                return
+            if path in self._pending:
+                self._pending.move_to_end(path)
+                return
+            self._pending[path] = None
+            while len(self._pending) > MAX_PENDING:
+                self._pending.popitem(last=False)
+        self.pool.start(ThumbnailJob(self))
+
+    def take(self):
+        """
+                Returns:
+                - str: The newest pending path, now marked running, or None.
+                """
+        with self._lock:
+            if not self._pending:
+                return None
+            path, _ = self._pending.popitem()
+            self._running.add(path)
+            return path
+
+    def done(self, path):
+        with self._lock:
+            self._running.discard(path)
+
+    def stop(self, msecs=-1):
+        """
+                Drop pending requests and wait for the running ones.
+                """
+        with self._lock:
+            self._pending.clear()
+        self.pool.clear()
+        return self.pool.waitForDone(msecs)
+
+
+class ThumbnailModel(QAbstractListModel):
+    """
+        List model of the image files in one folder.
+
+        Icons are produced on demand: data() for a row without a loaded
+        thumbnail requests it and returns a placeholder. A file that cannot
+        be decoded keeps a distinct placeholder, and its tooltip shows why.
+
+        Signals:
+        - failures_changed (int): Number of unreadable files in the folder.
+        """
+    failures_changed = pyqtSignal(int)
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.paths = []
+        self._rows = {}  # path -> row
+        self._pixmaps = collections.OrderedDict()  # path -> QPixmap
+        self._failed = {}  # path -> error message
+        self.placeholder = QPixmap(loader.size, loader.size)
+        self.placeholder.fill(QColor('#e6e1dc'))
+        self.failed_placeholder = QPixmap(loader.size, loader.size)
+        self.failed_placeholder.fill(QColor('#cd4662'))
+        loader.signals.loaded.connect(self.on_loaded)
+        loader.signals.failed.connect(self.on_failed)
+
+    def set_paths(self, paths):
+        self.beginResetModel()
+        self.paths = list(paths)
+        self._rows = {path: row for row, path in enumerate(self.paths)}
+        self._pixmaps.clear()
+        self._failed.clear()
+        self.endResetModel()
+        self.failures_changed.emit(0)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self.paths[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.ToolTipRole:
+            message = self._failed.get(path)
+            if message is not None:
+                return f"{path}\nCannot show this image: {message}"
+            return path
+        if role == Qt.UserRole:
+            return path
+        if role == Qt.DecorationRole:
+            pixmap = self._pixmaps.get(path)
+            if pixmap is not None:
+                self._pixmaps.move_to_end(path)
+                return pixmap
+            if path in self._failed:
+                return self.failed_placeholder
+            self.loader.request(path)
+            return self.placeholder
+        return None
+
+    def on_loaded(self, path, q_image):
+        row = self._rows.get(path)
+        if row is None:
+            return  # From a folder shown earlier
+        self._pixmaps[path] = QPixmap.fromImage(q_image)
+        while len(self._pixmaps) > MEMORY_THUMBNAILS:
+            self._pixmaps.popitem(last=False)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def on_failed(self, path, message):
+        row = self._rows.get(path)
+        if row is None:
+            return
+        self._failed[path] = message
+        index = self.index(row)
+        self.dataChanged.emit(index, index,
+                              [Qt.DecorationRole, Qt.ToolTipRole])
+        self.failures_changed.emit(len(self._failed))
+
+
+class FolderBrowser(QWidget):
+    """
+        Thumbnail grid of the images in a folder.
+
+        Signals:
+        - image_chosen (str): Path of a thumbnail that was activated
+          (double-clicked or Enter).
+
+        Attributes:
+        - loader (ThumbnailLoader): Background thumbnail loader.
+        - model (ThumbnailModel): Files of the current folder.
+        - view (QListView): The virtualized grid.
+        - directory (str): Folder shown.
+        - image_count (int): Image files in directory.
+        """
+    image_chosen = pyqtSignal(str)
+
+    def __init__(self, directory=None, cache_dir=None, parent=None):
+        super().__init__(parent)
+        if cache_dir is None:
+            cache_dir = thumbnails.default_cache_dir()
+        self.loader = ThumbnailLoader(cache_dir)
+        self.model = ThumbnailModel(self.loader, self)
+
+        size = self.loader.size
+        self.view = QListView()
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.Batched)
+        self.view.setBatchSize(200)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setMovement(QListView.Static)
+        self.view.setIconSize(QSize(size, size))
+        self.view.setGridSize(QSize(size + GRID_MARGIN, size + GRID_MARGIN * 2))
+        self.view.setWordWrap(False)
+        self.view.setTextElideMode(Qt.ElideMiddle)
+        self.view.setModel(self.model)
+        self.view.activated.connect(self.on_activated)
+        self.model.failures_changed.connect(self.update_status)
+        self.directory = None
+        self.image_count = 0
+
+        self.folder_label = QLabel()
+        self.folder_label.setStyleSheet(
+            "font-size: 15px; font-family: Bahnschrift; color: #cd4662;")
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.folder_label)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+        if directory is not None:
+            self.open_folder(directory)
+
+    def open_folder(self, directory):
+        """
+                Show the images of directory.
+
+                Args:
+                - directory (str): Folder to browse.
+                """
+        self.loader.stop()
+        with tracing.span('browser.list', directory=directory):
+            paths = thumbnails.list_images(directory)
+        self.directory = directory
+        self.image_count = len(paths)
+        self.model.set_paths(paths)
+
+    def update_status(self, failures):
+        status = f"{self.directory} ({self.image_count} images"
+        if failures:
+            status += f", {failures} unreadable"
+        self.folder_label.setText(status + ")")
+
+    def on_activated(self, index):
+        self.image_chosen.emit(index.data(Qt.UserRole))
+
+    def stop(self):
+        """
+                Stop loading thumbnails (call before the browser is discarded).
+                """
+        self.loader.stop()
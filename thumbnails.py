@@ -0,0 +1,140 @@
+"""
+Thumbnails of image files, with a persistent on-disk cache.
+
+Thumbnails are decoded at reduced resolution: JPEG files use DCT scaling
+(PIL draft mode), so only about 1/8 of the pixels are ever produced, and
+the Exif orientation is applied to the small result. Every thumbnail is
+stored as a small JPEG in the cache directory, named after a hash of the
+file's absolute path, modification time and size and the thumbnail size,
+so a changed file gets a new thumbnail and the next visit to a folder
+only reads the small files.
+
+The cache lives in the user's cache directory unless the
+PHOTO_EDITOR_THUMBNAIL_DIR environment variable points elsewhere.
+"""
+import hashlib
+import os
+import threading
+
+from PIL import Image
+
+import ops
+from image_cache import file_key
+from utils import correct_image_orientation
+
+THUMBNAIL_SIZE = 160
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+CACHE_DIR_ENV = 'PHOTO_EDITOR_THUMBNAIL_DIR'
+CACHE_QUALITY = 85
+
+
+def default_cache_dir():
+    """
+        Returns:
+        - str: PHOTO_EDITOR_THUMBNAIL_DIR, or a directory in the user cache.
+        """
+    path = os.environ.get(CACHE_DIR_ENV)
+    if path:
+        return path
+    base = (os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'photo_editor', 'thumbnails')
+
+
+def list_images(directory):
+    """
+        Args:
+        - directory (str): Folder to list.
+
+        Returns:
+        - list: Paths of the image files directly in directory, sorted by name.
+        """
+    with os.scandir(directory) as entries:
+        paths = [entry.path for entry in entries
+                 if entry.name.lower().endswith(IMAGE_EXTENSIONS)
+                 and entry.is_file()]
+    return sorted(paths, key=lambda path: os.path.basename(path).lower())
+
+
+def cache_path(cache_dir, key, size=THUMBNAIL_SIZE):
+    """
+        Args:
+        - cache_dir (str): Thumbnail cache directory.
+        - key (tuple): image_cache.file_key() of the image file.
+        - size (int): Thumbnail long side.
+
+        Returns:
+        - str: Path of the cached thumbnail, fanned out over subdirectories.
+        """
+    path, mtime_ns, file_size = key
+    digest = hashlib.sha1(
+        f"{path}\0{mtime_ns}\0{file_size}\0{size}".encode('utf-8',
+                                                          'surrogateescape')
+    ).hexdigest()
+    return os.path.join(cache_dir, digest[:2], digest + '.jpg')
+
+
+def make_thumbnail(file_path, size=THUMBNAIL_SIZE):
+    """
+        Decode an image file straight to thumbnail size.
+
+        Args:
+        - file_path (str): Path of the image file.
+        - size (int): Long side of the thumbnail.
+
+        Returns:
+        - PIL.Image.Image: Upright RGB thumbnail.
+        """
+    with Image.open(file_path) as pil_image:
+        pil_image.draft('RGB', (size, size))
+        thumbnail = correct_image_orientation(pil_image.convert('RGB'))
+        thumbnail.thumbnail((size, size), Image.Resampling.BILINEAR)
+    return thumbnail
+
+
+def save_thumbnail(thumbnail, path):
+    """
+        Write a thumbnail to the cache, atomically so concurrent readers never
+        see a partial file.
+        """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        thumbnail.save(temporary, 'JPEG', quality=CACHE_QUALITY)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load_thumbnail(file_path, cache_dir=None, size=THUMBNAIL_SIZE):
+    """
+        Return the thumbnail of an image file, from the disk cache if possible.
+
+        A thumbnail that has to be decoded is written to the cache; failing
+        to write it is not an error.
+
+        Args:
+        - file_path (str): Path of the image file.
+        - cache_dir (str): Thumbnail cache directory, or None for no caching.
+        - size (int): Long side of the thumbnail.
+
+        Returns:
+        - tuple: (RGB thumbnail as a numpy.ndarray, True if it came from the
+          cache).
+        """
+    key = file_key(file_path) if cache_dir else None
+    path = cache_path(cache_dir, key, size) if key is not None else None
+    if path is not None:
+        try:
+            with Image.open(path) as cached:
+                return ops.from_pil(cached), True
+        except OSError:
+            pass  # Not cached yet, or an unreadable leftover
+    thumbnail = make_thumbnail(file_path, size)
+    if path is not None:
+        try:
+            save_thumbnail(thumbnail, path)
+        except OSError as e:
+            print(f"Failed to cache thumbnail of {file_path}: {e}")
+    return ops.from_pil(thumbnail), False
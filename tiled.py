@@ -0,0 +1,464 @@
+"""
+Strip-tiled, bounded-memory execution of image operations.
+
+Large images are processed as horizontal strips spanning the full width,
+and every intermediate image lives in a memory-mapped scratch file, so the
+RAM in use at any time is a few strips, however large the image is.
+Results are bit-identical to running the same operations with ops on the
+whole image, except for some resizes:
+- point operations, channel isolation and rectangle fills are per-pixel,
+  so any strip split gives the same output; annotation outlines are drawn
+  into each strip shifted by whole rows, which rasterizes identically;
+- pyrDown steps of large reductions are cut on even rows, with a halo
+  covering the 5-tap Gaussian;
+- area reductions (the 'balanced' and 'best' tiers) are cut at rows where
+  the source-to-target row mapping is an exact integer, so every strip is
+  resized with the same scale as the whole image, and a halo of source
+  rows around each strip covers the interpolation kernel at its edges.
+The exception is deliberate. Other resizes cannot be tiled exactly with
+bounded memory: with linear, cubic and Lanczos interpolation ('fast'
+reductions and all enlargements) OpenCV computes source positions in
+floating point from the first row of each strip, and heights sharing no
+large factor (e.g. 3024 to 997 rows) have exact periods taller than
+MAX_EXACT_PERIOD_ROWS, up to the whole image. Those resizes are resampled instead, from explicit kernel
+weights (see resample_rows): a few pixels differ from cv2.resize by one
+intensity level, but the result only depends on the image and the
+operations, never on the strip size.
+
+Full-width strips (rather than square tiles) keep the horizontal resize
+coefficients identical to the untiled path. A strided input, such as an
+orientation view, is made contiguous one strip at a time.
+"""
+import math
+import tempfile
+
+import cv2
+import numpy as np
+
+import ops
+import point_ops
+
+DEFAULT_STRIP_BYTES = 32 * 1024 * 1024
+# Extra source rows each pyrDown strip reads past an inner edge: two for
+# the 5-tap kernel, rounded up so strips start on even rows
+PYR_DOWN_HALO = 4
+# Longest target period of a resize still tiled exactly; a strip is at
+# least one period tall
+MAX_EXACT_PERIOD_ROWS = 256
+
+
+def scratch_array(shape, directory=None):
+    """
+        Create a uint8 array backed by an anonymous temporary file.
+
+        Args:
+        - shape (tuple): Array shape.
+        - directory (str): Directory for the scratch file (system default if None).
+
+        Returns:
+        - numpy.memmap: Writable memory-mapped array; the file is removed when
+          the array is garbage collected.
+        """
+    handle = tempfile.TemporaryFile(dir=directory)
+    return np.memmap(handle, dtype=np.uint8, mode='w+', shape=shape)
+
+
+def strip_rows(width, budget_bytes, channels=3):
+    """
+        Returns:
+        - int: Number of full-width rows that fit in budget_bytes (at least 1).
+        """
+    return max(budget_bytes // max(width * channels, 1), 1)
+
+
+def iter_strips(height, rows):
+    """
+        Yield (start, stop) row ranges of at most rows rows covering height.
+        """
+    for start in range(0, height, rows):
+        yield start, min(start + rows, height)
+
+
+def lut_tiled(src, dst, lut, budget_bytes=DEFAULT_STRIP_BYTES):
+    """
+        Apply a lookup table strip by strip (src and dst may be the same array).
+        """
+    for start, stop in iter_strips(src.shape[0],
+                                   strip_rows(src.shape[1], budget_bytes)):
+        point_ops.apply_lut(ops.contiguous(src[start:stop]), lut,
+                            out=dst[start:stop])
+    return dst
+
+
+def channel_tiled(src, dst, channel, budget_bytes=DEFAULT_STRIP_BYTES):
+    """
+        Isolate a color channel strip by strip (src and dst may be the same array).
+        """
+    for start, stop in iter_strips(src.shape[0],
+                                   strip_rows(src.shape[1], budget_bytes)):
+        ops.isolate_channel(ops.contiguous(src[start:stop]), channel,
+                            out=dst[start:stop])
+    return dst
+
+
+def rectangle_tiled(src, dst, x, y, width, height, color=ops.BLUE,
+                    budget_bytes=DEFAULT_STRIP_BYTES):
+    """
+        Fill a rectangle, copying src to dst first when they are different arrays.
+
+        Only the strips that the rectangle crosses are touched when src is dst.
+        """
+    rows = strip_rows(src.shape[1], budget_bytes)
+    for start, stop in iter_strips(src.shape[0], rows):
+        if dst is not src:
+            dst[start:stop] = ops.contiguous(src[start:stop])
+        if stop <= y or start > y + height:
+            continue
+        # Shift into strip coordinates; cv2.rectangle clips to the strip
+        cv2.rectangle(dst[start:stop], (x, y - start),
+                      (x + width, y + height - start), color, -1)
+    return dst
+
+
+def annotations_tiled(src, dst, rectangles,
+                      budget_bytes=DEFAULT_STRIP_BYTES):
+    """
+        Draw annotation rectangles, copying src to dst first when they are different arrays.
+
+        Only the strips that some rectangle crosses are touched when src is dst.
+        """
+    rows = strip_rows(src.shape[1], budget_bytes)
+    for start, stop in iter_strips(src.shape[0], rows):
+        if dst is not src:
+            dst[start:stop] = ops.contiguous(src[start:stop])
+        ops.draw_rectangles(dst[start:stop], rectangles, top=start)
+    return dst
+
+
+def resize_periods(source_height, height):
+    """
+        Output rows come in periods of target_period rows that map exactly
+        onto source_period source rows; strips must be cut on period
+        boundaries to be resized exactly like the whole image.
+
+        Returns:
+        - tuple: (number of periods, target_period, source_period).
+        """
+    periods = math.gcd(source_height, height)
+    return periods, height // periods, source_height // periods
+
+
+def exact_resize_period(source_width, source_height, width, height,
+                        interpolation):
+    """
+        Returns:
+        - int: Target period (see resize_periods) on which strips of this
+          resize can be cut and still be resized exactly like the whole
+          image, or None if they cannot: unless area interpolation shrinks
+          the image in both directions, OpenCV computes source positions in
+          floating point from the first row of each strip, and periods
+          longer than MAX_EXACT_PERIOD_ROWS would make strips too tall.
+        """
+    if (interpolation != cv2.INTER_AREA or width > source_width
+            or height > source_height):
+        return None
+    _, target_period, _ = resize_periods(source_height, height)
+    return target_period if target_period <= MAX_EXACT_PERIOD_ROWS else None
+
+
+def resample_weights(source_length, length, start, stop, interpolation,
+                     overlap=True):
+    """
+        Kernel weights of output rows (or columns) start:stop of a resize.
+
+        Area interpolation weighs each source row by its overlap with the
+        output row when the whole image is reduced (overlap); otherwise
+        OpenCV interpolates between two source rows with its own area
+        coefficients. The other kernels are evaluated at the source
+        position OpenCV maps the output row to. Edge rows are replicated.
+
+        Returns:
+        - tuple: (source row indices, float32 weights), each of shape
+          (stop - start, taps).
+        """
+    scale = source_length / length
+    rows = np.arange(start, stop)
+    if interpolation == cv2.INTER_AREA and overlap:
+        low = rows * scale
+        indices = (np.floor(low).astype(np.int64)[:, np.newaxis]
+                   + np.arange(math.ceil(scale) + 1))
+        weights = (np.minimum(indices + 1, (low + scale)[:, np.newaxis])
+                   - np.maximum(indices, low[:, np.newaxis])).clip(0) / scale
+    elif interpolation == cv2.INTER_AREA:
+        low = np.floor(rows * scale)
+        fraction = (rows + 1) - (low + 1) * (length / source_length)
+        fraction = np.where(fraction <= 0, 0, fraction - np.floor(fraction))
+        indices = low.astype(np.int64)[:, np.newaxis] + np.arange(2)
+        weights = np.stack([1 - fraction, fraction], axis=1)
+    else:
+        radius = ops.KERNEL_RADIUS[interpolation]
+        position = (rows + 0.5) * scale - 0.5
+        indices = (np.floor(position).astype(np.int64)[:, np.newaxis]
+                   + np.arange(1 - radius, radius + 1))
+        weights = kernel_weights(position[:, np.newaxis] - indices,
+                                 interpolation)
+        weights /= weights.sum(axis=1, keepdims=True)
+    return (np.clip(indices, 0, source_length - 1),
+            weights.astype(np.float32))
+
+
+def kernel_weights(distance, interpolation):
+    """
+        Returns:
+        - numpy.ndarray: OpenCV's linear, cubic (A = -0.75) or Lanczos-4 kernel
+          at the given distances.
+        """
+    distance = np.abs(distance)
+    if interpolation == cv2.INTER_LINEAR:
+        return np.clip(1 - distance, 0, None)
+    if interpolation == cv2.INTER_CUBIC:
+        a = -0.75
+        near = ((a + 2) * distance - (a + 3)) * distance ** 2 + 1
+        far = ((a * distance - 5 * a) * distance + 8 * a) * distance - 4 * a
+        return np.where(distance <= 1, near, np.where(distance < 2, far, 0))
+    return np.where(distance < 4, np.sinc(distance) * np.sinc(distance / 4), 0)
+
+
+def resample_strip_rows(source_width, source_height, width, height,
+                        budget_bytes):
+    """
+        Returns:
+        - int: Output rows per resample_rows strip whose float32 buffers
+          (source window and output rows) fit about budget_bytes.
+        """
+    scale = max(source_height / height, 1)
+    row_bytes = 4 * 3 * (scale * (source_width + width) + width)
+    return max(int(budget_bytes // row_bytes), 1)
+
+
+def resample_rows(src, width, height, out, start, stop,
+                  interpolation=cv2.INTER_AREA):
+    """
+        Compute output rows start:stop of a resize of src into out, for any
+        start and stop.
+
+        Only the source rows the strip's kernels reach are read. They are
+        resampled horizontally and then vertically in float32 with the
+        weights of resample_weights, so every output pixel is computed the
+        same way wherever strips are cut (OpenCV's own horizontal pass
+        rounds differently on windows of a few rows).
+        """
+    # OpenCV only sums overlaps if the image shrinks in both directions
+    overlap = src.shape[0] >= height and src.shape[1] >= width
+    indices, weights = resample_weights(src.shape[0], height, start, stop,
+                                        interpolation, overlap)
+    columns, column_weights = resample_weights(src.shape[1], width, 0, width,
+                                               interpolation, overlap)
+    first = int(indices.min())
+    last = int(indices.max()) + 1
+    # Columns first, so that every tap gathers contiguous blocks
+    source = src[first:last].transpose(1, 0, 2).astype(np.float32)
+    window = weighted_sum(source, columns, column_weights)
+    del source
+    rows = weighted_sum(np.ascontiguousarray(window.transpose(1, 0, 2)),
+                        indices - first, weights)
+    out[start:stop] = np.clip(np.rint(rows), 0, 255)
+
+
+def weighted_sum(array, indices, weights):
+    """
+        Returns:
+        - numpy.ndarray: Sum over taps of array[indices[:, tap]] scaled by
+          weights[:, tap], in float32.
+        """
+    total = np.zeros((indices.shape[0],) + array.shape[1:], np.float32)
+    for tap in range(indices.shape[1]):
+        rows = array[indices[:, tap]]
+        rows *= weights[:, tap].reshape((-1,) + (1,) * (array.ndim - 1))
+        total += rows
+    return total
+
+
+def resize_rows(src, width, height, out, start, stop, halo_rows=1,
+                interpolation=cv2.INTER_AREA):
+    """
+        Compute output rows start:stop of a resize of src into out exactly
+        as a single cv2.resize would.
+
+        Args:
+        - start (int): First output row, a multiple of the target period
+          returned by exact_resize_period.
+        - stop (int): End output row, a multiple of the target period or
+          height.
+        - Other arguments as for resize_tiled.
+        """
+    periods, target_period, source_period = resize_periods(src.shape[0],
+                                                           height)
+    halo_periods = -(-halo_rows // source_period)
+    first = max(start // target_period - halo_periods, 0)
+    last = min(-(-stop // target_period) + halo_periods, periods)
+    # Scale factors rather than a size, so that the strip is resized
+    # with exactly the same (floating point) scale as the whole image
+    strip = cv2.resize(
+        ops.contiguous(src[first * source_period:last * source_period]),
+        (0, 0), fx=width / src.shape[1], fy=height / src.shape[0],
+        interpolation=interpolation)
+    offset = first * target_period
+    out[start:stop] = strip[start - offset:stop - offset]
+
+
+def resize_tiled(src, width, height, out, halo_rows=1,
+                 interpolation=cv2.INTER_AREA,
+                 budget_bytes=DEFAULT_STRIP_BYTES):
+    """
+        Resize src into out strip by strip: bit-identical to a single
+        cv2.resize when exact_resize_period allows it, otherwise resampled
+        (see the module docstring).
+
+        Args:
+        - src (numpy.ndarray): Source image.
+        - width (int): Target width.
+        - height (int): Target height.
+        - out (numpy.ndarray): (height, width, 3) destination, e.g. a scratch array.
+        - halo_rows (int): Source rows the interpolation kernel reaches past
+          a strip edge (see ops.KERNEL_RADIUS).
+        - interpolation (int): OpenCV interpolation flag.
+        - budget_bytes (int): Approximate size of one output strip.
+
+        Returns:
+        - numpy.ndarray: out.
+        """
+    period = exact_resize_period(src.shape[1], src.shape[0], width, height,
+                                 interpolation)
+    if period is None:
+        for start, stop in iter_strips(height, resample_strip_rows(
+                src.shape[1], src.shape[0], width, height, budget_bytes)):
+            resample_rows(src, width, height, out, start, stop,
+                          interpolation)
+        return out
+    rows = max(strip_rows(width, budget_bytes) // period, 1) * period
+    for start, stop in iter_strips(height, rows):
+        resize_rows(src, width, height, out, start, stop, halo_rows,
+                    interpolation)
+    return out
+
+
+def pyr_down_rows(src, out, start, stop):
+    """
+        Compute output rows start:stop of a pyrDown of src into out.
+
+        Output row i filters source rows 2i-2 to 2i+2, so the strip reads
+        PYR_DOWN_HALO extra source rows past each inner edge; source strips
+        start on even rows to keep the row mapping of the whole image.
+        """
+    first = max(2 * start - PYR_DOWN_HALO, 0)
+    last = min(2 * stop + PYR_DOWN_HALO, src.shape[0])
+    strip = cv2.pyrDown(ops.contiguous(src[first:last]))
+    offset = first // 2
+    out[start:stop] = strip[start - offset:stop - offset]
+
+
+def pyr_down_tiled(src, out, budget_bytes=DEFAULT_STRIP_BYTES):
+    """
+        Halve src into out strip by strip, bit-identical to a single cv2.pyrDown.
+
+        Args:
+        - src (numpy.ndarray): Source image.
+        - out (numpy.ndarray): ((height + 1) // 2, (width + 1) // 2, 3) destination.
+        - budget_bytes (int): Approximate size of one output strip.
+
+        Returns:
+        - numpy.ndarray: out.
+        """
+    for start, stop in iter_strips(out.shape[0],
+                                   strip_rows(out.shape[1], budget_bytes)):
+        pyr_down_rows(src, out, start, stop)
+    return out
+
+
+def resize_quality_tiled(src, width, height, quality, budget_bytes,
+                         scratch_dir=None):
+    """
+        Tiled equivalent of ops.resize: the same pyrDown steps and final
+        interpolation, each on memory-mapped scratch arrays.
+
+        Returns:
+        - numpy.ndarray: (height, width, 3) scratch array.
+        """
+    levels, interpolation = ops.resize_plan(src.shape[1], src.shape[0],
+                                            width, height, quality)
+    for _ in range(levels):
+        out = scratch_array(((src.shape[0] + 1) // 2,
+                             (src.shape[1] + 1) // 2, 3), scratch_dir)
+        src = pyr_down_tiled(src, out, budget_bytes)
+    out = scratch_array((height, width, 3), scratch_dir)
+    return resize_tiled(src, width, height, out,
+                        halo_rows=ops.KERNEL_RADIUS[interpolation],
+                        interpolation=interpolation,
+                        budget_bytes=budget_bytes)
+
+
+def run_operations_tiled(image, operations, budget_bytes=DEFAULT_STRIP_BYTES,
+                         scratch_dir=None):
+    """
+        Bounded-memory equivalent of ops.run_operations.
+
+        The input is never modified. Every intermediate image, and the result,
+        is a memory-mapped scratch array; consecutive point operations are
+        fused into one lookup table as in ops.run_operations.
+
+        Args:
+        - image (numpy.ndarray): RGB source image (may itself be memory-mapped).
+        - operations (list): List of (name, params) tuples.
+        - budget_bytes (int): Approximate size of one strip.
+        - scratch_dir (str): Directory for scratch files.
+
+        Returns:
+        - numpy.ndarray: The processed image.
+        """
+    current = image
+    pending_luts = []
+
+    def target_for(src):
+        # Write into a fresh scratch array until the input has been copied
+        if src is image:
+            return scratch_array(src.shape, scratch_dir)
+        return src
+
+    def flush(src):
+        if not pending_luts:
+            return src
+        lut = point_ops.compose(*pending_luts)
+        del pending_luts[:]
+        return lut_tiled(src, target_for(src), lut, budget_bytes)
+
+    for name, params in operations:
+        if point_ops.is_point_operation(name):
+            pending_luts.append(point_ops.lut_for(name, params))
+            continue
+        current = flush(current)
+        if name == 'resize':
+            new_width, new_height = ops.compute_target_size(
+                current.shape[1], current.shape[0], **params)
+            current = resize_quality_tiled(
+                current, new_width, new_height,
+                params.get('quality', ops.DEFAULT_RESIZE_QUALITY),
+                budget_bytes, scratch_dir)
+        elif name == 'channel':
+            current = channel_tiled(current, target_for(current),
+                                    params['channel'], budget_bytes)
+        elif name == 'rectangle':
+            current = rectangle_tiled(current, target_for(current),
+                                      params['x'], params['y'],
+                                      params['width'], params['height'],
+                                      budget_bytes=budget_bytes)
+        elif name == 'annotations':
+            current = annotations_tiled(current, target_for(current),
+                                        params['rectangles'], budget_bytes)
+        else:
+            raise ValueError(f"Unknown operation: {name}")
+    current = flush(current)
+    if current is image:
+        current = scratch_array(image.shape, scratch_dir)
+        current[:] = image
+    return current
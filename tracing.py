@@ -0,0 +1,260 @@
+"""
+Lightweight tracing of the editor's load, edit and display stages.
+
+Code under measurement is wrapped in spans:
+
+    with tracing.span('decode'):
+        ...
+
+Finished spans are aggregated into per-stage duration histograms and kept
+as events that can be exported as Chrome trace JSON, which chrome://tracing
+and Perfetto (ui.perfetto.dev) open directly. Spans from worker threads are
+shown on their own tracks.
+
+Tracing is off by default. A disabled span is a shared no-op context
+manager, so instrumented code pays one function call per span. Set the
+PHOTO_EDITOR_TRACE environment variable to a file path to enable tracing
+for a session; the trace is written there and a summary is printed when
+the application exits.
+"""
+import collections
+import json
+import os
+import threading
+import time
+
+TRACE_ENV = 'PHOTO_EDITOR_TRACE'
+MAX_EVENTS = 100000
+# Upper bounds (ms) of the histogram buckets; a last bucket is open ended
+BUCKETS_MS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024,
+              2048, 4096)
+
+
+class StageStats:
+    """
+        Duration statistics of one stage.
+
+        Attributes:
+        - count (int): Number of finished spans.
+        - total_ms (float): Sum of their durations.
+        - max_ms (float): Longest duration.
+        - histogram (list): Span counts per BUCKETS_MS bucket, plus one
+          for longer spans.
+        """
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        for index, bound in enumerate(BUCKETS_MS):
+            if duration_ms <= bound:
+                self.histogram[index] += 1
+                return
+        self.histogram[-1] += 1
+
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+
+class NullSpan:
+    """
+        Span used while tracing is disabled; does nothing.
+        """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """
+        Context manager timing one stage and reporting it to a Tracer.
+        """
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.start, time.perf_counter(),
+                           self.args)
+        return False
+
+
+class Tracer:
+    """
+        Collects finished spans from any thread.
+
+        Attributes:
+        - enabled (bool): Whether span() records anything.
+        """
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self._events = collections.deque(maxlen=max_events)
+        self._stats = {}
+        self._recent = collections.OrderedDict()  # name -> last duration
+        self._thread_names = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def span(self, name, **args):
+        """
+                Args:
+                - name (str): Stage name, e.g. 'load.decode'.
+                - args: Extra values stored with the event (sizes, parameters).
+
+                Returns:
+                - Span: Context manager timing the stage (a no-op when disabled).
+                """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, name, start, end, args=None):
+        """
+                Add a finished span.
+
+                Args:
+                - name (str): Stage name.
+                - start (float): perf_counter() time the stage began.
+                - end (float): perf_counter() time the stage ended.
+                - args (dict): Extra values stored with the event.
+                """
+        duration_ms = (end - start) * 1000
+        thread = threading.current_thread()
+        with self._lock:
+            self._events.append((name, start, end, thread.ident, args))
+            self._thread_names[thread.ident] = thread.name
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = StageStats()
+            stats.add(duration_ms)
+            self._recent.pop(name, None)
+            self._recent[name] = duration_ms
+
+    def stats(self):
+        """
+                Returns:
+                - dict: Stage name -> StageStats (a snapshot).
+                """
+        with self._lock:
+            snapshot = {}
+            for name, stats in self._stats.items():
+                copy = StageStats()
+                copy.count, copy.total_ms, copy.max_ms = (
+                    stats.count, stats.total_ms, stats.max_ms)
+                copy.histogram = list(stats.histogram)
+                snapshot[name] = copy
+            return snapshot
+
+    def recent(self, count=4):
+        """
+                Returns:
+                - list: (name, duration in ms) of the last count distinct stages
+                  to finish, newest last.
+                """
+        with self._lock:
+            return list(self._recent.items())[-count:]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._stats.clear()
+            self._recent.clear()
+
+    def chrome_trace(self):
+        """
+                Returns:
+                - dict: The recorded events in Chrome trace event format.
+                """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        trace_events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                         'tid': tid, 'args': {'name': name}}
+                        for tid, name in thread_names.items()]
+        for name, start, end, tid, args in events:
+            event = {'name': name, 'cat': name.split('.')[0], 'ph': 'X',
+                     'ts': (start - self._origin) * 1e6,
+                     'dur': (end - start) * 1e6, 'pid': pid, 'tid': tid}
+            if args:
+                event['args'] = {key: str(value)
+                                 for key, value in args.items()}
+            trace_events.append(event)
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        """
+                Write the recorded events as Chrome trace JSON.
+
+                Args:
+                - path (str): Output file path.
+                """
+        with open(path, 'w') as file:
+            json.dump(self.chrome_trace(), file)
+
+    def summary(self):
+        """
+                Returns:
+                - str: One line per stage with count, mean, max and total time.
+                """
+        lines = [f"{'stage':28} {'count':>6} {'mean ms':>9} {'max ms':>9}"
+                 f" {'total ms':>10}"]
+        stats = self.stats()
+        for name in sorted(stats, key=lambda name: -stats[name].total_ms):
+            stage = stats[name]
+            lines.append(f"{name:28} {stage.count:6} {stage.mean_ms():9.2f}"
+                         f" {stage.max_ms:9.2f} {stage.total_ms:10.1f}")
+        return '\n'.join(lines)
+
+
+TRACER = Tracer()
+
+
+def span(name, **args):
+    return TRACER.span(name, **args)
+
+
+def enable(enabled=True):
+    TRACER.enabled = enabled
+
+
+def is_enabled():
+    return TRACER.enabled
+
+
+def enable_from_environment():
+    """
+        Enable tracing if PHOTO_EDITOR_TRACE is set.
+
+        Returns:
+        - str: The trace output path, or None if tracing stays disabled.
+        """
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        enable()
+    return path or None
+
+
+def write_trace(path):
+    """
+        Export the trace to path and print the per-stage summary.
+        """
+    TRACER.export_chrome_trace(path)
+    print(TRACER.summary())
+    print(f"Trace written to {path}")
@@ -1,7 +1,88 @@
 """
 Module for image processing utilities including image orientation correction.
+
+The Exif orientation is read from the file header without decoding pixels,
+and all eight orientations are applied with lossless flips and transposes.
+On NumPy arrays these are strided views, so the transform costs nothing
+until the first real operation copies the pixels anyway.
 """
-from PIL import ExifTags
+from PIL import ExifTags, Image
+
+ORIENTATION_TAG = ExifTags.Base.Orientation
+
+# Exif orientation -> PIL transpose method that brings the image upright
+PIL_TRANSPOSES = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def read_orientation(image):
+    """
+        Read the Exif orientation of an opened image without decoding its pixels.
+
+        Args:
+        - image (PIL.Image.Image): The opened (not necessarily loaded) PIL image.
+
+        Returns:
+        - int: Orientation between 1 and 8; 1 when missing or invalid.
+        """
+    try:
+        orientation = image.getexif().get(ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+    return orientation if orientation in range(1, 9) else 1
+
+
+def swaps_axes(orientation):
+    """
+        Returns:
+        - bool: True when the orientation exchanges width and height.
+        """
+    return orientation in (5, 6, 7, 8)
+
+
+def oriented_size(width, height, orientation):
+    """
+        Returns:
+        - tuple: (width, height) of an image of the given size once made upright.
+        """
+    if swaps_axes(orientation):
+        return height, width
+    return width, height
+
+
+def orient_array(image, orientation):
+    """
+        Make an image array upright as a zero-copy strided view.
+
+        Args:
+        - image (numpy.ndarray): Image array of shape (height, width, ...).
+        - orientation (int): Exif orientation between 1 and 8.
+
+        Returns:
+        - numpy.ndarray: View of image in upright orientation (image itself for 1).
+        """
+    if orientation == 2:
+        return image[:, ::-1]
+    if orientation == 3:
+        return image[::-1, ::-1]
+    if orientation == 4:
+        return image[::-1]
+    if orientation == 5:
+        return image.swapaxes(0, 1)
+    if orientation == 6:
+        return image.swapaxes(0, 1)[:, ::-1]
+    if orientation == 7:
+        return image.swapaxes(0, 1)[::-1, ::-1]
+    if orientation == 8:
+        return image.swapaxes(0, 1)[::-1]
+    return image
 
 
 def correct_image_orientation(image):
@@ -12,20 +93,9 @@ def correct_image_orientation(image):
         - image (PIL.Image.Image): The input PIL image.
 
         Returns:
-        - PIL.Image.Image: The corrected PIL image.
+        - PIL.Image.Image: The corrected PIL image (the same image if upright).
         """
-    try:
-        for orientation in ExifTags.TAGS.keys():
-            if ExifTags.TAGS[orientation] == 'Orientation':
-                break
-        exif = dict(image._getexif().items())
-
-        if exif[orientation] == 3:
-            image = image.rotate(180, expand=True)
-        elif exif[orientation] == 6:
-            image = image.rotate(270, expand=True)
-        elif exif[orientation] == 8:
-            image = image.rotate(90, expand=True)
-    except (AttributeError, KeyError, IndexError):
-        pass
-    return image
+    method = PIL_TRANSPOSES.get(read_orientation(image))
+    if method is None:
+        return image
+    return image.transpose(method)
@@ -0,0 +1,185 @@
+"""
+Background execution of image operations off the Qt GUI thread.
+
+Operations run on a dedicated QThreadPool and report back through Qt
+signals, which are delivered on the GUI thread. A TaskRunner keeps at most
+one live request: submitting a new task cancels the previous one, and the
+result of any superseded task is discarded, so rapid successive requests
+coalesce and only the latest one completes.
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class TaskCancelled(Exception):
+    """
+        Raised inside a task function when its task has been cancelled.
+        """
+
+
+class TaskSignals(QObject):
+    """
+        Signals emitted by a Task; each carries the id of the task that sent it.
+        """
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(int, object)
+    error = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+
+class Task(QRunnable):
+    """
+        Runnable wrapping a function called as fn(task, *args) on a worker thread.
+
+        The function reports progress and checks for cancellation by calling
+        task.report_progress(percent) between its stages.
+        """
+    def __init__(self, task_id, fn, *args):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.signals = TaskSignals()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """
+                Ask the task to stop at its next progress checkpoint.
+                """
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def report_progress(self, percent):
+        """
+                Publish progress and abort the task if it has been cancelled.
+
+                Args:
+                - percent (int): Completion between 0 and 100.
+                """
+        if self.is_cancelled():
+            raise TaskCancelled()
+        self.signals.progress.emit(self.task_id, percent)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            if self.is_cancelled():
+                raise TaskCancelled()
+            result = self.fn(self, *self.args)
+            if self.is_cancelled():
+                raise TaskCancelled()
+        except TaskCancelled:
+            self.signals.cancelled.emit(self.task_id)
+        except Exception as e:
+            self.signals.error.emit(self.task_id, str(e))
+        else:
+            self.signals.finished.emit(self.task_id, result)
+
+
+class TaskRunner(QObject):
+    """
+        Runs one task at a time on a private thread pool and coalesces requests.
+
+        Signals:
+        - started (str): A task was submitted; carries its label.
+        - progress (int): Progress of the current task.
+        - idle (): The current task finished, failed or was cancelled.
+        """
+    started = pyqtSignal(str)
+    progress = pyqtSignal(int)
+    idle = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        # One worker keeps edits of the same image strictly ordered
+        self.pool.setMaxThreadCount(1)
+        self._next_id = 0
+        self._current = None
+        self._callbacks = None
+
+    def submit(self, label, fn, *args, on_finished=None, on_error=None):
+        """
+                Run fn(task, *args) in the background, superseding any earlier task.
+
+                Args:
+                - label (str): Short description shown while the task runs.
+                - fn (function): Task function; must not modify shared state.
+                - args: Extra positional arguments for fn.
+                - on_finished (function): Called on the GUI thread with the result.
+                - on_error (function): Called on the GUI thread with an error message.
+
+                Returns:
+                - Task: The submitted task.
+                """
+        self.cancel()
+        self._next_id += 1
+        task = Task(self._next_id, fn, *args)
+        task.signals.progress.connect(self._on_progress)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.error.connect(self._on_error)
+        task.signals.cancelled.connect(self._on_cancelled)
+        self._current = task
+        self._callbacks = (on_finished, on_error)
+        self.started.emit(label)
+        self.pool.start(task)
+        return task
+
+    def cancel(self):
+        """
+                Cancel the current task; its result, if any, will be discarded.
+                """
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+            self._callbacks = None
+            self.idle.emit()
+
+    def is_busy(self):
+        return self._current is not None
+
+    def wait(self, msecs=-1):
+        """
+                Block until queued tasks are done (used at shutdown).
+                """
+        return self.pool.waitForDone(msecs)
+
+    def _is_current(self, task_id):
+        return self._current is not None and self._current.task_id == task_id
+
+    @pyqtSlot(int, int)
+    def _on_progress(self, task_id, percent):
+        if self._is_current(task_id):
+            self.progress.emit(percent)
+
+    @pyqtSlot(int, object)
+    def _on_finished(self, task_id, result):
+        if not self._is_current(task_id):
+            return
+        on_finished, _ = self._callbacks
+        self._current = None
+        self._callbacks = None
+        self.idle.emit()
+        if on_finished is not None:
+            on_finished(result)
+
+    @pyqtSlot(int, str)
+    def _on_error(self, task_id, message):
+        if not self._is_current(task_id):
+            return
+        _, on_error = self._callbacks
+        self._current = None
+        self._callbacks = None
+        self.idle.emit()
+        if on_error is not None:
+            on_error(message)
+
+    @pyqtSlot(int)
+    def _on_cancelled(self, task_id):
+        if self._is_current(task_id):
+            self._current = None
+            self._callbacks = None
+            self.idle.emit()